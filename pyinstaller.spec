@@ -8,8 +8,7 @@ a = Analysis(
     binaries=[],
     datas=[
         ('resources', 'resources'),
-        ('theme_config.json', '.'),
-        ('src/db/init.sql', 'src/db')
+        ('theme_config.json', '.')
     ],
     hiddenimports=[],
     hookspath=[],
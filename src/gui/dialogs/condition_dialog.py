@@ -2,6 +2,58 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from .condition_param_dialog import ConditionParamDialog
 
+
+class _ConditionSearchIndex:
+    """条件树的搜索索引，加载时建立一次
+
+    保存每个节点小写后的名称（标签还包括SQL片段）、父节点和按原顺序排列的子节点，
+    搜索时只在Python中计算可见集合，不读取树形控件。
+    """
+
+    def __init__(self):
+        self.items = []             # 先序排列的节点
+        self.entries = []           # 先序排列的 (节点, 小写的搜索文本)
+        self.parent = {}            # 节点 -> 父节点，根节点的父节点为 ''
+        self.children = {'': []}    # 节点 -> 原顺序的子节点
+        self.groups = set()
+
+    def add(self, item, parent, name, sql_fragment=None):
+        self.items.append(item)
+        self.parent[item] = parent
+        self.children[item] = []
+        self.children[parent].append(item)
+        if sql_fragment is None:
+            self.groups.add(item)
+            self.entries.append((item, str(name).lower()))
+        else:
+            self.entries.append((item, f"{name}\n{sql_fragment}".lower()))
+
+    def visible(self, query):
+        """匹配的节点及其所有祖先；query 为空时返回 None，表示全部可见"""
+        if not query:
+            return None
+        parent = self.parent
+        visible = set()
+        for item in [item for item, text in self.entries if query in text]:
+            while item and item not in visible:
+                visible.add(item)
+                item = parent[item]
+        return visible
+
+    def detached(self, visible):
+        """需要从父节点上摘下的节点：父节点可见（或是根）而自身不可见的节点
+
+        父节点已经被摘下的节点无需再摘，它随父节点一起隐藏。
+        """
+        if visible is None:
+            return set()
+        children = self.children
+        detached = set()
+        for parent in [''] + [item for item in visible if item in self.groups]:
+            detached.update([child for child in children[parent] if child not in visible])
+        return detached
+
+
 class ConditionDialog(tk.Toplevel):
     def __init__(self, parent, repository):
         super().__init__(parent)
@@ -17,6 +69,10 @@ class ConditionDialog(tk.Toplevel):
         # 初始化变量
         self.condition_vars = {}
         self.current_editor = None
+        self._search_index = _ConditionSearchIndex()
+        self._search_after_id = None  # 用于延迟搜索
+        self._visible_items = None    # 当前搜索的可见节点，None 为全部可见
+        self._detached_items = set()  # 当前从父节点上摘下的节点
         
         # 设置界面
         self.setup_ui()
@@ -271,42 +327,26 @@ class ConditionDialog(tk.Toplevel):
 
     def _load_condition_tags(self):
         """加载条件标签"""
-        # 获取所有组
-        groups = self.repository.find_all_groups()
-        
-        # 创建根节点映射，用于快速查找
-        root_nodes = {}
-        
-        # 首先添加所有根组
-        for group in groups:
-            if not group.parent_group_id:  # 根组
-                root_node = self.condition_tree.insert(
-                    "", "end", text=group.group_name,
-                    values=(group.id, ""), open=True
+        # 组树和全部标签各用一次查询取出
+        tags_by_group = {group.id: tags for group, tags in self.repository.find_groups_with_tags()}
+        self._insert_condition_nodes("", self.repository.get_group_tree(), tags_by_group)
+
+    def _insert_condition_nodes(self, parent_node, nodes, tags_by_group):
+        """插入组节点，先插子组再插组内的标签，同时建立搜索索引"""
+        index = self._search_index
+        for node in nodes:
+            group_node = self.condition_tree.insert(
+                parent_node, "end", text=node.group.group_name,
+                values=(node.group.id, ""), open=True
+            )
+            index.add(group_node, parent_node, node.group.group_name)
+            self._insert_condition_nodes(group_node, node.children, tags_by_group)
+            for tag in tags_by_group.get(node.group.id, []):
+                tag_node = self.condition_tree.insert(
+                    group_node, "end", text=tag.tag_name,
+                    values=(tag.tag_name, tag.sql_fragment)
                 )
-                root_nodes[group.id] = root_node
-        
-        # 然后添加子组
-        for group in groups:
-            if group.parent_group_id:  # 子组
-                parent_node = root_nodes.get(group.parent_group_id)
-                if parent_node:
-                    group_node = self.condition_tree.insert(
-                        parent_node, "end", text=group.group_name,
-                        values=(group.id, ""), open=True
-                    )
-                    root_nodes[group.id] = group_node
-        
-        # 最后加载每个组的标签
-        for group in groups:
-            parent_node = root_nodes.get(group.id)
-            if parent_node:
-                tags = self.repository.find_tags_by_group(group.id)
-                for tag in tags:
-                    self.condition_tree.insert(
-                        parent_node, "end", text=tag.tag_name,
-                        values=(tag.tag_name, tag.sql_fragment)
-                    )
+                index.add(tag_node, group_node, tag.tag_name, tag.sql_fragment)
 
     def confirm(self):
         """确认选择"""
@@ -589,32 +629,33 @@ class ConditionDialog(tk.Toplevel):
         self.edit_hint.pack(padx=5, pady=5)
 
     def on_search(self, *args):
-        """处理搜索"""
-        search_text = self.search_var.get().lower()
-        for item in self.condition_tree.get_children():
-            self.filter_tree_item(item, search_text)
-
-    def filter_tree_item(self, item, search_text):
-        """递归过滤树形项目"""
-        # 获取项目文本
-        text = self.condition_tree.item(item)['text'].lower()
-        
-        # 检查子项目
-        children = self.condition_tree.get_children(item)
-        visible_children = False
-        
-        for child in children:
-            if self.filter_tree_item(child, search_text):
-                visible_children = True
-        
-        # 如果当前项目或其子项目匹配搜索文本，则显示
-        if search_text in text or visible_children:
-            self.condition_tree.item(item, open=True)
-            self.condition_tree.reattach(item, '', 'end')
-            return True
-        else:
-            self.condition_tree.detach(item)
-            return False
+        """处理搜索，输入停顿后再过滤"""
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(300, self._do_search)
+
+    def _do_search(self):
+        """按名称和SQL片段过滤条件树，只调整可见性发生变化的节点"""
+        self._search_after_id = None
+        index = self._search_index
+        visible = index.visible(self.search_var.get().lower())
+        detached = index.detached(visible)
+
+        # 子节点的摘挂状态有变化的父节点，用一次 set_children 重排它的子节点
+        changed = detached ^ self._detached_items
+        for parent in {index.parent[item] for item in changed}:
+            self.condition_tree.set_children(
+                parent, *[child for child in index.children[parent] if child not in detached])
+
+        # 开始搜索时展开匹配路径上的组，之后只展开重新出现的组
+        if visible is not None:
+            previous = self._visible_items
+            for item in visible:
+                if item in index.groups and (previous is None or item not in previous):
+                    self.condition_tree.item(item, open=True)
+
+        self._visible_items = visible
+        self._detached_items = detached
 
     def move_up(self):
         """上移选中的条件"""
@@ -2,15 +2,21 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
 from ...services.data_transfer_service import DataTransferService
+from ...services.task_executor import TaskExecutor
 
 class DataTransferDialog(tk.Toplevel):
     def __init__(self, parent, repository):
         super().__init__(parent)
         self.repository = repository
         self.transfer_service = DataTransferService(repository)
+        # 导入导出在后台线程执行，窗口在此期间保持响应
+        self.executor = TaskExecutor(self, release=repository.release_thread_connection)
+        self.task = None
+        self.closing = False
+        self.problems = []  # 当前任务已报告的问题
         
         self.title("数据导入导出")
-        self.geometry("400x300")
+        self.geometry("480x360")
         self.resizable(False, False)
         
         # 设置模态
@@ -18,6 +24,7 @@ class DataTransferDialog(tk.Toplevel):
         self.grab_set()
         
         self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # 窗口居中
         self.update_idletasks()
@@ -41,6 +48,19 @@ class DataTransferDialog(tk.Toplevel):
         export_frame = ttk.Frame(notebook)
         notebook.add(export_frame, text="导出")
         self.setup_export_frame(export_frame)
+        
+        # 进度区域
+        progress_frame = ttk.Frame(self)
+        progress_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate')
+        self.progress_bar.pack(fill=tk.X)
+        self.cancel_button = ttk.Button(progress_frame, text="取消", state='disabled',
+                                        command=self.cancel_task)
+        self.cancel_button.pack(side=tk.RIGHT, pady=(5, 0))
+        self.status_var = tk.StringVar()
+        ttk.Label(progress_frame, textvariable=self.status_var).pack(
+            side=tk.LEFT, fill=tk.X, expand=True, pady=(5, 0))
 
     def setup_import_frame(self, parent):
         # 文件类型选择
@@ -50,6 +70,8 @@ class DataTransferDialog(tk.Toplevel):
         self.import_type_var = tk.StringVar(value="excel")
         ttk.Radiobutton(file_type_frame, text="Excel文件", 
                        variable=self.import_type_var, value="excel").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(file_type_frame, text="CSV文件", 
+                       variable=self.import_type_var, value="csv").pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(file_type_frame, text="SQLite数据库", 
                        variable=self.import_type_var, value="sqlite").pack(side=tk.LEFT, padx=5)
         
@@ -66,7 +88,8 @@ class DataTransferDialog(tk.Toplevel):
                        variable=self.conflict_strategy_var, value="rename").pack(anchor=tk.W, padx=5)
         
         # 导入按钮
-        ttk.Button(parent, text="选择文件并导入", command=self.import_data).pack(pady=10)
+        self.import_button = ttk.Button(parent, text="选择文件并导入", command=self.import_data)
+        self.import_button.pack(pady=10)
 
     def setup_export_frame(self, parent):
         # 文件类型选择
@@ -76,11 +99,16 @@ class DataTransferDialog(tk.Toplevel):
         self.export_type_var = tk.StringVar(value="excel")
         ttk.Radiobutton(file_type_frame, text="Excel文件", 
                        variable=self.export_type_var, value="excel").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(file_type_frame, text="CSV文件", 
+                       variable=self.export_type_var, value="csv").pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(file_type_frame, text="JSON Lines", 
+                       variable=self.export_type_var, value="jsonl").pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(file_type_frame, text="SQLite数据库", 
                        variable=self.export_type_var, value="sqlite").pack(side=tk.LEFT, padx=5)
         
         # 导出按钮
-        ttk.Button(parent, text="选择位置并导出", command=self.export_data).pack(pady=10)
+        self.export_button = ttk.Button(parent, text="选择位置并导出", command=self.export_data)
+        self.export_button.pack(pady=10)
 
     def import_data(self):
         file_type = self.import_type_var.get()
@@ -89,6 +117,9 @@ class DataTransferDialog(tk.Toplevel):
         if file_type == "excel":
             filetypes = [("Excel文件", "*.xlsx *.xls")]
             default_ext = ".xlsx"
+        elif file_type == "csv":
+            filetypes = [("CSV文件", "*.csv *.tsv")]
+            default_ext = ".csv"
         else:  # sqlite
             filetypes = [("SQLite数据库", "*.db *.sqlite")]
             default_ext = ".db"
@@ -102,41 +133,54 @@ class DataTransferDialog(tk.Toplevel):
         if not filepath:
             return
             
-        try:
+        service = self.transfer_service
+        
+        def job(context):
             if file_type == "excel":
-                success_count, errors = self.transfer_service.import_from_excel(
-                    filepath, strategy)
+                return service.import_from_excel(
+                    filepath, strategy, context.progress, context.partial)
+            elif file_type == "csv":
+                return service.import_from_csv(
+                    filepath, strategy, context.progress, context.partial)
             else:
-                success_count, errors = self.transfer_service.import_from_sqlite(
-                    filepath, strategy)
-            
-            # 显示结果
-            message = f"成功导入 {success_count} 个标签。"
-            if errors:
-                message += f"\n\n出现以下问题：\n" + "\n".join(errors)
-            
-            messagebox.showinfo("导入结果", message)
-            
-            # 刷新标签组树形结构
-            main_window = self
-            while main_window and not hasattr(main_window, 'tag_editor_frame'):
-                main_window = main_window.master
-            
-            if main_window and hasattr(main_window, 'tag_editor_frame'):
-                main_window.tag_editor_frame.load_groups()
-            
-            # 刷新SQL构建器
-            main_window = self
-            while main_window and not hasattr(main_window, 'sql_builder_frame'):
-                main_window = main_window.master
-            
-            if main_window and hasattr(main_window, 'sql_builder_frame'):
-                main_window.sql_builder_frame._cached_groups = None
-                main_window.sql_builder_frame._cached_fields = {}
-                main_window.sql_builder_frame.load_tables()
-            
-        except Exception as e:
-            messagebox.showerror("导入错误", f"导入过程中出现错误：{str(e)}")
+                return service.import_from_sqlite(filepath, strategy, context.progress)
+        
+        # 导入会写库，与其他写任务串行执行
+        self.start_task(job, "正在导入", self.on_import_done, self.on_import_error,
+                        lock=self.repository.write_lock)
+    
+    def on_import_done(self, result):
+        success_count, errors = result
+        self.finish_task(f"导入完成，成功 {success_count} 个")
+        
+        # 显示结果
+        message = f"成功导入 {success_count} 个标签。"
+        if errors:
+            message += f"\n\n出现以下问题：\n" + "\n".join(errors)
+        
+        messagebox.showinfo("导入结果", message)
+        
+        # 刷新标签组树形结构
+        main_window = self
+        while main_window and not hasattr(main_window, 'tag_editor_frame'):
+            main_window = main_window.master
+        
+        if main_window and hasattr(main_window, 'tag_editor_frame'):
+            main_window.tag_editor_frame.load_groups()
+        
+        # 刷新SQL构建器
+        main_window = self
+        while main_window and not hasattr(main_window, 'sql_builder_frame'):
+            main_window = main_window.master
+        
+        if main_window and hasattr(main_window, 'sql_builder_frame'):
+            main_window.sql_builder_frame._cached_groups = None
+            main_window.sql_builder_frame._cached_fields = {}
+            main_window.sql_builder_frame.load_tables()
+
+    def on_import_error(self, error):
+        self.finish_task("导入失败")
+        messagebox.showerror("导入错误", f"导入过程中出现错误：{str(error)}")
 
     def export_data(self):
         file_type = self.export_type_var.get()
@@ -144,6 +188,12 @@ class DataTransferDialog(tk.Toplevel):
         if file_type == "excel":
             filetypes = [("Excel文件", "*.xlsx")]
             default_ext = ".xlsx"
+        elif file_type == "csv":
+            filetypes = [("CSV文件", "*.csv")]
+            default_ext = ".csv"
+        elif file_type == "jsonl":
+            filetypes = [("JSON Lines文件", "*.jsonl")]
+            default_ext = ".jsonl"
         else:  # sqlite
             filetypes = [("SQLite数据库", "*.db")]
             default_ext = ".db"
@@ -157,39 +207,116 @@ class DataTransferDialog(tk.Toplevel):
         if not filepath:
             return
             
-        try:
-            # 检查文件是否已存在且能否写入
-            if os.path.exists(filepath):
-                try:
-                    # 尝试打开文件进行写入测试
-                    with open(filepath, 'a') as f:
-                        pass
-                except PermissionError:
-                    messagebox.showerror(
-                        "导出错误",
-                        "无法写入文件，可能是文件正在被其他程序使用。\n"
-                        "请关闭可能正在使用该文件的程序（如Excel）后重试。"
-                    )
-                    return
-                except Exception as e:
-                    messagebox.showerror("导出错误", f"文件访问错误：{str(e)}")
-                    return
-            
-            # 执行导出
-            if file_type == "excel":
-                self.transfer_service.export_to_excel(filepath)
-            else:
-                self.transfer_service.export_to_sqlite(filepath)
-            
-            # 导出成功后询问是否打开文件
-            if messagebox.askyesno("导出成功", "数据已成功导出！是否打开文件？"):
-                os.startfile(filepath)
-            
-        except PermissionError:
+        # 检查文件是否已存在且能否写入
+        if os.path.exists(filepath):
+            try:
+                # 尝试打开文件进行写入测试
+                with open(filepath, 'a') as f:
+                    pass
+            except PermissionError:
+                messagebox.showerror(
+                    "导出错误",
+                    "无法写入文件，可能是文件正在被其他程序使用。\n"
+                    "请关闭可能正在使用该文件的程序（如Excel）后重试。"
+                )
+                return
+            except Exception as e:
+                messagebox.showerror("导出错误", f"文件访问错误：{str(e)}")
+                return
+        
+        export = {
+            "excel": self.transfer_service.export_to_excel,
+            "csv": self.transfer_service.export_to_csv,
+            "jsonl": self.transfer_service.export_to_jsonl,
+        }.get(file_type, self.transfer_service.export_to_sqlite)
+        
+        # 导出只读数据库，不需要等待写任务
+        self.start_task(lambda context: export(filepath, context.progress), "正在导出",
+                        lambda result: self.on_export_done(filepath),
+                        self.on_export_error,
+                        on_cancelled=lambda: self.remove_partial_file(filepath))
+    
+    def on_export_done(self, filepath):
+        self.finish_task("导出完成")
+        # 导出成功后询问是否打开文件
+        if messagebox.askyesno("导出成功", "数据已成功导出！是否打开文件？"):
+            os.startfile(filepath)
+    
+    def on_export_error(self, error):
+        self.finish_task("导出失败")
+        if isinstance(error, PermissionError):
             messagebox.showerror(
                 "导出错误",
                 "无法写入文件，可能是文件正在被其他程序使用。\n"
                 "请关闭可能正在使用该文件的程序（如Excel）后重试。"
             )
-        except Exception as e:
-            messagebox.showerror("导出错误", f"导出过程中出现错误：{str(e)}")
+        else:
+            messagebox.showerror("导出错误", f"导出过程中出现错误：{str(error)}")
+    
+    def remove_partial_file(self, filepath):
+        """取消导出后删除写了一半的文件"""
+        try:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+        except OSError:
+            pass
+    
+    # ---- 后台任务 ----
+    
+    def start_task(self, job, action, on_done, on_error, on_cancelled=None, lock=None):
+        """在后台执行 job(context)，期间禁用导入导出按钮并显示进度"""
+        self.problems = []
+        self.import_button.configure(state='disabled')
+        self.export_button.configure(state='disabled')
+        self.cancel_button.configure(state='normal')
+        self.progress_bar.configure(mode='indeterminate', value=0)
+        self.progress_bar.start()
+        self.status_var.set(f"{action}...")
+        
+        def on_progress(done, total):
+            if total:
+                self.progress_bar.stop()
+                self.progress_bar.configure(mode='determinate', maximum=total, value=done)
+                self.status_var.set(f"{action}... {done}/{total}")
+            else:
+                self.status_var.set(f"{action}... 已处理 {done} 行")
+            if self.problems:
+                self.status_var.set(self.status_var.get() + f"，{len(self.problems)} 个问题")
+        
+        def cancelled():
+            self.finish_task("已取消")
+            if on_cancelled:
+                on_cancelled()
+        
+        self.task = self.executor.submit(
+            job, on_progress=on_progress, on_partial=self.problems.extend,
+            on_done=on_done, on_error=on_error, on_cancelled=cancelled, lock=lock)
+    
+    def finish_task(self, status):
+        self.task = None
+        self.progress_bar.stop()
+        self.progress_bar.configure(mode='determinate', value=0)
+        self.import_button.configure(state='normal')
+        self.export_button.configure(state='normal')
+        self.cancel_button.configure(state='disabled')
+        self.status_var.set(status)
+        if self.closing:
+            self.destroy()
+    
+    def cancel_task(self):
+        if self.task:
+            self.task.cancel()
+            self.cancel_button.configure(state='disabled')
+            self.status_var.set("正在取消...")
+    
+    def on_close(self):
+        """任务进行中关闭窗口时先取消任务，任务结束后再关闭"""
+        if self.task:
+            self.closing = True
+            self.cancel_task()
+        else:
+            self.destroy()
+    
+    def destroy(self):
+        self.executor.shutdown()
+        super().destroy()
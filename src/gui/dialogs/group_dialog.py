@@ -148,7 +148,8 @@ class GroupDialog(tk.Toplevel):
                 description=description,
                 parent_group_id=parent_id
             )
-            self.result = self.repository.save_group(group)
+            with self.repository.try_write():
+                self.result = self.repository.save_group(group)
             # print("=== 创建成功 ===\n")
             self.destroy()
             
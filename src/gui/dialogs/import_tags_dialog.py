@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd  # 直接导入，依赖会在打包时包含
+from ...services.table_reader import open_table
+from ...services.task_executor import TaskExecutor
 
 class ImportTagsDialog(tk.Toplevel):
     def __init__(self, parent, repository, group_id):
@@ -9,6 +10,9 @@ class ImportTagsDialog(tk.Toplevel):
         self.repository = repository
         self.group_id = group_id
         self.group = repository.find_group_by_id(group_id)
+        # 写入在后台线程执行，导入大量标签时窗口保持响应
+        self.executor = TaskExecutor(self, release=repository.release_thread_connection)
+        self.task = None
         
         # 设置窗口大小和位置
         self.geometry("500x400")
@@ -23,6 +27,7 @@ class ImportTagsDialog(tk.Toplevel):
         self.center_window()
         
         self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
     
     def center_window(self):
         """将窗口居中显示"""
@@ -69,15 +74,18 @@ class ImportTagsDialog(tk.Toplevel):
         btn_frame = ttk.Frame(self)
         btn_frame.pack(fill=tk.X, padx=10, pady=5)
         
-        ttk.Button(btn_frame, text="导入", 
-                  command=self.import_tags).pack(side=tk.RIGHT, padx=5)
+        self.import_button = ttk.Button(btn_frame, text="导入", 
+                                        command=self.import_tags)
+        self.import_button.pack(side=tk.RIGHT, padx=5)
         ttk.Button(btn_frame, text="取消", 
-                  command=self.destroy).pack(side=tk.RIGHT)
+                  command=self.cancel).pack(side=tk.RIGHT)
+        self.progress_bar = ttk.Progressbar(btn_frame, mode='determinate')
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
     
     def select_file(self):
         file_path = filedialog.askopenfilename(
             title="选择Excel文件",
-            filetypes=[("Excel files", "*.xlsx *.xls")]
+            filetypes=[("Excel files", "*.xlsx *.xls"), ("CSV files", "*.csv *.tsv")]
         )
         if file_path:
             self.file_path_var.set(file_path)
@@ -88,27 +96,30 @@ class ImportTagsDialog(tk.Toplevel):
             # 清空现有数据
             self.preview_tree.delete(*self.preview_tree.get_children())
             
-            # 读取Excel文件
-            df = pd.read_excel(file_path)
-            
-            # 检查必需的列
-            required_columns = ["字段名", "SQL片段"]
-            missing_columns = [col for col in required_columns 
-                             if col not in df.columns]
-            
-            if missing_columns:
-                messagebox.showerror("错误", 
-                                   f"Excel文件缺少必需的列：{', '.join(missing_columns)}")
-                return
-            
-            # 添加数据到预览表格
-            for _, row in df.iterrows():
-                values = (
-                    row["字段名"],
-                    row["SQL片段"],
-                    row.get("描述", "")  # 描述列是可选的
-                )
-                self.preview_tree.insert("", tk.END, values=values)
+            # 逐行读取文件，不整表载入内存
+            columns, rows = open_table(file_path)
+            try:
+                
+                # 检查必需的列
+                required_columns = ["字段名", "SQL片段"]
+                missing_columns = [col for col in required_columns 
+                                 if col not in columns]
+                
+                if missing_columns:
+                    messagebox.showerror("错误", 
+                                       f"Excel文件缺少必需的列：{', '.join(missing_columns)}")
+                    return
+                
+                # 添加数据到预览表格
+                for row in rows:
+                    values = (
+                        row["字段名"],
+                        row["SQL片段"],
+                        row.get("描述", "")  # 描述列是可选的
+                    )
+                    self.preview_tree.insert("", tk.END, values=values)
+            finally:
+                rows.close()
                 
         except Exception as e:
             messagebox.showerror("错误", f"加载文件失败：{str(e)}")
@@ -130,69 +141,109 @@ class ImportTagsDialog(tk.Toplevel):
             existing_tags = {tag.tag_name: tag for tag in 
                             self.repository.find_tags_by_group(self.group_id)}
             
-            # 导入标签
-            success_count = 0
+            # 先在界面线程中确认冲突，再把要写入的标签交给后台任务
+            rows = []
             update_count = 0
-            error_count = 0
-            error_messages = []
-            
             for item in self.preview_tree.get_children():
                 values = self.preview_tree.item(item)['values']
                 tag_name, sql_fragment, description = values
                 
-                try:
-                    if tag_name in existing_tags:
-                        # 如果标签已存在，询问是否替换
-                        if messagebox.askyesno("确认", 
-                            f"标签 '{tag_name}' 已存在，是否替换？\n\n" +
-                            f"原SQL片段: {existing_tags[tag_name].sql_fragment}\n" +
-                            f"新SQL片段: {sql_fragment}"):
-                            update_count += 1
-                        else:
-                            continue
-                    
-                    self.repository.save(
-                        tag_name=tag_name,
-                        sql_fragment=sql_fragment,
-                        description=description,
-                        group_id=self.group_id,
-                        tag_type=tag_type
-                    )
-                    success_count += 1
-                    
-                except Exception as e:
-                    error_count += 1
-                    error_messages.append(f"导入标签 '{tag_name}' 失败：{str(e)}")
-                    print(f"导入标签 '{tag_name}' 失败：{str(e)}")
-            
-            # 显示导入结果
-            result_message = f"导入完成：\n\n" + \
-                            f"成功导入：{success_count} 个\n" + \
-                            f"更新替换：{update_count} 个\n"
-            
-            if error_count > 0:
-                result_message += f"导入失败：{error_count} 个\n\n" + \
-                                "失败详情：\n" + \
-                                "\n".join(error_messages[:5])
-                if len(error_messages) > 5:
-                    result_message += f"\n... 等共 {len(error_messages)} 个错误"
-                messagebox.showwarning("导入结果", result_message)
-            else:
-                messagebox.showinfo("导入结果", result_message)
-            
-            # 通知父窗口刷新
-            if hasattr(self.master, 'load_tags'):
-                self.master.load_tags(self.group_id)
-            
-            # 查找并刷新 SQL构建器
-            main_window = self.master
-            while main_window and not hasattr(main_window, 'sql_builder_frame'):
-                main_window = main_window.master
-            
-            if main_window and hasattr(main_window, 'sql_builder_frame'):
-                main_window.sql_builder_frame.refresh_fields()
-            
-            self.destroy()
+                if tag_name in existing_tags:
+                    # 如果标签已存在，询问是否替换
+                    if messagebox.askyesno("确认", 
+                        f"标签 '{tag_name}' 已存在，是否替换？\n\n" +
+                        f"原SQL片段: {existing_tags[tag_name].sql_fragment}\n" +
+                        f"新SQL片段: {sql_fragment}"):
+                        update_count += 1
+                    else:
+                        continue
+                rows.append((tag_name, sql_fragment, description))
             
         except Exception as e:
-            messagebox.showerror("错误", f"导入失败：{str(e)}") 
\ No newline at end of file
+            messagebox.showerror("错误", f"导入失败：{str(e)}")
+            return
+        
+        repository = self.repository
+        group_id = self.group_id
+        
+        def job(context):
+            """在一个事务中写入，取消时整体回滚"""
+            success_count = 0
+            error_messages = []
+            with repository.transaction():
+                for i, (tag_name, sql_fragment, description) in enumerate(rows):
+                    context.progress(i, len(rows))
+                    try:
+                        repository.save(
+                            tag_name=tag_name,
+                            sql_fragment=sql_fragment,
+                            description=description,
+                            group_id=group_id,
+                            tag_type=tag_type
+                        )
+                        success_count += 1
+                    except Exception as e:
+                        error_messages.append(f"导入标签 '{tag_name}' 失败：{str(e)}")
+                        print(f"导入标签 '{tag_name}' 失败：{str(e)}")
+            return success_count, error_messages
+        
+        self.import_button.configure(state='disabled')
+        self.progress_bar.configure(maximum=max(len(rows), 1), value=0)
+        self.task = self.executor.submit(
+            job,
+            on_progress=lambda done, total: self.progress_bar.configure(value=done),
+            on_done=lambda result: self.on_import_done(*result, update_count),
+            on_error=self.on_import_error,
+            on_cancelled=self.destroy,
+            lock=self.repository.write_lock
+        )
+    
+    def on_import_done(self, success_count, error_messages, update_count):
+        self.task = None
+        error_count = len(error_messages)
+        
+        # 显示导入结果
+        result_message = f"导入完成：\n\n" + \
+                        f"成功导入：{success_count} 个\n" + \
+                        f"更新替换：{update_count} 个\n"
+        
+        if error_count > 0:
+            result_message += f"导入失败：{error_count} 个\n\n" + \
+                            "失败详情：\n" + \
+                            "\n".join(error_messages[:5])
+            if len(error_messages) > 5:
+                result_message += f"\n... 等共 {len(error_messages)} 个错误"
+            messagebox.showwarning("导入结果", result_message)
+        else:
+            messagebox.showinfo("导入结果", result_message)
+        
+        # 通知父窗口刷新
+        if hasattr(self.master, 'load_tags'):
+            self.master.load_tags(self.group_id)
+        
+        # 查找并刷新 SQL构建器
+        main_window = self.master
+        while main_window and not hasattr(main_window, 'sql_builder_frame'):
+            main_window = main_window.master
+        
+        if main_window and hasattr(main_window, 'sql_builder_frame'):
+            main_window.sql_builder_frame.refresh_fields()
+        
+        self.destroy()
+    
+    def on_import_error(self, error):
+        self.task = None
+        self.import_button.configure(state='normal')
+        self.progress_bar.configure(value=0)
+        messagebox.showerror("错误", f"导入失败：{str(error)}")
+    
+    def cancel(self):
+        """导入进行中时取消并回滚，任务结束后关闭窗口"""
+        if self.task:
+            self.task.cancel()
+        else:
+            self.destroy()
+    
+    def destroy(self):
+        self.executor.shutdown()
+        super().destroy()
\ No newline at end of file
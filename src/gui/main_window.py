@@ -1,10 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from ttkthemes import ThemedStyle
 from src.gui.tag_editor import TagEditorFrame
 from .sql_builder_frame import SqlBuilderFrame
 from ..repositories.sql_tag_repository import SqlTagRepository
-from .dialogs.data_transfer_dialog import DataTransferDialog
+from ..utils.startup_profile import profiler
 import traceback
 import json
 import os
@@ -24,30 +23,34 @@ class MainWindow(tk.Tk):
         self.geometry(f"{window_width}x{window_height}+{x}+{y}")
         
         # 初始化数据库
-        self.repository = SqlTagRepository("sql_tags.db")
+        with profiler.phase("打开数据库"):
+            self.repository = SqlTagRepository("sql_tags.db")
         
         # 加载主题设置
         self.config_file = "theme_config.json"
         self.current_theme = self.load_theme_config()
         
+        self.setup_ui()
+        
+        # 默认数据不在启动路径上检查，窗口显示之后再进行
+        self.after_idle(self.check_default_data)
+
+    def check_default_data(self):
+        """数据库中没有任何组时创建默认数据"""
         try:
-            # 检查是否需要创建默认数据
             groups = self.repository.find_all_groups()
             if not groups:
-                self.create_default_data()
+                with self.repository.try_write():
+                    self.create_default_data()
         except Exception as e:
             messagebox.showerror("错误", f"初始化数据库失败：{str(e)}")
-        
-        self.setup_ui()
 
     def setup_ui(self):
-        # 设置主题样式
-        self.style = ThemedStyle(self)
-        self.available_themes = sorted([
-            theme for theme in self.style.get_themes()
-            if theme not in ['vista', 'xpnative', 'winnative']  # 排除原生主题
-        ])
-        self.apply_theme(self.current_theme)
+        # 设置主题样式；ttk 自带的主题不需要加载 ttkthemes
+        with profiler.phase("应用主题"):
+            self.style = ttk.Style(self)
+            self.available_themes = None  # 第一次打开主题菜单时再列出
+            self.apply_theme(self.current_theme)
         
         # 创建主框架
         main_frame = ttk.Frame(self)
@@ -61,12 +64,14 @@ class MainWindow(tk.Tk):
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
         # 创建SQL构建器选项卡
-        self.sql_builder_frame = SqlBuilderFrame(self.notebook, self.repository)
-        self.notebook.add(self.sql_builder_frame, text="SQL构建")
+        with profiler.phase("创建SQL构建页"):
+            self.sql_builder_frame = SqlBuilderFrame(self.notebook, self.repository)
+            self.notebook.add(self.sql_builder_frame, text="SQL构建")
         
         # 创建标签管理选项卡
-        self.tag_editor_frame = TagEditorFrame(self.notebook, self.repository)
-        self.notebook.add(self.tag_editor_frame, text="标签管理")
+        with profiler.phase("创建标签管理页"):
+            self.tag_editor_frame = TagEditorFrame(self.notebook, self.repository)
+            self.notebook.add(self.tag_editor_frame, text="标签管理")
         
         # 绑定选项卡切换事件
         self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
@@ -92,20 +97,34 @@ class MainWindow(tk.Tk):
         backup_menu.add_separator()
         backup_menu.add_command(label="退出", command=self.quit)
         
-        # 主题菜单
-        theme_menu = tk.Menu(menubar, tearoff=0)
-        menubar.add_cascade(label="主题", menu=theme_menu)
-        
-        # 添加主题选项
+        # 主题菜单，第一次打开时才加载 ttkthemes 并列出主题
+        self.theme_menu = tk.Menu(menubar, tearoff=0, postcommand=self.fill_theme_menu)
+        menubar.add_cascade(label="主题", menu=self.theme_menu)
         self.theme_var = tk.StringVar(value=self.current_theme)
+
+    def fill_theme_menu(self):
+        """添加主题选项"""
+        if self.available_themes is not None:
+            return
+        self.load_themed_style()
+        self.available_themes = sorted([
+            theme for theme in self.style.get_themes()
+            if theme not in ['vista', 'xpnative', 'winnative']  # 排除原生主题
+        ])
         for theme in self.available_themes:
-            theme_menu.add_radiobutton(
+            self.theme_menu.add_radiobutton(
                 label=theme,
                 value=theme,
                 variable=self.theme_var,
                 command=lambda t=theme: self.change_theme(t)
             )
 
+    def load_themed_style(self):
+        """换用 ttkthemes 的样式对象，它能设置 ttk 自带主题之外的主题"""
+        if not hasattr(self.style, 'set_theme'):
+            from ttkthemes import ThemedStyle
+            self.style = ThemedStyle(self)
+
     def load_theme_config(self):
         """加载主题配置"""
         try:
@@ -129,7 +148,11 @@ class MainWindow(tk.Tk):
         """应用主题"""
         # 只在主题实际改变时才应用
         if not hasattr(self, '_current_applied_theme') or self._current_applied_theme != theme_name:
-            self.style.set_theme(theme_name)
+            if theme_name in self.style.theme_names():
+                self.style.theme_use(theme_name)
+            else:
+                self.load_themed_style()
+                self.style.set_theme(theme_name)
             self._current_applied_theme = theme_name
             
             # 配置字体 - 使用统一的字体配置
@@ -241,10 +264,13 @@ class MainWindow(tk.Tk):
             messagebox.showerror("错误", f"创建默认数据失败：{str(e)}")
 
     def show_data_transfer_dialog(self):
+        from .dialogs.data_transfer_dialog import DataTransferDialog
         DataTransferDialog(self, self.repository)
 
     def run(self):
-        self.mainloop() 
+        self.mainloop()
+        # 窗口关闭后释放数据库连接
+        self.repository.close()
 
     def refresh_sql_builder(self):
         """刷新SQL构建器"""
@@ -2,13 +2,10 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from src.models.sql_tag import SqlTag
 from src.services.sql_builder import SqlBuilder
-from src.gui.dialogs.sql_edit_dialog import SqlEditDialog
-from src.gui.dialogs.condition_dialog import ConditionDialog
-from src.gui.dialogs.order_by_dialog import OrderByDialog
-from src.gui.dialogs.group_by_dialog import GroupByDialog
-from src.gui.dialogs.field_values_dialog import FieldValuesDialog
-from src.gui.dialogs.create_table_dialog import CreateTableDialog
+from src.services.sql_preview import SqlPreview
+from src.gui.virtual_check_list import VirtualCheckList
 from src.services.sql_validator import SqlValidator
+from src.services.task_executor import TaskExecutor
 import traceback
 
 class SqlBuilderFrame(ttk.Frame):
@@ -16,6 +13,11 @@ class SqlBuilderFrame(ttk.Frame):
         super().__init__(parent)
         self.repository = repository
         self.sql_builder = SqlBuilder(repository)
+        self._preview = SqlPreview(self.sql_builder)  # 按子句增量渲染预览
+        self._preview_after_id = None  # 合并同一轮事件里的预览刷新
+        # 保存等写库操作在后台执行
+        self.executor = TaskExecutor(self, max_workers=1,
+                                     release=repository.release_thread_connection)
         self.table_groups = {}  # 初始化 table_groups 字典
         self.display_to_real_names = {}  # 显示名称到实际名称的映射
         self._cached_fields = {}  # 字段缓存
@@ -23,7 +25,8 @@ class SqlBuilderFrame(ttk.Frame):
         self._skip_default_select_all = False
         self._last_search_text = ""
         self._search_after_id = None  # 用于延迟搜索
-        self.field_vars = {}  # 初始化字段变量字典
+        self.field_vars = {}  # 字段名 -> {'sql', 'index'}，选中状态保存在 field_list 中
+        self._field_names = []  # 按行索引排列的字段名
         self.field_types = {}  # 初始化字段类型字典
         self.setup_ui()
         self.load_tables()  # 添加初始加载表名
@@ -71,25 +74,9 @@ class SqlBuilderFrame(ttk.Frame):
         ttk.Entry(search_frame, textvariable=self.field_search_var).pack(
             side=tk.LEFT, fill=tk.X, expand=True)
         
-        # 创建带滚动条的画布
-        canvas_frame = ttk.Frame(field_frame)
-        canvas_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=2)
-        
-        self.field_canvas = tk.Canvas(canvas_frame)
-        scrollbar = ttk.Scrollbar(canvas_frame, orient="vertical",
-                                command=self.field_canvas.yview)
-        
-        self.field_canvas.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.field_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        # 创建字段复选框容器
-        self.field_checkbox_frame = ttk.Frame(self.field_canvas)
-        self.field_canvas.create_window((0, 0), window=self.field_checkbox_frame, anchor=tk.NW)
-        
-        # 绑定画布大小调整事件
-        self.field_checkbox_frame.bind('<Configure>', 
-            lambda e: self.field_canvas.configure(scrollregion=self.field_canvas.bbox("all")))
+        # 字段复选框列表，只为可见的行创建控件
+        self.field_list = VirtualCheckList(field_frame, command=self._on_field_toggle)
+        self.field_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=2)
         
         # 字段操作区域
         self.field_values_frame = ttk.Frame(left_frame)
@@ -186,25 +173,25 @@ class SqlBuilderFrame(ttk.Frame):
         # 更新界面显示
         if sql_type == "SELECT":
             self.select_all_var.set(True)
-            self.field_checkbox_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+            self.field_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=2)
             self.condition_frame.pack(fill=tk.X, pady=5)
             self.sort_group_frame.pack(fill=tk.X, pady=5)
             self.field_values_frame.pack_forget()
         elif sql_type in ["INSERT", "UPDATE"]:
             self.select_all_var.set(False)
-            self.field_checkbox_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+            self.field_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=2)
             self.condition_frame.pack_forget()
             self.sort_group_frame.pack_forget()
             self.field_values_frame.pack(fill=tk.X, pady=5)
         elif sql_type == "DELETE":
             self.select_all_var.set(False)
-            self.field_checkbox_frame.pack_forget()
+            self.field_list.pack_forget()
             self.condition_frame.pack(fill=tk.X, pady=5)
             self.sort_group_frame.pack_forget()
             self.field_values_frame.pack_forget()
         elif sql_type == "CREATE":
             self.select_all_var.set(False)
-            self.field_checkbox_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+            self.field_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=2)
             self.condition_frame.pack_forget()
             self.sort_group_frame.pack_forget()
             self.field_values_frame.pack_forget()
@@ -265,10 +252,9 @@ class SqlBuilderFrame(ttk.Frame):
     def update_field_checkboxes(self, tags):
         """更新字段复选框"""
         # 清除现有的字段
-        for widget in self.field_checkbox_frame.winfo_children():
-            widget.destroy()
-        
         self.field_vars = {}
+        self._field_names = []
+        self.field_list.set_items([])
         
         # 获取当前组
         display_table_name = self.table_combobox.get()
@@ -286,34 +272,22 @@ class SqlBuilderFrame(ttk.Frame):
             # 隐藏全选复选框
             self.select_all_cb.pack_forget()
         
-        # 添加字段复选框
+        # 添加字段，列表只为可见的行创建复选框
+        labels = []
         for i, tag in enumerate(tags):
-            var = tk.BooleanVar(value=False)  # 默认不选中
-            if group.group_type == 'table':
-                # 表名组：根据全选状态
-                var.set(self.select_all_var.get())
-            else:
-                # 非表名组：只选中第一个
-                var.set(i == 0)
-            
-            cb = ttk.Checkbutton(
-                self.field_checkbox_frame,
-                text=f"{tag.tag_name} ({tag.description})" if tag.description else tag.tag_name,
-                variable=var,
-                command=lambda idx=i, group_type=group.group_type: self.on_field_selection_change(idx, group_type)
-            )
-            cb.pack(fill=tk.X)
-            
+            labels.append(f"{tag.tag_name} ({tag.description})" if tag.description else tag.tag_name)
+            self._field_names.append(tag.tag_name)
             self.field_vars[tag.tag_name] = {
-                'var': var,
-                'widget': cb,
                 'sql': tag.sql_fragment,
                 'index': i
             }
         
-        # 更新画布滚动区域
-        self.field_checkbox_frame.update_idletasks()
-        self.field_canvas.configure(scrollregion=self.field_canvas.bbox("all"))
+        if group.group_type == 'table':
+            # 表名组：根据全选状态
+            self.field_list.set_items(labels, self.select_all_var.get())
+        else:
+            # 非表名组：只选中第一个
+            self.field_list.set_items(labels, (i == 0 for i in range(len(labels))))
         
         # 重置搜索
         self.field_search_var.set("")
@@ -322,6 +296,17 @@ class SqlBuilderFrame(ttk.Frame):
         # 更新预览
         self.update_preview()
 
+    def _on_field_toggle(self, index):
+        """字段列表中某一行被勾选或取消"""
+        group = self.table_groups.get(self.table_combobox.get())
+        self.on_field_selection_change(index, group.group_type if group else None)
+
+    def _selected_field_names(self):
+        """按字段顺序返回选中的字段名"""
+        is_selected = self.field_list.is_selected
+        return [name for name, field_data in self.field_vars.items()
+                if is_selected(field_data['index'])]
+
     def on_field_selection_change(self, index=None, group_type=None):
         """当字段选择改变时更新全选状态"""
         # 获取当前组
@@ -333,10 +318,7 @@ class SqlBuilderFrame(ttk.Frame):
         
         if group.group_type == 'table':
             # 表名组：更新全选状态
-            all_selected = all(
-                field_data['var'].get() 
-                for field_data in self.field_vars.values()
-            )
+            all_selected = self.field_list.all_selected()
             
             # 更新全选复选框状态
             if self.select_all_var is not None:
@@ -347,7 +329,7 @@ class SqlBuilderFrame(ttk.Frame):
             selected_index = -1
             
             for field_name, field_data in self.field_vars.items():
-                if field_data['var'].get():
+                if self.field_list.is_selected(field_data['index']):
                     selected_count += 1
                     selected_index = field_data['index']
             
@@ -355,7 +337,7 @@ class SqlBuilderFrame(ttk.Frame):
             if selected_count > 1:
                 for field_name, field_data in self.field_vars.items():
                     if field_data['index'] != index:
-                        field_data['var'].set(False)
+                        self.field_list.set_selected(field_data['index'], False)
         
         # 更新SQL预览
         self.update_preview()
@@ -374,8 +356,7 @@ class SqlBuilderFrame(ttk.Frame):
             is_select_all = self.select_all_var.get()
             
             # 设置所有字段的选中状态
-            for field_data in self.field_vars.values():
-                field_data['var'].set(is_select_all)
+            self.field_list.set_all(is_select_all)
             
             # 更新预览
             self.update_preview()
@@ -387,6 +368,7 @@ class SqlBuilderFrame(ttk.Frame):
             existing_conditions = self.get_conditions()
             
             # 打开条件对话框
+            from src.gui.dialogs.condition_dialog import ConditionDialog
             dialog = ConditionDialog(self, self.repository)
             self.wait_window(dialog)
             
@@ -422,6 +404,7 @@ class SqlBuilderFrame(ttk.Frame):
         existing_orders = getattr(self, 'order_by_list', [])
         
         # 打开排序设置对话框
+        from src.gui.dialogs.order_by_dialog import OrderByDialog
         dialog = OrderByDialog(self, fields, existing_orders)
         self.wait_window(dialog)
         
@@ -443,6 +426,7 @@ class SqlBuilderFrame(ttk.Frame):
         aggregate_fields = getattr(self, 'aggregate_fields', {})
         
         # 打开分组设置对话框
+        from src.gui.dialogs.group_by_dialog import GroupByDialog
         dialog = GroupByDialog(self, fields, existing_groups, aggregate_fields)
         self.wait_window(dialog)
         
@@ -467,8 +451,7 @@ class SqlBuilderFrame(ttk.Frame):
             return
         
         # 取消所有字段选择
-        for field_data in self.field_vars.values():
-            field_data['var'].set(False)
+        self.field_list.set_all(False)
         
         # 取消全选
         self.select_all_var.set(False)
@@ -476,15 +459,24 @@ class SqlBuilderFrame(ttk.Frame):
         # 选中分组字段
         for field in self.group_by_list:
             if field in self.field_vars:
-                self.field_vars[field]['var'].set(True)
+                self.field_list.set_selected(self.field_vars[field]['index'], True)
         
         # 选中聚合字段（除了COUNT(*)）
         for field, func in self.aggregate_fields.items():
             if field != '*' and field in self.field_vars:
-                self.field_vars[field]['var'].set(True)
+                self.field_list.set_selected(self.field_vars[field]['index'], True)
 
     def update_preview(self):
+        """请求刷新SQL预览
+
+        勾选、全选等操作会连续触发多次请求，这里只在空闲时刷新一次。
+        """
+        if self._preview_after_id is None:
+            self._preview_after_id = self.after_idle(self._refresh_preview)
+
+    def _refresh_preview(self):
         """更新SQL预览"""
+        self._preview_after_id = None
         try:
             if not hasattr(self, 'current_table'):
                 return
@@ -492,10 +484,7 @@ class SqlBuilderFrame(ttk.Frame):
             sql_type = self.sql_type_var.get()
             
             # 获取选中的字段
-            selected_fields = []
-            for field_name, field_data in self.field_vars.items():
-                if field_data['var'].get():
-                    selected_fields.append(field_name)
+            selected_fields = self._selected_field_names()
             
             # 获取条件列表
             conditions = self.get_conditions()
@@ -503,7 +492,7 @@ class SqlBuilderFrame(ttk.Frame):
             # 根据SQL类型构建不同的参数
             if sql_type == "SELECT":
                 fields = selected_fields if selected_fields else ["*"]
-                sql = self.sql_builder.build(
+                sql = self._preview.render(
                     sql_type=sql_type,
                     table=self.current_table,
                     fields=fields,
@@ -557,7 +546,9 @@ class SqlBuilderFrame(ttk.Frame):
             else:
                 return
             
-            # 更新预览
+            # 内容没有变化时不重写文本框
+            if self.sql_preview.get('1.0', 'end-1c') == sql:
+                return
             self.sql_preview.delete('1.0', tk.END)
             self.sql_preview.insert('1.0', sql)
             
@@ -567,6 +558,7 @@ class SqlBuilderFrame(ttk.Frame):
 
     def edit_sql(self):
         # 允许直接编辑SQL
+        from src.gui.dialogs.sql_edit_dialog import SqlEditDialog
         SqlEditDialog(self, self.sql_preview.get('1.0', tk.END))
 
     def copy_sql(self):
@@ -584,13 +576,7 @@ class SqlBuilderFrame(ttk.Frame):
         group = self.table_groups[display_table_name]
         
         # 获取选中的字段
-        selected_fields = []
-        for field_name, field_data in self.field_vars.items():
-            is_selected = field_data['var'].get()
-            if is_selected:
-                selected_fields.append(field_name)
-        
-        return selected_fields
+        return self._selected_field_names()
 
     def get_conditions(self):
         """获取所有条件"""
@@ -619,49 +605,33 @@ class SqlBuilderFrame(ttk.Frame):
 
     def load_tables(self):
         """加载表名到下拉框"""
-        # 使用缓存的组信息
+        # 使用缓存的组树
         if self._cached_groups is None:
-            self._cached_groups = self.repository.find_all_groups()
-        
-        groups = self._cached_groups
+            # 下拉框只显示根组和二级组，不读取更深的层级
+            self._cached_groups = self.repository.get_group_tree(max_depth=1)
         
         # 存储要显示的表名和对应的组
         table_groups = {}
         # 存储显示名称到实际名称的映射
         display_to_real_names = {}
         
-        # 遍历所有组
-        for group in groups:
-            # 如果是根组
-            if not group.parent_group_id:
-                # 添加根组
-                table_groups[group.group_name] = group
-                display_to_real_names[group.group_name] = group.group_name
-                
-                # 获取该根组的子组（二级组）
-                child_groups = [g for g in groups if g.parent_group_id == group.id]
-                for child in child_groups:
-                    # 添加二级组，使用缩进表示层级关系
-                    display_name = f"  └─{child.group_name}"
-                    table_groups[display_name] = child
-                    display_to_real_names[display_name] = child.group_name
+        # 遍历所有根组
+        for root in self._cached_groups:
+            # 添加根组
+            table_groups[root.group.group_name] = root.group
+            display_to_real_names[root.group.group_name] = root.group.group_name
+            
+            for child in root.children:
+                # 添加二级组，使用缩进表示层级关系
+                display_name = f"  └─{child.group.group_name}"
+                table_groups[display_name] = child.group
+                display_to_real_names[display_name] = child.group.group_name
         
         # 更新下拉框和组映射
         self.table_groups = table_groups
         self.display_to_real_names = display_to_real_names
         self.table_combobox['values'] = list(table_groups.keys())
 
-    def on_frame_configure(self, event=None):
-        """当框架大小改变时调整画布滚动区域"""
-        self.field_canvas.configure(scrollregion=self.field_canvas.bbox("all"))
-
-    def on_canvas_configure(self, event):
-        """当画布大小改变时调整窗口大小"""
-        self.field_canvas.itemconfig(
-            self.canvas_window, 
-            width=event.width
-        )
-
     def on_field_search(self, *args):
         """处理字段搜索，使用防抖动"""
         if self._search_after_id:
@@ -676,25 +646,17 @@ class SqlBuilderFrame(ttk.Frame):
         
         self._last_search_text = search_text
         
-        # 获取所有字段复选框
-        for name, data in self.field_vars.items():
-            widget = data['widget']
-            if search_text in name.lower():
-                widget.pack(fill=tk.X)
-            else:
-                widget.pack_forget()
-        
-        # 更新画布滚动区域
-        self.field_checkbox_frame.update_idletasks()
-        self.field_canvas.configure(scrollregion=self.field_canvas.bbox("all"))
+        # 只显示名称包含搜索文本的字段
+        if search_text:
+            names = self._field_names
+            self.field_list.set_filter(lambda i: search_text in names[i].lower())
+        else:
+            self.field_list.set_filter(None)
 
     def edit_field_values(self):
         """编辑字段值"""
         # 获取当前选中的字段
-        selected_fields = []
-        for field_name, field_data in self.field_vars.items():
-            if field_data['var'].get():
-                selected_fields.append(field_name)
+        selected_fields = self._selected_field_names()
         
         # 如果没有选中字段，使用所有字段
         if not selected_fields:
@@ -706,6 +668,7 @@ class SqlBuilderFrame(ttk.Frame):
         
         try:
             # 打开字段值编辑对话框
+            from src.gui.dialogs.field_values_dialog import FieldValuesDialog
             dialog = FieldValuesDialog(
                 self, 
                 selected_fields, 
@@ -727,6 +690,7 @@ class SqlBuilderFrame(ttk.Frame):
 
     def edit_table_structure(self):
         """编辑表结构"""
+        from src.gui.dialogs.create_table_dialog import CreateTableDialog
         dialog = CreateTableDialog(self)
         self.wait_window(dialog)
         
@@ -795,29 +759,39 @@ class SqlBuilderFrame(ttk.Frame):
             messagebox.showwarning("警告", "没有可保存的SQL语句")
             return
         
-        try:
+        # 生成标签名（当前时间）
+        from datetime import datetime
+        now = datetime.now()
+        tag_name = now.strftime("%Y%m%d_%H%M%S")
+        
+        def job(context):
             # 获取历史标签组
             history_group = self._get_or_create_history_group()
             
-            # 生成标签名（当前时间）
-            from datetime import datetime
-            now = datetime.now()
-            tag_name = now.strftime("%Y%m%d_%H%M%S")
-            
             # 保存标签
-            self.repository.save(
+            return self.repository.save(
                 tag_name=tag_name,
                 sql_fragment=sql,
                 description=f"历史记录 - {now.strftime('%Y-%m-%d %H:%M:%S')}",
                 group_id=history_group.id,
                 tag_type='history'
             )
-            
-            messagebox.showinfo("成功", "SQL语句已保存到历史记录")
-            
-        except Exception as e:
-            traceback.print_exc()  # 打印完整错误堆栈
+        
+        def on_error(e):
+            traceback.print_exception(type(e), e, e.__traceback__)  # 打印完整错误堆栈
             messagebox.showerror("错误", f"保存失败：{str(e)}")
+        
+        # 导入等写任务进行中时排队等待，不阻塞界面
+        self.executor.submit(
+            job,
+            on_done=lambda tag: messagebox.showinfo("成功", "SQL语句已保存到历史记录"),
+            on_error=on_error,
+            lock=self.repository.write_lock
+        )
+
+    def destroy(self):
+        self.executor.shutdown()
+        super().destroy()
 
     def _get_or_create_history_group(self):
         """获取或创建历史标签组"""
@@ -857,65 +831,13 @@ class SqlBuilderFrame(ttk.Frame):
 
     def load_fields(self):
         """加载字段列表"""
-        # 清空现有字段
-        for widget in self.field_frame.winfo_children():
-            widget.destroy()
-        self.field_vars.clear()
-        
-        # 获取选中的表名
+        # 获取选中的表名对应的组
         display_table_name = self.table_combobox.get()
-        if not display_table_name or display_table_name not in self.table_groups:
-            return
-        
-        # 获取实际的表名和组
-        group = self.table_groups[display_table_name]
-        
-        # 获取该组下的所有标签
-        tags = self.repository.find_tags_by_group(group.id)
-        if not tags:
-            return
-        
-        # 只为表名组创建全选复选框
-        if group.group_type == 'table':
-            self.select_all_var = tk.BooleanVar(value=True)  # 表名组默认全选
-            select_all_cb = ttk.Checkbutton(
-                self.field_frame,
-                text="全选",
-                variable=self.select_all_var,
-                command=self.on_select_all
-            )
-            select_all_cb.pack(anchor=tk.W)
-        else:
-            # 非表名组不使用全选变量
-            self.select_all_var = None
-        
-        # 为每个标签创建复选框
-        for i, tag in enumerate(tags):
-            var = tk.BooleanVar()
-            
-            # 根据组类型和字段位置设置选中状态
-            if group.group_type == 'table':
-                # 表名组全部选中
-                var.set(True)
-            else:
-                # 非表名组只选中第一个字段
-                var.set(i == 0)
-            
-            self.field_vars[tag.tag_name] = {
-                'var': var,
-                'sql': tag.sql_fragment
-            }
-            
-            cb = ttk.Checkbutton(
-                self.field_frame,
-                text=tag.tag_name,
-                variable=var,
-                command=self.on_field_selection_change
-            )
-            cb.pack(anchor=tk.W)
+        group = self.table_groups.get(display_table_name) if display_table_name else None
         
-        # 立即更新预览
-        self.update_preview()
+        # 获取该组下的所有标签，交给字段列表显示
+        tags = self.repository.find_tags_by_group(group.id) if group else []
+        self.update_field_checkboxes(tags)
 
     def edit_condition(self, event=None):
         """编辑选中的条件"""
@@ -955,6 +877,7 @@ class SqlBuilderFrame(ttk.Frame):
                     real_index += 1
             
             # 打开条件构建对话框
+            from src.gui.dialogs.condition_dialog import ConditionDialog
             dialog = ConditionDialog(self, self.repository)
             
             # 添加所有条件到对话框
@@ -1016,8 +939,7 @@ class SqlBuilderFrame(ttk.Frame):
             self.field_values = {}
         
         # 重置字段选择
-        for field_data in self.field_vars.values():
-            field_data['var'].set(False)
+        self.field_list.set_all(False)
         
         # 重置全选状态
         if self.sql_type_var.get() == "SELECT":
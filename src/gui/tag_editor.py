@@ -2,7 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from src.models.sql_tag import SqlTag
 from src.models.tag_group import TagGroup
-from src.gui.dialogs.group_dialog import GroupDialog
+from src.repositories.sql_tag_repository import WriteBusyError
 from datetime import datetime
 
 class TagEditorFrame(ttk.Frame):
@@ -22,6 +22,7 @@ class TagEditorFrame(ttk.Frame):
         self.group_tree.pack(fill=tk.Y, expand=True)
         self.group_tree.heading('#0', text='标签组')
         self.group_tree.bind('<<TreeviewSelect>>', self.on_select_group)
+        self.group_tree.bind('<<TreeviewOpen>>', self.on_open_group)
         
         # 分组管理按钮
         group_btn_frame = ttk.Frame(group_frame)
@@ -86,9 +87,11 @@ class TagEditorFrame(ttk.Frame):
                   command=self.save_tag).pack(pady=5)
 
     def add_group(self):
+        from src.gui.dialogs.group_dialog import GroupDialog
         dialog = GroupDialog(self, self.repository)
         self.wait_window(dialog)
-        self.load_groups()
+        if dialog.result:
+            self.refresh_group_children(dialog.result.parent_group_id)
         
         # 通知主界面刷新
         main_window = self
@@ -109,9 +112,19 @@ class TagEditorFrame(ttk.Frame):
         
         group_id = self.group_tree.item(selected[0])['values'][0]
         group = self.repository.find_group_by_id(group_id)
+        old_parent_id = group.parent_group_id
+        from src.gui.dialogs.group_dialog import GroupDialog
         dialog = GroupDialog(self, self.repository, group)
         self.wait_window(dialog)
-        self.load_groups()
+        if dialog.result:
+            self.refresh_group_children(dialog.result.parent_group_id)
+            if dialog.result.parent_group_id != old_parent_id:
+                # 改挂到别的组：新父组的层级未加载时节点还在原处，直接删除
+                item = str(group_id)
+                old_parent_item = str(old_parent_id) if old_parent_id else ''
+                if self.group_tree.exists(item) and self.group_tree.parent(item) == old_parent_item:
+                    self.group_tree.delete(item)
+                self.refresh_group_children(old_parent_id)
         
         # 通知主界面刷新
         main_window = self
@@ -132,8 +145,13 @@ class TagEditorFrame(ttk.Frame):
             
         group_id = self.group_tree.item(selected[0])['values'][0]
         if messagebox.askyesno("确认", "删除标签组将同时删除组内所有标签，是否继续？"):
-            self.repository.delete_group(group_id)
-            self.load_groups()
+            try:
+                with self.repository.try_write():
+                    self.repository.delete_group(group_id)
+            except WriteBusyError as e:
+                messagebox.showwarning("警告", str(e))
+                return
+            self.group_tree.delete(selected[0])
             
             # 通知主界面刷新
             main_window = self
@@ -146,29 +164,78 @@ class TagEditorFrame(ttk.Frame):
                 main_window.sql_builder_frame._cached_fields = {}
                 main_window.sql_builder_frame.load_tables()
 
+    # 组树按需加载：节点的iid为组ID，有子组但尚未展开的节点下放一个占位项，
+    # 展开时再查询下一层。刷新时与数据库逐层比较，只增删改有变化的节点，
+    # 选中和展开状态因此得以保留。
+
     def load_groups(self):
-        """加载标签组到树形视图"""
-        self.group_tree.delete(*self.group_tree.get_children())
-        groups = self.repository.find_all_groups()
-        
-        # 添加根组（表名组和条件组）
-        root_groups = {g.id: self.group_tree.insert('', 'end', text=g.group_name, 
-                                                   values=(g.id, g.group_type))
-                      for g in groups if not g.parent_group_id}
-        
-        # 添加第二层（表组或条件组）
-        second_level = {g.id: self.group_tree.insert(root_groups[g.parent_group_id], 
-                                                    'end', text=g.group_name,
-                                                    values=(g.id, g.group_type))
-                       for g in groups 
-                       if g.parent_group_id in root_groups}
-        
-        # 添加第三层（字段组或子条件组）
-        for g in groups:
-            if g.parent_group_id in second_level:
-                self.group_tree.insert(second_level[g.parent_group_id], 
-                                     'end', text=g.group_name,
-                                     values=(g.id, g.group_type))
+        """加载或刷新标签组树形视图，只刷新已经展开过的层级"""
+        self._sync_group_children('')
+
+    def refresh_group_children(self, parent_id=None):
+        """只刷新某个组的子组，parent_id 为空时刷新根组"""
+        item = str(parent_id) if parent_id else ''
+        if item and not self.group_tree.exists(item):
+            # 父组所在的层级还没有加载，展开时自然会查询到
+            return
+        if item and self.group_tree.get_children(item) == (self._placeholder(item),):
+            # 父组还没有展开过，展开时再查询
+            return
+        self._sync_group_children(item)
+
+    def on_open_group(self, event):
+        """展开节点时加载它的子组"""
+        item = self.group_tree.focus()
+        if item and self.group_tree.exists(self._placeholder(item)):
+            self.group_tree.delete(self._placeholder(item))
+            self._sync_group_children(item)
+
+    @staticmethod
+    def _placeholder(item):
+        return item + ':placeholder'
+
+    def _sync_group_children(self, parent_item):
+        """把 parent_item 下的子节点与数据库中的子组对齐"""
+        tree = self.group_tree
+        parent_id = int(parent_item) if parent_item else None
+        entries = self.repository.get_group_children(parent_id)
+
+        wanted = {str(entry.group.id) for entry in entries}
+        current = list(tree.get_children(parent_item))
+        stale = [item for item in current if item not in wanted]
+        if stale:
+            tree.delete(*stale)
+            current = [item for item in current if item in wanted]
+
+        for index, (group, has_children) in enumerate(entries):
+            item = str(group.id)
+            values = (group.id, group.group_type)
+            if not tree.exists(item):
+                tree.insert(parent_item, index, iid=item, text=group.group_name, values=values)
+                current.insert(index, item)
+                if has_children:
+                    tree.insert(item, 'end', iid=self._placeholder(item), text='')
+                continue
+
+            if index >= len(current) or current[index] != item:
+                # 兄弟节点顺序变化，或从别的组改挂到这里
+                if tree.parent(item) == parent_item:
+                    current.remove(item)
+                tree.move(item, parent_item, index)
+                current.insert(index, item)
+            options = tree.item(item)
+            if options['text'] != group.group_name or tuple(options['values']) != values:
+                tree.item(item, text=group.group_name, values=values)
+
+            children = tree.get_children(item)
+            if not has_children:
+                if children:
+                    tree.delete(*children)
+            elif not children:
+                tree.insert(item, 'end', iid=self._placeholder(item), text='')
+            elif children != (self._placeholder(item),):
+                # 已经展开过的层级继续向下对齐
+                self._sync_group_children(item)
 
     def on_select_group(self, event):
         """当选择标签组时，加载该组的标签并更新标签类型选项"""
@@ -182,9 +249,6 @@ class TagEditorFrame(ttk.Frame):
         if not current_group:
             return
         
-        # 获取父组
-        parent_group = self.repository.find_group_by_id(current_group.parent_group_id)
-        
         # 更新标签类型选项
         type_options = self.get_tag_type_options(None)
         
@@ -200,11 +264,6 @@ class TagEditorFrame(ttk.Frame):
         
         # 加载标签
         self.load_tags(group_id)
-        
-        # 获取祖父组（如果存在）
-        grandfather_group = None
-        if parent_group and parent_group.parent_group_id:
-            grandfather_group = self.repository.find_group_by_id(parent_group.parent_group_id)
 
     def load_tags(self, group_id=None):
         """加载标签列表"""
@@ -294,7 +353,8 @@ class TagEditorFrame(ttk.Frame):
         
         try:
             # 保存标签
-            self.repository.save(tag_name, sql_fragment, description, group_id, tag_type)
+            with self.repository.try_write():
+                self.repository.save(tag_name, sql_fragment, description, group_id, tag_type)
             
             # 立即刷新标签列表
             self.load_tags(group_id)
@@ -341,7 +401,12 @@ class TagEditorFrame(ttk.Frame):
                 # print(f"删除前查询到标签: {old_tag.tag_name if old_tag else 'None'}")
                 
                 # 删除标签
-                self.repository.delete_by_tag_name(tag_name)
+                try:
+                    with self.repository.try_write():
+                        self.repository.delete_by_tag_name(tag_name)
+                except WriteBusyError as e:
+                    messagebox.showwarning("警告", str(e))
+                    return
                 
                 # 删除后再次查询验证
                 check_tag = self.repository.find_by_tag_name(tag_name)
@@ -392,8 +457,10 @@ class TagEditorFrame(ttk.Frame):
         if not current_group:
             return {}
         
-        # 获取父组
-        parent_group = self.repository.find_group_by_id(current_group.parent_group_id)
+        # 获取父组和祖父组
+        ancestors = self.repository.get_ancestors(group_id)
+        parent_group = ancestors[-1] if ancestors else None
+        grandfather_group = ancestors[-2] if len(ancestors) > 1 else None
         
         # 如果是根组，返回所有可用的标签类型
         if not parent_group:
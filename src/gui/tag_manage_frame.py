@@ -113,13 +113,14 @@ def save_tag(self):
         # print(f"- 组类型: {self.current_group.group_type}")
         
         # 保存标签
-        tag = self.repository.save(
-            tag_name=tag_name,
-            sql_fragment=sql_fragment,
-            description=description,
-            group_id=group_id,
-            tag_type=tag_type
-        )
+        with self.repository.try_write():
+            tag = self.repository.save(
+                tag_name=tag_name,
+                sql_fragment=sql_fragment,
+                description=description,
+                group_id=group_id,
+                tag_type=tag_type
+            )
         
         # print("标签保存成功")
         
@@ -0,0 +1,156 @@
+import math
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Iterable, List, Optional, Union
+
+
+class VirtualCheckList(ttk.Frame):
+    """只为可见行创建复选框的列表
+
+    选中状态保存在 bytearray 中，不为每一行创建 Tk 变量。无论有多少行，
+    只创建一屏的 Checkbutton，滚动时把这些控件移动到新位置并显示对应的行。
+    """
+
+    def __init__(self, parent, command: Optional[Callable[[int], None]] = None,
+                 row_height: Optional[int] = None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.command = command            # 用户勾选某行后调用 command(行索引)
+        self._labels: List[str] = []
+        self._selected = bytearray()
+        self._rows: List[int] = []        # 过滤后显示的行索引
+        self._slots = []                  # [(Checkbutton, BooleanVar, 画布窗口ID)]
+        self._slot_rows: List[int] = []   # 每个控件当前显示的行索引，-1 为隐藏，-2 为待刷新
+
+        self.canvas = tk.Canvas(self, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        if row_height is None:
+            probe = ttk.Checkbutton(self.canvas, text="Ag")
+            row_height = probe.winfo_reqheight()
+            probe.destroy()
+        self.row_height = row_height
+        self._hidden_y = -2 * row_height   # 空闲的控件移到滚动区域之外
+        self.canvas.configure(yscrollincrement=row_height)
+
+        self.canvas.bind('<Configure>', self._on_configure)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.canvas.bind(sequence, self._on_mousewheel)
+
+    # ---- 数据 ----
+
+    def set_items(self, labels: List[str], selected: Union[bool, Iterable[bool]] = False):
+        """替换全部行，selected 为所有行的初始状态或逐行的状态"""
+        self._labels = list(labels)
+        if isinstance(selected, bool):
+            self._selected = bytearray([selected]) * len(self._labels)
+        else:
+            self._selected = bytearray(1 if s else 0 for s in selected)
+        self._rows = list(range(len(self._labels)))
+        # 行的内容整体换了，所有控件都需要重新设置文字
+        self._slot_rows = [-2] * len(self._slots)
+        self._reset_scroll()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def is_selected(self, index: int) -> bool:
+        return bool(self._selected[index])
+
+    def set_selected(self, index: int, value: bool):
+        self._selected[index] = 1 if value else 0
+        self._sync_vars()
+
+    def set_all(self, value: bool):
+        self._selected = bytearray([value]) * len(self._labels)
+        self._sync_vars()
+
+    def selected_indices(self) -> List[int]:
+        selected = self._selected
+        return [i for i in range(len(selected)) if selected[i]]
+
+    def selected_count(self) -> int:
+        return self._selected.count(1)
+
+    def all_selected(self) -> bool:
+        return 0 not in self._selected
+
+    def set_filter(self, predicate: Optional[Callable[[int], bool]] = None):
+        """只显示 predicate(行索引) 为真的行，为 None 时显示全部"""
+        if predicate is None:
+            self._rows = list(range(len(self._labels)))
+        else:
+            self._rows = [i for i in range(len(self._labels)) if predicate(i)]
+        self._reset_scroll()
+
+    # ---- 显示 ----
+
+    def _reset_scroll(self):
+        self.canvas.configure(scrollregion=(0, 0, 0, len(self._rows) * self.row_height))
+        self.canvas.yview_moveto(0)
+        self._refresh()
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._refresh()
+
+    def _on_mousewheel(self, event):
+        if event.num == 4:
+            step = -1
+        elif event.num == 5:
+            step = 1
+        else:
+            step = -1 if event.delta > 0 else 1
+        self.canvas.yview_scroll(step * 3, 'units')
+        self._refresh()
+
+    def _on_configure(self, event):
+        needed = math.ceil(event.height / self.row_height) + 1
+        while len(self._slots) < needed:
+            self._add_slot()
+        for _, _, window in self._slots:
+            self.canvas.itemconfigure(window, width=event.width)
+        self._refresh()
+
+    def _add_slot(self):
+        slot = len(self._slots)
+        var = tk.BooleanVar(self, value=False)
+        checkbutton = ttk.Checkbutton(self.canvas, variable=var,
+                                      command=lambda: self._on_slot_toggle(slot))
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            checkbutton.bind(sequence, self._on_mousewheel)
+        window = self.canvas.create_window(0, self._hidden_y, window=checkbutton, anchor=tk.NW)
+        self._slots.append((checkbutton, var, window))
+        self._slot_rows.append(-1)
+
+    def _refresh(self):
+        """把可见范围内的行绑定到复用的控件上"""
+        top = max(0, int(self.canvas.canvasy(0) // self.row_height))
+        for slot, (checkbutton, var, window) in enumerate(self._slots):
+            position = top + slot
+            if position < len(self._rows):
+                index = self._rows[position]
+                if self._slot_rows[slot] != index:
+                    checkbutton.configure(text=self._labels[index])
+                    self._slot_rows[slot] = index
+                var.set(self._selected[index])
+                self.canvas.coords(window, 0, position * self.row_height)
+            elif self._slot_rows[slot] != -1:
+                self.canvas.coords(window, 0, self._hidden_y)
+                self._slot_rows[slot] = -1
+
+    def _sync_vars(self):
+        for slot, (_, var, _) in enumerate(self._slots):
+            index = self._slot_rows[slot]
+            if index >= 0:
+                var.set(self._selected[index])
+
+    def _on_slot_toggle(self, slot: int):
+        index = self._slot_rows[slot]
+        if index < 0:
+            return
+        self._selected[index] = 1 if self._slots[slot][1].get() else 0
+        if self.command:
+            self.command(index)
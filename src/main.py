@@ -1,8 +1,20 @@
-from src.gui.main_window import MainWindow
+import argparse
+
+from src.utils.startup_profile import profiler
 
 def main():
+    parser = argparse.ArgumentParser(description="SQL构建器")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="打印各模块导入和各初始化阶段的耗时")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profiler.enable()
+
+    with profiler.phase("导入界面模块"):
+        from src.gui.main_window import MainWindow
     app = MainWindow()
+    app.after_idle(profiler.report)
     app.run()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -1,8 +1,13 @@
-from dataclasses import dataclass
 from datetime import datetime
 
-@dataclass
 class SqlTag:
+    """SQL标签
+
+    使用 __slots__ 而不是实例字典，大量标签同时驻留内存时每个对象更小。
+    """
+    __slots__ = ('id', 'tag_name', 'sql_fragment', 'description', 'group_id',
+                 'tag_type', 'create_time', 'update_time', 'group_name')
+
     id: int
     tag_name: str
     sql_fragment: str
@@ -11,9 +16,9 @@ class SqlTag:
     tag_type: str
     create_time: datetime
     update_time: datetime
-    group_name: str = None  # 添加 group_name 字段
-    
-    def __init__(self, id=None, tag_name=None, sql_fragment=None, description=None, 
+    group_name: str
+
+    def __init__(self, id=None, tag_name=None, sql_fragment=None, description=None,
                  group_id=None, tag_type=None, create_time=None, update_time=None,
                  group_name=None, sql_content=None):  # 添加 sql_content 参数
         self.id = id
@@ -25,7 +30,29 @@ class SqlTag:
         self.create_time = create_time
         self.update_time = update_time
         self.group_name = group_name
-        
+
+    @classmethod
+    def row_factory(cls, cursor, row) -> 'SqlTag':
+        """sqlite3 行工厂，列顺序与 sql_tags 表一致，可额外带 group_name 列"""
+        return cls(*row)
+
+    def __copy__(self) -> 'SqlTag':
+        # 默认的 copy.copy 对 __slots__ 对象要走 __reduce_ex__，这里直接构造更快
+        return SqlTag(self.id, self.tag_name, self.sql_fragment, self.description,
+                      self.group_id, self.tag_type, self.create_time, self.update_time,
+                      self.group_name)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
     @property
     def type_display(self) -> str:
         """返回标签类型的中文显示"""
@@ -35,13 +62,13 @@ class SqlTag:
             'condition': '条件'
         }
         return type_map.get(self.tag_type, self.tag_type)
-    
+
     @property
     def sql_content(self):
         """兼容性属性，返回 sql_fragment"""
         return self.sql_fragment
-    
+
     @sql_content.setter
     def sql_content(self, value):
         """兼容性属性，设置 sql_fragment"""
-        self.sql_fragment = value
\ No newline at end of file
+        self.sql_fragment = value
@@ -1,9 +1,19 @@
-from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
-@dataclass
 class TagGroup:
+    """标签组，与 SqlTag 一样使用 __slots__"""
+    __slots__ = ('id', 'group_name', 'group_type', 'description', 'parent_group_id',
+                 'create_time', 'update_time')
+
+    id: int
+    group_name: str
+    group_type: str
+    description: Optional[str]
+    parent_group_id: Optional[int]
+    create_time: datetime
+    update_time: datetime
+
     def __init__(self, id=None, group_name=None, group_type=None, description=None,
                  parent_group_id=None, create_time=None, update_time=None):
         self.id = id
@@ -12,4 +22,24 @@ class TagGroup:
         self.description = description
         self.parent_group_id = parent_group_id
         self.create_time = create_time
-        self.update_time = update_time 
\ No newline at end of file
+        self.update_time = update_time
+
+    @classmethod
+    def row_factory(cls, cursor, row) -> 'TagGroup':
+        """sqlite3 行工厂，列顺序与 tag_groups 表一致"""
+        return cls(*row)
+
+    def __copy__(self) -> 'TagGroup':
+        return TagGroup(self.id, self.group_name, self.group_type, self.description,
+                        self.parent_group_id, self.create_time, self.update_time)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""数据库结构迁移
+
+每个迁移函数把数据库从上一个版本升级到下一个版本，当前版本记录在
+PRAGMA user_version 中。新增结构变更时只需在 MIGRATIONS 末尾追加函数，
+不要修改已发布的迁移。
+"""
+import sqlite3
+from typing import Callable, List
+
+
+def _v1_create_tables(conn: sqlite3.Connection):
+    """创建基础表，并补齐早期版本数据库缺失的列"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tag_groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_name TEXT NOT NULL,
+            group_type TEXT NOT NULL DEFAULT 'root',
+            description TEXT,
+            parent_group_id INTEGER,
+            create_time TIMESTAMP,
+            update_time TIMESTAMP,
+            FOREIGN KEY (parent_group_id) REFERENCES tag_groups(id),
+            UNIQUE(group_name, parent_group_id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sql_tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tag_name TEXT NOT NULL,
+            sql_fragment TEXT NOT NULL,
+            description TEXT,
+            group_id INTEGER NOT NULL,
+            tag_type TEXT NOT NULL,
+            create_time TIMESTAMP,
+            update_time TIMESTAMP,
+            FOREIGN KEY (group_id) REFERENCES tag_groups(id),
+            UNIQUE(tag_name, group_id)
+        )
+    ''')
+
+    # 旧数据库可能缺少后来加入的列
+    cursor = conn.execute("PRAGMA table_info(tag_groups)")
+    columns = [col[1] for col in cursor.fetchall()]
+
+    if 'description' not in columns:
+        conn.execute('ALTER TABLE tag_groups ADD COLUMN description TEXT')
+
+    if 'group_type' not in columns:
+        conn.execute('ALTER TABLE tag_groups ADD COLUMN group_type TEXT DEFAULT "table"')
+        conn.execute('UPDATE tag_groups SET group_type = "table" WHERE group_type IS NULL')
+
+    if 'group_name' not in columns:
+        conn.execute('ALTER TABLE tag_groups ADD COLUMN group_name TEXT')
+
+
+def _v2_add_indexes(conn: sqlite3.Connection):
+    """为常用过滤列建立索引
+
+    tag_name 和 group_name 已经是唯一约束索引的前导列，无需单独建索引。
+    """
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sql_tags_group_id ON sql_tags(group_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tag_groups_parent_id ON tag_groups(parent_group_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tag_groups_group_type ON tag_groups(group_type)')
+
+
+def _v3_group_tag_index(conn: sqlite3.Connection):
+    """按 (组ID, 标签名) 建索引，按组列出标签时无需再排序
+
+    它覆盖了 idx_sql_tags_group_id 的全部用途，后者删除。
+    """
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sql_tags_group_tag ON sql_tags(group_id, tag_name)')
+    conn.execute('DROP INDEX IF EXISTS idx_sql_tags_group_id')
+
+
+def _v4_full_text_index(conn: sqlite3.Connection):
+    """为标签名、描述和SQL片段建立 FTS5 全文索引，并用触发器与 sql_tags 保持同步
+
+    SQLite 未编译 FTS5 时跳过，搜索会退回到 LIKE 扫描；
+    之后换到支持 FTS5 的 SQLite 时由 ensure_full_text_index() 补建。
+    """
+    ensure_full_text_index(conn)
+
+
+def ensure_full_text_index(conn: sqlite3.Connection) -> bool:
+    """建立全文索引及同步触发器并为已有数据建索引，返回是否可用
+
+    迁移版本号不记录 FTS5 是否可用，所以打开数据库时索引缺失就调用一次。
+    """
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS sql_tags_fts USING fts5(
+                tag_name, description, sql_fragment,
+                content='sql_tags', content_rowid='id'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return False
+
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS sql_tags_fts_insert AFTER INSERT ON sql_tags BEGIN
+            INSERT INTO sql_tags_fts(rowid, tag_name, description, sql_fragment)
+            VALUES (new.id, new.tag_name, new.description, new.sql_fragment);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS sql_tags_fts_delete AFTER DELETE ON sql_tags BEGIN
+            INSERT INTO sql_tags_fts(sql_tags_fts, rowid, tag_name, description, sql_fragment)
+            VALUES ('delete', old.id, old.tag_name, old.description, old.sql_fragment);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS sql_tags_fts_update AFTER UPDATE ON sql_tags BEGIN
+            INSERT INTO sql_tags_fts(sql_tags_fts, rowid, tag_name, description, sql_fragment)
+            VALUES ('delete', old.id, old.tag_name, old.description, old.sql_fragment);
+            INSERT INTO sql_tags_fts(rowid, tag_name, description, sql_fragment)
+            VALUES (new.id, new.tag_name, new.description, new.sql_fragment);
+        END
+    ''')
+    # 为已有数据建立索引
+    conn.execute("INSERT INTO sql_tags_fts(sql_tags_fts) VALUES ('rebuild')")
+    return True
+
+
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _v1_create_tables,
+    _v2_add_indexes,
+    _v3_group_tag_index,
+    _v4_full_text_index,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """把数据库升级到最新版本，返回执行的迁移数量
+
+    所有迁移在同一个事务中执行，任何一步失败都会整体回滚。
+    如果调用方已经开启了事务，则由调用方负责提交。
+    """
+    version = get_version(conn)
+    if version >= SCHEMA_VERSION:
+        return 0
+
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute('BEGIN')
+    try:
+        for target, migration in enumerate(MIGRATIONS[version:], version + 1):
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {target}')
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
+    if own_transaction:
+        conn.commit()
+    return SCHEMA_VERSION - version
@@ -1,66 +1,227 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 from ..models.sql_tag import SqlTag
 from ..models.tag_group import TagGroup
+from .tag_catalog import TagCatalog, TransactionCatalog
+from . import migrations
+
+# 每个连接创建时应用的PRAGMA，可通过构造参数覆盖
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -8000,
+    'foreign_keys': 'OFF',
+}
+
+# 在线备份时每一步复制的页数，步与步之间会回调进度
+BACKUP_PAGES_PER_STEP = 256
+
+# 批量保存时支持的冲突处理策略
+CONFLICT_STRATEGIES = ('skip', 'replace', 'rename')
+
+# 合并数据库时需要逐条报告的行：skip 报告冲突和不合法的行，
+# replace 的冲突行会覆盖已有标签，rename 的冲突行会改名写入
+_MERGE_PROBLEM_ROWS = {
+    'skip': 'conflict OR NOT valid',
+    'replace': 'NOT valid AND NOT conflict',
+    'rename': 'NOT valid',
+}
+
+class WriteBusyError(RuntimeError):
+    """后台任务正在写数据库时，界面线程的写操作不等待而是抛出此异常"""
+
+class SaveResult(NamedTuple):
+    """批量保存中单条记录的结果"""
+    status: str                  # inserted / updated / renamed / skipped / failed
+    item: Any                    # 保存后的对象；跳过时为库中已有的记录，失败时为传入的对象
+    error: Optional[str] = None
+
+class GroupNode(NamedTuple):
+    """组树中的一个节点，children 按组ID排序"""
+    group: TagGroup
+    children: List['GroupNode']
+
+class GroupEntry(NamedTuple):
+    """组树中的一层：组本身以及它是否有子组，用于按需展开"""
+    group: TagGroup
+    has_children: bool
 
 class SqlTagRepository:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Any]] = None):
         self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        # 每个线程持有一个长连接，close() 时统一关闭
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # 后台写任务执行期间持有，同一时间只有一个任务写这个数据库文件
+        self.write_lock = threading.Lock()
+        # 标签组/标签的内存目录，写事务提交后同步更新
+        self._shared_catalog = TagCatalog(self._load_catalog_groups, self._load_catalog_tags)
         self._init_db()
         self.fix_group_types()
 
+    def __enter__(self) -> 'SqlTagRepository':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的长连接，首次使用时创建并应用PRAGMA"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            for name, value in self.pragmas.items():
+                conn.execute(f'PRAGMA {name} = {value}')
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.catalog = None
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """事务上下文：最外层正常退出时提交，异常时回滚；嵌套调用共用同一事务"""
+        conn = self._get_connection()
+        if self._local.depth == 0:
+            self._local.catalog = TransactionCatalog(
+                self._shared_catalog, self._load_catalog_groups, self._load_catalog_tags)
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                # 目录的修改还没有应用到共享目录，随事务一起丢弃
+                self._local.catalog = None
+                conn.rollback()
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            catalog, self._local.catalog = self._local.catalog, None
+            conn.commit()
+            catalog.apply()
+
+    @property
+    def _catalog(self):
+        """当前线程处于事务中时返回事务目录，否则返回共享目录"""
+        return getattr(self._local, 'catalog', None) or self._shared_catalog
+
+    def transaction(self):
+        """在一个事务中执行多次仓储调用，期间的写操作一起提交或回滚"""
+        return self._connection()
+
+    @contextmanager
+    def try_write(self):
+        """界面线程中的写操作使用，与后台写任务共用 write_lock
+
+        后台任务持有写事务时，直接写入会在 busy_timeout 内阻塞界面线程。
+        这里不等待：写锁被占用时立即抛出 WriteBusyError。
+        """
+        if not self.write_lock.acquire(blocking=False):
+            raise WriteBusyError("后台任务正在写入数据库，请稍后再试")
+        try:
+            yield
+        finally:
+            self.write_lock.release()
+
+    def release_thread_connection(self):
+        """关闭当前线程的连接，后台任务结束后在工作线程中调用
+
+        工作线程随线程池关闭而退出，它的连接不会自动关闭；
+        之后再在这个线程上访问仓储会重新打开连接。
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.depth:
+            return
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+        self._local.conn = None
+        self._local.catalog = None
+
+    def close(self):
+        """关闭所有线程打开的连接"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def backup_to(self, filepath: str,
+                  progress: Optional[Callable[[int, int], None]] = None):
+        """用 SQLite 在线备份把整个数据库复制到 filepath
+
+        按页复制，不经过Python对象。备份在一个读事务中进行，
+        得到的是开始时刻的一致快照，期间的写入不影响导出。
+        progress(已复制页数, 总页数) 每复制一步调用一次。
+        """
+        def on_step(status, remaining, total):
+            progress(total - remaining, total)
+
+        target = sqlite3.connect(filepath)
+        try:
+            with self._connection() as conn:
+                # 持有读事务，整个备份读取同一个快照；否则其他连接持续写入时备份会反复重来
+                if not conn.in_transaction:
+                    conn.execute('BEGIN')
+                conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+                conn.backup(target, pages=BACKUP_PAGES_PER_STEP if progress else -1,
+                            progress=on_step if progress else None)
+            # 导出文件需要自包含，不使用 WAL
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+
+    def _load_catalog_groups(self) -> List[TagGroup]:
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = TagGroup.row_factory
+            return cursor.execute('SELECT * FROM tag_groups ORDER BY id').fetchall()
+
+    def _load_catalog_tags(self) -> List[SqlTag]:
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = SqlTag.row_factory
+            return cursor.execute('''
+                SELECT t.id, t.tag_name, t.sql_fragment, t.description,
+                       t.group_id, t.tag_type, t.create_time, t.update_time,
+                       g.group_name
+                FROM sql_tags t
+                LEFT JOIN tag_groups g ON t.group_id = g.id
+                ORDER BY t.id
+            ''').fetchall()
+
+    def invalidate_cache(self):
+        """绕过仓储直接修改数据库后调用，丢弃内存目录"""
+        self._catalog.invalidate()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """返回内存目录的命中/未命中次数"""
+        return self._catalog.stats()
+
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            # 首先创建必要的表
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS tag_groups (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    group_name TEXT NOT NULL,
-                    group_type TEXT NOT NULL DEFAULT 'root',
-                    description TEXT,
-                    parent_group_id INTEGER,
-                    create_time TIMESTAMP,
-                    update_time TIMESTAMP,
-                    FOREIGN KEY (parent_group_id) REFERENCES tag_groups(id),
-                    UNIQUE(group_name, parent_group_id)
-                )
-            ''')
+        with self._connection() as conn:
+            # 升级表结构到最新版本，user_version 已是最新时不做任何结构检查
+            migrations.migrate(conn)
+            # 启动路径上只执行这一条查询：是否有全文索引、是否需要创建根组
+            has_fts, has_groups = conn.execute('''
+                SELECT EXISTS(SELECT 1 FROM sqlite_master WHERE name = 'sql_tags_fts'),
+                       EXISTS(SELECT 1 FROM tag_groups)
+            ''').fetchone()
+            # v4 迁移在没有 FTS5 的 SQLite 上会跳过，换用支持 FTS5 的版本后在这里补建
+            self._has_fts = bool(has_fts) or migrations.ensure_full_text_index(conn)
             
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS sql_tags (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    tag_name TEXT NOT NULL,
-                    sql_fragment TEXT NOT NULL,
-                    description TEXT,
-                    group_id INTEGER NOT NULL,
-                    tag_type TEXT NOT NULL,
-                    create_time TIMESTAMP,
-                    update_time TIMESTAMP,
-                    FOREIGN KEY (group_id) REFERENCES tag_groups(id),
-                    UNIQUE(tag_name, group_id)
-                )
-            ''')
-            
-            # 然后检查列是否存在
-            cursor = conn.execute("PRAGMA table_info(tag_groups)")
-            columns = [col[1] for col in cursor.fetchall()]
-            
-            # 检查并添加必要的列
-            if 'description' not in columns:
-                conn.execute('ALTER TABLE tag_groups ADD COLUMN description TEXT')
-            
-            if 'group_type' not in columns:
-                conn.execute('ALTER TABLE tag_groups ADD COLUMN group_type TEXT DEFAULT "table"')
-                conn.execute('UPDATE tag_groups SET group_type = "table" WHERE group_type IS NULL')
-            
-            if 'group_name' not in columns:
-                conn.execute('ALTER TABLE tag_groups ADD COLUMN group_name TEXT')
-                conn.execute('UPDATE tag_groups SET group_name = group_name WHERE group_name IS NULL')
-            
-            # 检查是否需要创建根组
-            cursor = conn.execute('SELECT COUNT(*) FROM tag_groups')
-            if cursor.fetchone()[0] == 0:
+            if not has_groups:
                 now = datetime.now()
                 # 创建所有根组
                 conn.execute('''
@@ -75,7 +236,7 @@ class SqlTagRepository:
 
     def clear_database(self):
         """清空数据库中的所有数据"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             # 关闭外键约束
             conn.execute('PRAGMA foreign_keys = OFF')
             # 清空表
@@ -83,30 +244,33 @@ class SqlTagRepository:
             conn.execute('DELETE FROM tag_groups')
             # 重置自增ID
             conn.execute('DELETE FROM sqlite_sequence WHERE name IN ("sql_tags", "tag_groups")')
-            # 重新开启外键约束
-            conn.execute('PRAGMA foreign_keys = ON')
-            conn.commit()
+            # 恢复连接配置的外键约束设置
+            conn.execute(f"PRAGMA foreign_keys = {self.pragmas['foreign_keys']}")
+        self._catalog.invalidate()
 
     def recreate_database(self):
         """重新创建数据库"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             # 关闭外键约束
             conn.execute('PRAGMA foreign_keys = OFF')
             # 删除现有表
+            conn.execute('DROP TABLE IF EXISTS sql_tags_fts')
             conn.execute('DROP TABLE IF EXISTS sql_tags')
             conn.execute('DROP TABLE IF EXISTS tag_groups')
-            # 重新开启外键约束
-            conn.execute('PRAGMA foreign_keys = ON')
+            conn.execute('PRAGMA user_version = 0')
+            # 恢复连接配置的外键约束设置
+            conn.execute(f"PRAGMA foreign_keys = {self.pragmas['foreign_keys']}")
             # 重新初始化数据库
             self._init_db()
             self.fix_group_types()
+        self._catalog.invalidate()
 
     def save(self, tag_name: str, sql_fragment: str, description: str, 
              group_id: int, tag_type: str) -> SqlTag:
         try:
             self.validate_tag_type(tag_type, group_id)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 now = datetime.now()
                 # 先检查是否存在相同的标签名和组ID
                 cursor = conn.execute(
@@ -138,13 +302,9 @@ class SqlTagRepository:
                     tag_id = cursor.lastrowid
                 
                 # 获取组名
-                cursor = conn.execute(
-                    'SELECT group_name FROM tag_groups WHERE id = ?',
-                    (group_id,)
-                )
-                group_name = cursor.fetchone()[0]
+                group_name = self.find_group_by_id(group_id).group_name
                 
-                return SqlTag(
+                tag = SqlTag(
                     id=tag_id,
                     tag_name=tag_name,
                     sql_fragment=sql_fragment,
@@ -155,46 +315,551 @@ class SqlTagRepository:
                     update_time=now,
                     group_name=group_name
                 )
+                self._catalog.put_tag(tag)
+                return tag
         except Exception as e:
             raise
 
-    def find_by_tag_name(self, tag_name: str) -> Optional[SqlTag]:
-        with sqlite3.connect(self.db_path) as conn:
+    @staticmethod
+    def _unique_name(name: str, taken) -> str:
+        """按 name_1、name_2 … 的规则生成一个未被占用的名称"""
+        i = 1
+        new_name = f"{name}_{i}"
+        while new_name in taken:
+            i += 1
+            new_name = f"{name}_{i}"
+        return new_name
+
+    @staticmethod
+    def _fetch_tag_ids(conn: sqlite3.Connection, group_id: int,
+                       names: Iterable[str]) -> Dict[str, int]:
+        """查询组内指定标签名对应的ID，按 SQLite 参数个数上限分块"""
+        names = list(names)
+        found = {}
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
             cursor = conn.execute(
-                'SELECT * FROM sql_tags WHERE tag_name = ?', 
-                (tag_name,)
+                f"SELECT tag_name, id FROM sql_tags WHERE group_id = ? "
+                f"AND tag_name IN ({','.join('?' * len(chunk))})",
+                [group_id, *chunk]
             )
-            row = cursor.fetchone()
-            return SqlTag(*row) if row else None 
+            found.update(cursor.fetchall())
+        return found
+
+    def save_many(self, tags: Iterable[SqlTag], on_conflict: str = 'skip') -> List[SaveResult]:
+        """批量保存标签，全部在一个事务中完成
+
+        on_conflict: 'skip' - 跳过同组内已存在的标签名
+                     'replace' - 覆盖已存在标签的SQL片段、描述和类型
+                     'rename' - 为新标签追加 _1、_2 … 后缀
+        返回与输入一一对应的保存结果
+        """
+        if on_conflict not in CONFLICT_STRATEGIES:
+            raise ValueError(f"不支持的冲突处理策略: {on_conflict}")
+
+        tags = list(tags)
+        results: List[Optional[SaveResult]] = [None] * len(tags)
+        now = datetime.now()
+
+        with self._connection() as conn:
+            # (组ID, 标签名) -> 库中已有的ID；本批次新占用的名字记为 None。
+            # 只查询本批次用到的名字，开销与批次大小成正比而与组内已有标签数无关
+            taken: Dict[tuple, Optional[int]] = {}
+            names_by_group: Dict[int, set] = {}
+            for tag in tags:
+                names_by_group.setdefault(tag.group_id, set()).add(tag.tag_name)
+            for group_id, names in names_by_group.items():
+                for name, tag_id in self._fetch_tag_ids(conn, group_id, names).items():
+                    taken[(group_id, name)] = tag_id
+            looked_up = {(g, n) for g, names in names_by_group.items() for n in names}
+
+            def is_taken(group_id: int, tag_name: str) -> bool:
+                key = (group_id, tag_name)
+                if key not in taken and key not in looked_up:
+                    looked_up.add(key)
+                    row = conn.execute(
+                        'SELECT id FROM sql_tags WHERE tag_name = ? AND group_id = ?', key
+                    ).fetchone()
+                    if row is not None:
+                        taken[key] = row[0]
+                return key in taken
+
+            rows = []
+            pending = []  # (结果下标, 状态, 标签名, 原标签)
+            checked: Dict[tuple, Optional[str]] = {}  # (组ID, 类型) -> 校验错误
+            for index, tag in enumerate(tags):
+                key = (tag.group_id, tag.tag_type)
+                if key not in checked:
+                    try:
+                        self.validate_tag_type(tag.tag_type, tag.group_id)
+                        checked[key] = None
+                    except ValueError as e:
+                        checked[key] = str(e)
+                if checked[key]:
+                    results[index] = SaveResult('failed', tag, checked[key])
+                    continue
+
+                tag_name = tag.tag_name
+                status = 'inserted'
+                if is_taken(tag.group_id, tag_name):
+                    if on_conflict == 'skip':
+                        # 与本批次前面的行重名时库中还没有记录
+                        existing = tag
+                        existing_id = taken[(tag.group_id, tag_name)]
+                        if existing_id is not None:
+                            cursor = conn.execute(
+                                'SELECT * FROM sql_tags WHERE id = ?', (existing_id,)
+                            )
+                            existing = SqlTag(*cursor.fetchone())
+                        results[index] = SaveResult('skipped', existing)
+                        continue
+                    elif on_conflict == 'rename':
+                        suffix = 1
+                        while is_taken(tag.group_id, f"{tag.tag_name}_{suffix}"):
+                            suffix += 1
+                        tag_name = f"{tag.tag_name}_{suffix}"
+                        status = 'renamed'
+                    else:
+                        status = 'updated'
+                taken.setdefault((tag.group_id, tag_name), None)
+
+                rows.append((tag_name, tag.sql_fragment, tag.description, tag.group_id,
+                             tag.tag_type, now, now))
+                pending.append((index, status, tag_name, tag))
+
+            conn.executemany('''
+                INSERT INTO sql_tags
+                (tag_name, sql_fragment, description, group_id, tag_type,
+                 create_time, update_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(tag_name, group_id) DO UPDATE SET
+                    sql_fragment = excluded.sql_fragment,
+                    description = excluded.description,
+                    tag_type = excluded.tag_type,
+                    update_time = excluded.update_time
+            ''', rows)
+
+            # 回填新插入标签的ID
+            new_names: Dict[int, set] = {}
+            for _, _, tag_name, tag in pending:
+                if taken[(tag.group_id, tag_name)] is None:
+                    new_names.setdefault(tag.group_id, set()).add(tag_name)
+            for group_id, names in new_names.items():
+                for name, tag_id in self._fetch_tag_ids(conn, group_id, names).items():
+                    taken[(group_id, name)] = tag_id
+
+            group_names = {}
+            for index, status, tag_name, tag in pending:
+                tag_id = taken[(tag.group_id, tag_name)]
+                if tag.group_id not in group_names:
+                    group_names[tag.group_id] = self._catalog.group(tag.group_id).group_name
+                saved = SqlTag(
+                    id=tag_id,
+                    tag_name=tag_name,
+                    sql_fragment=tag.sql_fragment,
+                    description=tag.description,
+                    group_id=tag.group_id,
+                    tag_type=tag.tag_type,
+                    create_time=now,
+                    update_time=now,
+                    group_name=group_names[tag.group_id]
+                )
+                self._catalog.put_tag(saved)
+                results[index] = SaveResult(status, saved)
+
+        return results
+
+    def save_groups_many(self, groups: Iterable[TagGroup],
+                         on_conflict: str = 'skip') -> List[SaveResult]:
+        """批量保存标签组，全部在一个事务中完成
+
+        同一父组下组名相同视为冲突，on_conflict 含义同 save_many，
+        其中 'replace' 会覆盖已有组的类型和描述。组按输入顺序逐个写入，
+        因此后面的组可以引用前面新建组的ID作为父组。
+        """
+        if on_conflict not in CONFLICT_STRATEGIES:
+            raise ValueError(f"不支持的冲突处理策略: {on_conflict}")
+
+        results = []
+        now = datetime.now()
+        with self._connection() as conn:
+            for group in groups:
+                try:
+                    self.validate_group_type(group.group_type, group.parent_group_id)
+                except ValueError as e:
+                    results.append(SaveResult('failed', group, str(e)))
+                    continue
+
+                siblings = {g.group_name: g for g in self._catalog.children(group.parent_group_id)}
+                saved = TagGroup(
+                    id=None,
+                    group_name=group.group_name,
+                    group_type=group.group_type,
+                    description=group.description,
+                    parent_group_id=group.parent_group_id,
+                    create_time=now,
+                    update_time=now
+                )
+                status = 'inserted'
+                existing = siblings.get(group.group_name)
+                if existing:
+                    if on_conflict == 'skip':
+                        results.append(SaveResult('skipped', existing))
+                        continue
+                    elif on_conflict == 'replace':
+                        conn.execute(
+                            '''UPDATE tag_groups
+                               SET group_type = ?, description = ?, update_time = ?
+                               WHERE id = ?''',
+                            (group.group_type, group.description, now, existing.id)
+                        )
+                        saved.id = existing.id
+                        saved.create_time = existing.create_time
+                        self._catalog.put_group(saved)
+                        results.append(SaveResult('updated', saved))
+                        continue
+                    saved.group_name = self._unique_name(group.group_name, siblings)
+                    status = 'renamed'
+
+                cursor = conn.execute(
+                    '''INSERT INTO tag_groups
+                       (group_name, group_type, description, parent_group_id,
+                        create_time, update_time)
+                       VALUES (?, ?, ?, ?, ?, ?)''',
+                    (saved.group_name, saved.group_type, saved.description,
+                     saved.parent_group_id, now, now)
+                )
+                saved.id = cursor.lastrowid
+                self._catalog.put_group(saved)
+                results.append(SaveResult(status, saved))
+
+        return results
+
+    def merge_database(self, source_path: str,
+                       on_conflict: str = 'skip') -> Tuple[int, List[SaveResult]]:
+        """把另一个同结构的SQLite数据库合并进来，全部在一个事务中完成
+
+        源库通过 ATTACH 挂载，组的映射和标签的合并都用集合式SQL完成，
+        不逐行经过Python。组按组名匹配，不存在的组会被创建，其父组按映射后的ID设置。
+        同一组内标签名相同视为冲突，on_conflict 含义同 save_many。
+        返回 (成功导入的标签数, 被跳过或失败的标签结果列表，按源库顺序)。
+        ATTACH 不能在事务中执行，因此不能在 transaction() 内调用。
+        """
+        if on_conflict not in CONFLICT_STRATEGIES:
+            raise ValueError(f"不支持的冲突处理策略: {on_conflict}")
+
+        conn = self._get_connection()
+        conn.execute('ATTACH DATABASE ? AS src', (source_path,))
+        try:
+            with self._connection() as conn:
+                try:
+                    self._merge_groups(conn)
+                    # 新建的组要参与后面的类型校验
+                    self._catalog.invalidate()
+                    return self._merge_tags(conn, on_conflict)
+                finally:
+                    conn.execute('DROP TABLE IF EXISTS temp.import_group_map')
+                    conn.execute('DROP TABLE IF EXISTS temp.import_tags')
+        finally:
+            conn.execute('DETACH DATABASE src')
+            self._catalog.invalidate()
+
+    def _merge_groups(self, conn: sqlite3.Connection):
+        """建立源组ID到本库组ID的映射，创建本库缺少的组"""
+        conn.execute('''
+            CREATE TEMP TABLE import_group_map (
+                src_id INTEGER PRIMARY KEY,
+                dst_id INTEGER,
+                created INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # 同名组有多个时取ID最小的，与 find_group_by_name 一致
+        conn.execute('''
+            INSERT INTO temp.import_group_map (src_id, dst_id)
+            SELECT s.id, (SELECT MIN(g.id) FROM main.tag_groups g
+                          WHERE g.group_name = s.group_name)
+            FROM src.tag_groups s
+        ''')
+
+        # 每个缺少的组名只创建一次，取源库中ID最小的那条；父组稍后再补
+        max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM main.tag_groups').fetchone()[0]
+        conn.execute('''
+            INSERT INTO main.tag_groups
+            (group_name, group_type, description, parent_group_id, create_time, update_time)
+            SELECT s.group_name, s.group_type, s.description, NULL, s.create_time, s.update_time
+            FROM src.tag_groups s
+            JOIN temp.import_group_map m ON m.src_id = s.id
+            WHERE m.dst_id IS NULL
+              AND s.id = (SELECT MIN(id) FROM src.tag_groups WHERE group_name = s.group_name)
+            ORDER BY s.id
+        ''')
+        conn.execute('''
+            UPDATE temp.import_group_map
+            SET dst_id = (SELECT g.id FROM main.tag_groups g
+                          JOIN src.tag_groups s ON s.group_name = g.group_name
+                          WHERE s.id = import_group_map.src_id AND g.id > ?),
+                created = 1
+            WHERE dst_id IS NULL
+        ''', (max_id,))
+
+        # 新建组的父组指向映射后的ID，源库中悬空的父组ID置空
+        conn.execute('''
+            UPDATE main.tag_groups
+            SET parent_group_id = (
+                SELECT NULLIF(pm.dst_id, main.tag_groups.id)
+                FROM temp.import_group_map m
+                JOIN src.tag_groups s ON s.id = m.src_id
+                JOIN temp.import_group_map pm ON pm.src_id = s.parent_group_id
+                WHERE m.dst_id = main.tag_groups.id AND m.created
+                ORDER BY m.src_id LIMIT 1
+            )
+            WHERE id > ?
+        ''', (max_id,))
+
+    def _merge_tags(self, conn: sqlite3.Connection,
+                    on_conflict: str) -> Tuple[int, List[SaveResult]]:
+        """按冲突策略把源库标签写入映射后的组"""
+        now = datetime.now()
+        new_names = {}  # 源标签ID -> 改名后的标签名
+        conn.execute('''
+            CREATE TEMP TABLE import_tags (
+                seq INTEGER PRIMARY KEY,
+                tag_name TEXT,
+                sql_fragment TEXT,
+                description TEXT,
+                group_id INTEGER,
+                tag_type TEXT,
+                group_name TEXT,
+                valid INTEGER NOT NULL DEFAULT 1,
+                conflict INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('''
+            INSERT INTO temp.import_tags
+            (seq, tag_name, sql_fragment, description, group_id, tag_type, group_name)
+            SELECT t.id, t.tag_name, t.sql_fragment, t.description, m.dst_id, t.tag_type,
+                   s.group_name
+            FROM src.sql_tags t
+            JOIN src.tag_groups s ON s.id = t.group_id
+            JOIN temp.import_group_map m ON m.src_id = t.group_id
+        ''')
+        conn.execute('CREATE INDEX temp.idx_import_tags_key ON import_tags(group_id, tag_name, seq)')
+
+        # 组/类型组合很少，直接复用 validate_tag_type 的规则
+        errors = {}
+        for group_id, tag_type in conn.execute(
+                'SELECT DISTINCT group_id, tag_type FROM temp.import_tags').fetchall():
+            try:
+                self.validate_tag_type(tag_type, group_id)
+            except ValueError as e:
+                errors[(group_id, tag_type)] = str(e)
+        conn.executemany(
+            'UPDATE temp.import_tags SET valid = 0 WHERE group_id = ? AND tag_type = ?',
+            list(errors)
+        )
+
+        # 本库已有同名标签，或源库中排在前面的合法标签已占用该名字
+        conn.execute('''
+            UPDATE temp.import_tags SET conflict = 1
+            WHERE EXISTS (SELECT 1 FROM main.sql_tags t
+                          WHERE t.tag_name = import_tags.tag_name
+                            AND t.group_id = import_tags.group_id)
+               OR EXISTS (SELECT 1 FROM temp.import_tags e
+                          WHERE e.group_id = import_tags.group_id
+                            AND e.tag_name = import_tags.tag_name
+                            AND e.seq < import_tags.seq AND e.valid)
+        ''')
+
+        cursor = conn.execute('''
+            INSERT INTO main.sql_tags
+            (tag_name, sql_fragment, description, group_id, tag_type, create_time, update_time)
+            SELECT tag_name, sql_fragment, description, group_id, tag_type, ?, ?
+            FROM temp.import_tags
+            WHERE valid AND NOT conflict
+            ORDER BY seq
+        ''', (now, now))
+        saved = cursor.rowcount
+
+        if on_conflict == 'replace':
+            # 同名的多条按顺序覆盖，最终保留最后一条
+            cursor = conn.execute('''
+                UPDATE main.sql_tags
+                SET (sql_fragment, description, tag_type) = (
+                        SELECT i.sql_fragment, i.description, i.tag_type
+                        FROM temp.import_tags i
+                        WHERE i.group_id = sql_tags.group_id
+                          AND i.tag_name = sql_tags.tag_name AND i.conflict
+                        ORDER BY i.seq DESC LIMIT 1),
+                    update_time = ?
+                WHERE EXISTS (SELECT 1 FROM temp.import_tags i
+                              WHERE i.group_id = sql_tags.group_id
+                                AND i.tag_name = sql_tags.tag_name AND i.conflict)
+            ''', (now,))
+            saved += conn.execute(
+                'SELECT COUNT(*) FROM temp.import_tags WHERE conflict').fetchone()[0]
+        elif on_conflict == 'rename':
+            renamed = []
+            assigned = set()
+            for seq, tag_name, sql_fragment, description, group_id, tag_type, valid in conn.execute('''
+                    SELECT seq, tag_name, sql_fragment, description, group_id, tag_type, valid
+                    FROM temp.import_tags WHERE conflict ORDER BY seq''').fetchall():
+                suffix = 1
+                while True:
+                    new_name = f"{tag_name}_{suffix}"
+                    if (group_id, new_name) not in assigned and conn.execute(
+                            'SELECT 1 FROM main.sql_tags WHERE tag_name = ? AND group_id = ?',
+                            (new_name, group_id)).fetchone() is None:
+                        break
+                    suffix += 1
+                if not valid:
+                    # 不合法的行不会写入，失败信息中使用改名后的标签名
+                    new_names[seq] = new_name
+                    continue
+                assigned.add((group_id, new_name))
+                renamed.append((new_name, sql_fragment, description, group_id, tag_type, now, now))
+            conn.executemany('''
+                INSERT INTO main.sql_tags
+                (tag_name, sql_fragment, description, group_id, tag_type, create_time, update_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', renamed)
+            saved += len(renamed)
+
+        # skip 策略下冲突的行记为跳过；类型不合法且未被覆盖的行记为失败
+        results = []
+        cursor = conn.execute(f'''
+            SELECT seq, tag_name, sql_fragment, description, group_id, tag_type, group_name,
+                   conflict
+            FROM temp.import_tags
+            WHERE {_MERGE_PROBLEM_ROWS[on_conflict]}
+            ORDER BY seq
+        ''')
+        for seq, tag_name, sql_fragment, description, group_id, tag_type, group_name, conflict in cursor:
+            tag = SqlTag(tag_name=new_names.get(seq, tag_name), sql_fragment=sql_fragment, description=description,
+                         group_id=group_id, tag_type=tag_type, group_name=group_name)
+            if on_conflict == 'skip' and conflict:
+                results.append(SaveResult('skipped', tag))
+            else:
+                results.append(SaveResult('failed', tag, errors[(group_id, tag_type)]))
+        return saved, results
+
+    def find_by_tag_name(self, tag_name: str) -> Optional[SqlTag]:
+        tags = self._catalog.tags_named(tag_name)
+        return tags[0] if tags else None
 
     def find_all(self) -> List[SqlTag]:
         """获取所有SQL标签"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('''
-                SELECT t.id, t.tag_name, t.sql_fragment, t.description, 
+        return list(self.iter_all())
+
+    def _iter_tags(self, where: str, params: tuple, order_by: str,
+                   batch_size: int, limit: int = -1) -> Iterator[SqlTag]:
+        """按条件逐批读取标签，每次只从游标取 batch_size 行
+
+        查询不开启事务，迭代期间看到的是查询开始时的快照。
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = SqlTag.row_factory
+        cursor.execute(f'''
+            SELECT t.id, t.tag_name, t.sql_fragment, t.description,
+                   t.group_id, t.tag_type, t.create_time, t.update_time,
+                   g.group_name
+            FROM sql_tags t
+            JOIN tag_groups g ON t.group_id = g.id
+            WHERE {where}
+            ORDER BY {order_by}
+            LIMIT ?
+        ''', params + (limit,))
+        try:
+            while True:
+                tags = cursor.fetchmany(batch_size)
+                if not tags:
+                    break
+                yield from tags
+        finally:
+            cursor.close()
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[SqlTag]:
+        """逐批读取所有SQL标签，顺序同 find_all，内存占用与标签总数无关"""
+        return self._iter_tags('1', (), 't.group_id, t.tag_name', batch_size)
+
+    def iter_tags_by_group(self, group_id: int, batch_size: int = 1000) -> Iterator[SqlTag]:
+        """逐批读取组内标签，顺序同 find_tags_by_group"""
+        return self._iter_tags('t.group_id = ?', (group_id,), 't.id', batch_size)
+
+    def iter_tags_by_type(self, tag_type: str, batch_size: int = 1000) -> Iterator[SqlTag]:
+        """逐批读取指定类型的组下的标签"""
+        return self._iter_tags('g.group_type = ?', (tag_type,), 't.id', batch_size)
+
+    def page_tags(self, after_id: Optional[int] = None, limit: int = 100,
+                  group_id: Optional[int] = None) -> List[SqlTag]:
+        """按ID分页读取标签，返回ID大于 after_id 的前 limit 个
+
+        下一页传入本页最后一个标签的ID；返回空列表表示已经读完。
+        按主键定位，翻到多深都不需要跳过前面的行。
+        """
+        where, params = 't.id > ?', (after_id or 0,)
+        if group_id is not None:
+            where += ' AND t.group_id = ?'
+            params += (group_id,)
+        return list(self._iter_tags(where, params, 't.id', limit, limit))
+
+    def search(self, query: str, group_id: Optional[int] = None,
+               tag_type: Optional[str] = None, limit: int = 50) -> List[SqlTag]:
+        """在标签名、描述和SQL片段中搜索标签
+
+        query 按空白拆成多个词，每个词按前缀匹配，所有词都命中才算匹配。
+        结果按相关度排序，标签名命中的权重最高，其次是描述。
+        数据库没有全文索引时退回到 LIKE 子串匹配，按标签名排序。
+        """
+        terms = query.split()
+        if not terms:
+            return []
+
+        where, params = [], []
+        if group_id is not None:
+            where.append('t.group_id = ?')
+            params.append(group_id)
+        if tag_type is not None:
+            where.append('t.tag_type = ?')
+            params.append(tag_type)
+
+        # 纯标点的词分不出任何token，无法用于全文匹配
+        if self._has_fts and all(any(c.isalnum() for c in term) for term in terms):
+            match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+            source = 'sql_tags_fts JOIN sql_tags t ON t.id = sql_tags_fts.rowid'
+            where.insert(0, 'sql_tags_fts MATCH ?')
+            params.insert(0, match)
+            order_by = 'bm25(sql_tags_fts, 10.0, 5.0, 1.0)'
+        else:
+            source = 'sql_tags t'
+            for term in terms:
+                where.append("(t.tag_name LIKE ? ESCAPE '\\' OR t.description LIKE ? ESCAPE '\\'"
+                             " OR t.sql_fragment LIKE ? ESCAPE '\\')")
+                pattern = '%{}%'.format(
+                    term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+                params.extend([pattern] * 3)
+            order_by = 't.tag_name'
+
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = SqlTag.row_factory
+            return cursor.execute(f'''
+                SELECT t.id, t.tag_name, t.sql_fragment, t.description,
                        t.group_id, t.tag_type, t.create_time, t.update_time,
                        g.group_name
-                FROM sql_tags t
+                FROM {source}
                 JOIN tag_groups g ON t.group_id = g.id
-                ORDER BY t.group_id, t.tag_name
-            ''')
-            
-            rows = cursor.fetchall()
-            tags = []
-            for row in rows:
-                tag = SqlTag(
-                    id=row[0],
-                    tag_name=row[1],
-                    sql_fragment=row[2],
-                    description=row[3],
-                    group_id=row[4],
-                    tag_type=row[5],
-                    create_time=row[6],
-                    update_time=row[7],
-                    group_name=row[8]
-                )
-                tags.append(tag)
-            return tags
+                WHERE {' AND '.join(where)}
+                ORDER BY {order_by}
+                LIMIT ?
+            ''', params + [limit]).fetchall()
+
+    def count_tags(self) -> int:
+        """返回标签总数"""
+        with self._connection() as conn:
+            return conn.execute('''
+                SELECT COUNT(*) FROM sql_tags t JOIN tag_groups g ON t.group_id = g.id
+            ''').fetchone()[0]
 
     def find_all_tags(self) -> List[SqlTag]:
         """获取所有SQL标签的别名方法"""
@@ -202,12 +867,13 @@ class SqlTagRepository:
 
     def delete_by_tag_name(self, tag_name: str) -> bool:
         """删除指定标签名的SQL标签"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.execute(
                 'DELETE FROM sql_tags WHERE tag_name = ?',
                 (tag_name,)
             )
-            return cursor.rowcount > 0 
+            self._catalog.remove_tags_named(tag_name)
+            return cursor.rowcount > 0
 
     def validate_group_type(self, group_type: str, parent_group_id: Optional[int] = None):
         """验证组类型是否合法"""
@@ -236,7 +902,7 @@ class SqlTagRepository:
     def create_group(self, group_name: str, group_type: str, 
                     parent_group_id: Optional[int] = None) -> int:
         self.validate_group_type(group_type, parent_group_id)
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             now = datetime.now()
             cursor = conn.execute(
                 '''INSERT INTO tag_groups 
@@ -244,12 +910,20 @@ class SqlTagRepository:
                    VALUES (?, ?, ?, ?, ?)''',
                 (group_name, group_type, parent_group_id, now, now)
             )
+            self._catalog.put_group(TagGroup(
+                id=cursor.lastrowid,
+                group_name=group_name,
+                group_type=group_type,
+                parent_group_id=parent_group_id,
+                create_time=now,
+                update_time=now
+            ))
             return cursor.lastrowid
 
     def update_group(self, group_id: int, group_name: str, 
                     group_type: str, parent_group_id: Optional[int] = None):
         self.validate_group_type(group_type, parent_group_id)
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             now = datetime.now()
             conn.execute(
                 '''UPDATE tag_groups 
@@ -258,30 +932,35 @@ class SqlTagRepository:
                    WHERE id = ?''',
                 (group_name, group_type, parent_group_id, now, group_id)
             )
+            self._catalog.patch_group(
+                group_id,
+                group_name=group_name,
+                group_type=group_type,
+                parent_group_id=parent_group_id,
+                update_time=now
+            )
 
     def delete_group(self, group_id: int):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             # 删除组内的标签
             conn.execute('DELETE FROM sql_tags WHERE group_id = ?', (group_id,))
             # 删除组
             conn.execute('DELETE FROM tag_groups WHERE id = ?', (group_id,))
+            self._catalog.remove_group(group_id)
 
     def find_all_groups(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('SELECT * FROM tag_groups')
-            return [TagGroup(*row) for row in cursor.fetchall()]
+        return self._catalog.groups()
 
     def find_group_by_id(self, group_id: int):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('SELECT * FROM tag_groups WHERE id = ?', (group_id,))
-            row = cursor.fetchone()
-            return TagGroup(*row) if row else None
+        return self._catalog.group(group_id)
+
+    def find_group_by_name(self, group_name: str) -> Optional[TagGroup]:
+        """根据组名查找标签组，同名时返回ID最小的"""
+        groups = self._catalog.groups_named(group_name)
+        return groups[0] if groups else None
 
     def find_tags_by_group(self, group_id: int):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('SELECT * FROM sql_tags WHERE group_id = ?', (group_id,))
-            tags = [SqlTag(*row) for row in cursor.fetchall()]
-            return tags 
+        return self._catalog.tags_in_group(group_id)
 
     def validate_tag_type(self, tag_type: str, group_id: int):
         """验证标签类型是否合法"""
@@ -309,50 +988,141 @@ class SqlTagRepository:
 
     def find_tags_by_type(self, tag_type: str) -> List[SqlTag]:
         """根据标签类型查找标签"""
-        with sqlite3.connect(self.db_path) as conn:
-            query = """
-                SELECT t.* 
-                FROM sql_tags t
-                JOIN tag_groups g ON t.group_id = g.id
-                WHERE g.group_type = ?
-            """
-            cursor = conn.execute(query, (tag_type,))
-            rows = cursor.fetchall()
-            return [SqlTag(**{
-                'id': row[0],
-                'tag_name': row[1],
-                'sql_fragment': row[2],
-                'description': row[3],
-                'group_id': row[4],
-                'tag_type': row[5],
-                'create_time': row[6],
-                'update_time': row[7]
-            }) for row in rows]
+        return list(self.iter_tags_by_type(tag_type))
 
     def find_group_by_type(self, group_type: str) -> Optional[TagGroup]:
         """根据组类型查找标签组"""
-        with sqlite3.connect(self.db_path) as conn:
-            query = """
-                SELECT * FROM tag_groups 
-                WHERE group_type = ? AND parent_group_id IS NULL
-            """
-            cursor = conn.execute(query, (group_type,))
-            row = cursor.fetchone()
-            if row:
-                return TagGroup(
-                    id=row[0],
-                    group_name=row[1],
-                    group_type=row[2],
-                    description=row[3],
-                    parent_group_id=row[4],
-                    create_time=row[5],
-                    update_time=row[6]
+        return next((g for g in self._catalog.children(None)
+                     if g.group_type == group_type), None)
+
+    def get_group_tree(self, root_id: Optional[int] = None,
+                       max_depth: Optional[int] = None) -> List[GroupNode]:
+        """一次查询取出整棵组树
+
+        root_id 为空时返回所有根组（没有父组的组）及其后代，否则返回以该组为根的子树。
+        max_depth 不为空时只取到该深度（根组深度为0），只需要上面几层时不必读取整棵树。
+        父组不存在的孤立组不在树中。
+        """
+        if root_id is None:
+            anchor, params = 'IFNULL(parent_group_id, 0) = 0', ()
+        else:
+            anchor, params = 'id = ?', (root_id,)
+        if max_depth is None:
+            depth_limit = '(SELECT COUNT(*) FROM tag_groups)'
+        else:
+            depth_limit, params = '?', params + (max_depth,)
+        with self._connection() as conn:
+            # path 由补零的ID拼接而成，按它排序即为先序遍历，兄弟节点按ID排列
+            rows = conn.execute(f'''
+                WITH RECURSIVE tree(id, depth, path) AS (
+                    SELECT id, 0, printf('%012d', id) FROM tag_groups WHERE {anchor}
+                    UNION ALL
+                    SELECT g.id, tree.depth + 1, tree.path || '/' || printf('%012d', g.id)
+                    FROM tag_groups g JOIN tree ON g.parent_group_id = tree.id
+                    -- 数据中存在环时防止无限递归
+                    WHERE tree.depth < {depth_limit}
                 )
-            return None
+                SELECT g.id, g.group_name, g.group_type, g.description,
+                       g.parent_group_id, g.create_time, g.update_time, tree.depth
+                FROM tree JOIN tag_groups g ON g.id = tree.id
+                ORDER BY tree.path
+            ''', params).fetchall()
+
+        roots: List[GroupNode] = []
+        stack: List[GroupNode] = []  # 当前节点的祖先链，下标即深度
+        for row in rows:
+            depth = row[-1]
+            node = GroupNode(TagGroup(*row[:-1]), [])
+            del stack[depth:]
+            (stack[-1].children if stack else roots).append(node)
+            stack.append(node)
+        return roots
+
+    def get_group_children(self, parent_id: Optional[int] = None) -> List[GroupEntry]:
+        """查询一个组的直接子组，按组ID排序，并标出每个子组是否还有子组
+
+        parent_id 为空时返回根组，与 get_group_tree 的根组范围相同。
+        只查询一层，树形视图展开节点时再查询下一层。
+        """
+        if parent_id is None:
+            where, params = 'g.parent_group_id IS NULL OR g.parent_group_id = 0', ()
+        else:
+            where, params = 'g.parent_group_id = ?', (parent_id,)
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT g.id, g.group_name, g.group_type, g.description,
+                       g.parent_group_id, g.create_time, g.update_time,
+                       EXISTS(SELECT 1 FROM tag_groups c WHERE c.parent_group_id = g.id)
+                FROM tag_groups g
+                WHERE {where}
+                ORDER BY g.id
+            ''', params).fetchall()
+        return [GroupEntry(TagGroup(*row[:7]), bool(row[7])) for row in rows]
+
+    def find_groups_with_tags(self, group_type: Optional[str] = None
+                              ) -> List[Tuple[TagGroup, List[SqlTag]]]:
+        """一次联表查询取出所有组及各组的标签
+
+        按组ID排序，组内标签按标签ID排序，没有标签的组对应空列表。
+        group_type 不为空时只返回该类型的组。
+        """
+        where, params = '', ()
+        if group_type is not None:
+            where, params = 'WHERE g.group_type = ?', (group_type,)
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT g.id, g.group_name, g.group_type, g.description,
+                       g.parent_group_id, g.create_time, g.update_time,
+                       t.id, t.tag_name, t.sql_fragment, t.description,
+                       t.tag_type, t.create_time, t.update_time
+                FROM tag_groups g
+                LEFT JOIN sql_tags t ON t.group_id = g.id
+                {where}
+                ORDER BY g.id, t.id
+            ''', params).fetchall()
+
+        result: List[Tuple[TagGroup, List[SqlTag]]] = []
+        for row in rows:
+            if not result or result[-1][0].id != row[0]:
+                result.append((TagGroup(*row[:7]), []))
+            if row[7] is not None:
+                group = result[-1][0]
+                result[-1][1].append(SqlTag(row[7], row[8], row[9], row[10], group.id,
+                                            row[11], row[12], row[13], group.group_name))
+        return result
+
+    def get_ancestors(self, group_id: int) -> List[TagGroup]:
+        """返回组的所有祖先，从根组到直接父组，不含自身"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = TagGroup.row_factory
+            return cursor.execute('''
+                WITH RECURSIVE ancestors(id, parent_id, depth) AS (
+                    SELECT id, parent_group_id, 0 FROM tag_groups WHERE id = ?
+                    UNION ALL
+                    SELECT g.id, g.parent_group_id, ancestors.depth + 1
+                    FROM tag_groups g JOIN ancestors ON g.id = ancestors.parent_id
+                    WHERE ancestors.depth < (SELECT COUNT(*) FROM tag_groups)
+                )
+                SELECT g.* FROM ancestors JOIN tag_groups g ON g.id = ancestors.id
+                WHERE ancestors.depth > 0
+                ORDER BY ancestors.depth DESC
+            ''', (group_id,)).fetchall()
+
+    def get_descendants(self, group_id: int) -> List[TagGroup]:
+        """返回组的所有后代，先序排列，不含自身"""
+        descendants = []
+        pending = list(reversed(self.get_group_tree(group_id)))
+        while pending:
+            node = pending.pop()
+            if node.group.id != group_id:
+                descendants.append(node.group)
+            pending.extend(reversed(node.children))
+        return descendants
 
     def save_group(self, group: TagGroup) -> TagGroup:
         """保存标签组"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             now = datetime.now()
             if not group.id:  # 新建
                 cursor = conn.execute(
@@ -376,96 +1146,69 @@ class SqlTagRepository:
                 )
                 group.update_time = now
             
-            return group 
+            self._catalog.put_group(group)
+            return group
 
     def fix_group_types(self):
-        """检查并修复组类型"""
-        with sqlite3.connect(self.db_path) as conn:
-            # 获取所有没有父组的组
+        """检查并修复组类型：没有父组的组只允许 root 类型"""
+        with self._connection() as conn:
             cursor = conn.execute('''
-                SELECT id, group_name, group_type 
-                FROM tag_groups 
-                WHERE parent_group_id IS NULL
+                UPDATE tag_groups 
+                SET group_type = 'root' 
+                WHERE parent_group_id IS NULL AND IFNULL(group_type, '') <> 'root'
             ''')
-            root_groups = cursor.fetchall()
-            
-            for group_id, name, group_type in root_groups:
-                if group_type not in ['root']:  # 只允许 root 类型
-                    conn.execute('''
-                        UPDATE tag_groups 
-                        SET group_type = 'root' 
-                        WHERE id = ?
-                    ''', (group_id,))
+        # 没有需要修复的组时保留已加载的缓存
+        if cursor.rowcount:
+            self._catalog.invalidate()
 
     def find_tag_by_names(self, group_name: str, tag_name: str) -> Optional[SqlTag]:
         """根据组名和标签名查找标签"""
-        with sqlite3.connect(self.db_path) as conn:
+        for tag in self._catalog.tags_named(tag_name):
+            group = self._catalog.group(tag.group_id)
+            if group and group.group_name == group_name:
+                return tag
+        return None
+
+    def find_tag_ids_by_names(self) -> Dict[Tuple[str, str], int]:
+        """返回所有标签的 (组名, 标签名) -> 标签ID 映射，重复时保留第一个"""
+        with self._connection() as conn:
             cursor = conn.execute('''
-                SELECT t.id, t.tag_name, t.sql_fragment, t.description, 
-                       t.group_id, t.tag_type, t.create_time, t.update_time,
-                       g.group_name
+                SELECT g.group_name, t.tag_name, t.id
                 FROM sql_tags t
                 JOIN tag_groups g ON t.group_id = g.id
-                WHERE g.group_name = ? AND t.tag_name = ?
-            ''', (group_name, tag_name))
-            
-            row = cursor.fetchone()
-            if row:
-                return SqlTag(
-                    id=row[0],
-                    tag_name=row[1],
-                    sql_fragment=row[2],
-                    description=row[3],
-                    group_id=row[4],
-                    tag_type=row[5],
-                    create_time=row[6],
-                    update_time=row[7],
-                    group_name=row[8]
-                )
-            return None
+                ORDER BY t.id
+            ''')
+            ids = {}
+            for group_name, tag_name, tag_id in cursor:
+                ids.setdefault((group_name, tag_name), tag_id)
+            return ids
 
     def find_tag_by_name(self, tag_name: str) -> Optional[SqlTag]:
         """根据标签名查找标签"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('''
-                SELECT t.id, t.tag_name, t.sql_fragment, t.description, 
-                       t.group_id, t.tag_type, t.create_time, t.update_time,
-                       g.group_name
-                FROM sql_tags t
-                JOIN tag_groups g ON t.group_id = g.id
-                WHERE t.tag_name = ?
-            ''', (tag_name,))
-            
-            row = cursor.fetchone()
-            if row:
-                return SqlTag(
-                    id=row[0],
-                    tag_name=row[1],
-                    sql_fragment=row[2],
-                    description=row[3],
-                    group_id=row[4],
-                    tag_type=row[5],
-                    create_time=row[6],
-                    update_time=row[7],
-                    group_name=row[8]
-                )
-            return None
+        for tag in self._catalog.tags_named(tag_name):
+            if self._catalog.group(tag.group_id):
+                return tag
+        return None
 
     def update_tag(self, tag: SqlTag):
         """更新标签"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             now = datetime.now()
             conn.execute('''
                 UPDATE sql_tags 
                 SET sql_fragment = ?, description = ?, tag_type = ?, update_time = ?
                 WHERE id = ?
             ''', (tag.sql_fragment, tag.description, tag.tag_type, now, tag.id))
+            self._catalog.patch_tag(
+                tag.id,
+                sql_fragment=tag.sql_fragment,
+                description=tag.description,
+                tag_type=tag.tag_type,
+                update_time=now
+            )
 
     def find_by_parent_id(self, parent_id: int):
         """根据父组ID查找子组"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('''
-                SELECT * FROM tag_groups 
-                WHERE parent_group_id = ?
-            ''', (parent_id,))
-            return [TagGroup(*row) for row in cursor.fetchall()]
\ No newline at end of file
+        if parent_id is None:
+            return []
+        return self._catalog.children(parent_id)
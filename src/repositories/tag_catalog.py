@@ -0,0 +1,281 @@
+import copy
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from ..models.sql_tag import SqlTag
+from ..models.tag_group import TagGroup
+
+class TagCatalog:
+    """标签组和标签的内存目录
+
+    首次查询时从数据库整体加载，之后由仓储层在每个写事务提交后同步更新，
+    查询直接走字典。返回的对象都是副本，调用方修改不会污染缓存。
+    """
+
+    def __init__(self, load_groups: Callable[[], Iterable[TagGroup]],
+                 load_tags: Callable[[], Iterable[SqlTag]]):
+        self._load_groups = load_groups
+        self._load_tags = load_tags
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidate()
+
+    def invalidate(self):
+        """丢弃所有缓存数据，下次查询时重新加载"""
+        with self._lock:
+            self._groups = None           # id -> TagGroup，按id顺序
+            self._groups_by_name = None   # group_name -> [TagGroup]
+            self._groups_by_parent = None # parent_group_id -> [TagGroup]
+            self._tags = None             # id -> SqlTag
+            self._tags_by_group = {}      # group_id -> [SqlTag]
+            self._tags_by_name = {}       # tag_name -> [SqlTag]
+
+    def stats(self) -> Dict[str, int]:
+        """返回缓存命中统计"""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    # ---- 组 ----
+
+    def _ensure_groups(self):
+        if self._groups is None:
+            self.misses += 1
+            self._groups = {group.id: group for group in self._load_groups()}
+        else:
+            self.hits += 1
+
+    def _group_indexes(self):
+        """按名称和父组建立索引，组变化时重建"""
+        if self._groups_by_name is None:
+            by_name, by_parent = {}, {}
+            for group in self._groups.values():
+                by_name.setdefault(group.group_name, []).append(group)
+                by_parent.setdefault(group.parent_group_id, []).append(group)
+            self._groups_by_name = by_name
+            self._groups_by_parent = by_parent
+
+    def groups(self) -> List[TagGroup]:
+        with self._lock:
+            self._ensure_groups()
+            return [copy.copy(g) for g in self._groups.values()]
+
+    def group(self, group_id: int) -> Optional[TagGroup]:
+        with self._lock:
+            self._ensure_groups()
+            group = self._groups.get(group_id)
+            return copy.copy(group) if group is not None else None
+
+    def groups_named(self, group_name: str) -> List[TagGroup]:
+        with self._lock:
+            self._ensure_groups()
+            self._group_indexes()
+            return [copy.copy(g) for g in self._groups_by_name.get(group_name, [])]
+
+    def children(self, parent_id: Optional[int]) -> List[TagGroup]:
+        with self._lock:
+            self._ensure_groups()
+            self._group_indexes()
+            return [copy.copy(g) for g in self._groups_by_parent.get(parent_id, [])]
+
+    def put_group(self, group: TagGroup):
+        """新增或替换一个组"""
+        with self._lock:
+            if self._groups is None:
+                return
+            old = self._groups.get(group.id)
+            group = copy.copy(group)
+            if old is not None and group.create_time is None:
+                group.create_time = old.create_time
+            self._groups[group.id] = group
+            self._groups_by_name = self._groups_by_parent = None
+            self._sync_group_name(group)
+
+    def patch_group(self, group_id: int, **changes):
+        """只更新组的部分字段"""
+        with self._lock:
+            if self._groups is None or group_id not in self._groups:
+                return
+            group = copy.copy(self._groups[group_id])
+            for name, value in changes.items():
+                setattr(group, name, value)
+            self._groups[group_id] = group
+            self._groups_by_name = self._groups_by_parent = None
+            self._sync_group_name(group)
+
+    def _sync_group_name(self, group: TagGroup):
+        """组改名后同步组内标签携带的组名"""
+        if self._tags is None:
+            return
+        for tag in self._tags_by_group.get(group.id, []):
+            tag.group_name = group.group_name
+
+    def remove_group(self, group_id: int):
+        """删除组及其下的标签"""
+        with self._lock:
+            if self._groups is not None:
+                self._groups.pop(group_id, None)
+                self._groups_by_name = self._groups_by_parent = None
+            if self._tags is not None:
+                for tag in self._tags_by_group.pop(group_id, []):
+                    del self._tags[tag.id]
+                    self._unlink(self._tags_by_name, tag.tag_name, tag)
+
+    # ---- 标签 ----
+
+    def _ensure_tags(self):
+        if self._tags is None:
+            self.misses += 1
+            self._tags = {}
+            self._tags_by_group = {}
+            self._tags_by_name = {}
+            for tag in self._load_tags():
+                self._link(tag)
+        else:
+            self.hits += 1
+
+    def _link(self, tag: SqlTag):
+        self._tags[tag.id] = tag
+        self._tags_by_group.setdefault(tag.group_id, []).append(tag)
+        self._tags_by_name.setdefault(tag.tag_name, []).append(tag)
+
+    @staticmethod
+    def _unlink(index: Dict, key, tag: SqlTag):
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket[:] = [t for t in bucket if t.id != tag.id]
+        if not bucket:
+            del index[key]
+
+    def tags_in_group(self, group_id: int) -> List[SqlTag]:
+        with self._lock:
+            self._ensure_tags()
+            return [copy.copy(t) for t in self._tags_by_group.get(group_id, [])]
+
+    def tags_named(self, tag_name: str) -> List[SqlTag]:
+        """按标签名查找，结果按组ID排序"""
+        with self._lock:
+            self._ensure_tags()
+            tags = sorted(self._tags_by_name.get(tag_name, []), key=lambda t: t.group_id)
+            return [copy.copy(t) for t in tags]
+
+    def put_tag(self, tag: SqlTag):
+        """新增或替换一个标签"""
+        with self._lock:
+            if self._tags is None:
+                return
+            tag = copy.copy(tag)
+            old = self._tags.get(tag.id)
+            if old is None:
+                self._link(tag)
+                return
+            tag.create_time = old.create_time
+            if old.group_id == tag.group_id and old.tag_name == tag.tag_name:
+                # 原位替换，保持与数据库一致的顺序
+                self._tags[tag.id] = tag
+                for bucket in (self._tags_by_group[tag.group_id],
+                               self._tags_by_name[tag.tag_name]):
+                    bucket[next(i for i, t in enumerate(bucket) if t is old)] = tag
+                return
+            self._unlink(self._tags_by_group, old.group_id, old)
+            self._unlink(self._tags_by_name, old.tag_name, old)
+            self._link(tag)
+
+    def patch_tag(self, tag_id: int, **changes):
+        """只更新标签的部分字段"""
+        with self._lock:
+            if self._tags is None or tag_id not in self._tags:
+                return
+            tag = copy.copy(self._tags[tag_id])
+            for name, value in changes.items():
+                setattr(tag, name, value)
+            self.put_tag(tag)
+
+    def remove_tags_named(self, tag_name: str):
+        with self._lock:
+            if self._tags is None:
+                return
+            for tag in self._tags_by_name.pop(tag_name, []):
+                del self._tags[tag.id]
+                self._unlink(self._tags_by_group, tag.group_id, tag)
+
+
+class TransactionCatalog:
+    """一个线程的写事务期间使用的目录
+
+    写操作先记录下来，事务提交后才应用到共享目录，其他线程读不到未提交的数据，
+    提交前共享目录被重新加载也不会丢失这些修改。本事务写过之后的查询
+    改由一个私有目录回答，它从本线程的连接加载，能看到本事务未提交的修改。
+    回滚时直接丢弃本对象即可。
+    """
+
+    def __init__(self, shared: TagCatalog, load_groups: Callable[[], Iterable[TagGroup]],
+                 load_tags: Callable[[], Iterable[SqlTag]]):
+        self._shared = shared
+        self._load_groups = load_groups
+        self._load_tags = load_tags
+        self._pending = []   # [(方法名, 参数, 关键字参数)]
+        self._view: Optional[TagCatalog] = None
+
+    def apply(self):
+        """事务提交后调用，把记录的修改应用到共享目录"""
+        for name, args, kwargs in self._pending:
+            getattr(self._shared, name)(*args, **kwargs)
+        self._pending = []
+
+    def _record(self, name: str, *args, **kwargs):
+        self._pending.append((name, args, kwargs))
+        if self._view is not None:
+            getattr(self._view, name)(*args, **kwargs)
+
+    def _reader(self) -> TagCatalog:
+        if not self._pending:
+            return self._shared
+        if self._view is None:
+            self._view = TagCatalog(self._load_groups, self._load_tags)
+        return self._view
+
+    def stats(self) -> Dict[str, int]:
+        return self._shared.stats()
+
+    # ---- 查询 ----
+
+    def groups(self) -> List[TagGroup]:
+        return self._reader().groups()
+
+    def group(self, group_id: int) -> Optional[TagGroup]:
+        return self._reader().group(group_id)
+
+    def groups_named(self, group_name: str) -> List[TagGroup]:
+        return self._reader().groups_named(group_name)
+
+    def children(self, parent_id: Optional[int]) -> List[TagGroup]:
+        return self._reader().children(parent_id)
+
+    def tags_in_group(self, group_id: int) -> List[SqlTag]:
+        return self._reader().tags_in_group(group_id)
+
+    def tags_named(self, tag_name: str) -> List[SqlTag]:
+        return self._reader().tags_named(tag_name)
+
+    # ---- 修改，调用方之后可能继续修改传入的对象，所以先复制 ----
+
+    def invalidate(self):
+        self._record('invalidate')
+
+    def put_group(self, group: TagGroup):
+        self._record('put_group', copy.copy(group))
+
+    def patch_group(self, group_id: int, **changes):
+        self._record('patch_group', group_id, **changes)
+
+    def remove_group(self, group_id: int):
+        self._record('remove_group', group_id)
+
+    def put_tag(self, tag: SqlTag):
+        self._record('put_tag', copy.copy(tag))
+
+    def patch_tag(self, tag_id: int, **changes):
+        self._record('patch_tag', tag_id, **changes)
+
+    def remove_tags_named(self, tag_name: str):
+        self._record('remove_tags_named', tag_name)
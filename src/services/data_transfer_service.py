@@ -1,239 +1,292 @@
+import csv
+import json
 import sqlite3
-import pandas as pd
-from typing import List, Dict, Tuple
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from ..models.sql_tag import SqlTag
+from ..models.tag_group import TagGroup
+from .table_reader import open_table, iter_batches
 import os
 
+# 导入导出文件的中文列名到内部字段名的映射，顺序即导出时的列顺序
+IMPORT_COLUMNS = {
+    '组名': 'group_name',
+    '标签名': 'tag_name',
+    'SQL内容': 'sql_content',
+    '描述': 'description',
+    '标签类型': 'tag_type'
+}
+
+# 导入时每批写入的行数
+IMPORT_BATCH_SIZE = 5000
+
+# 导出时每写入多少行报告一次进度
+EXPORT_PROGRESS_STEP = 1000
+
+# Excel 单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
 class DataTransferService:
     def __init__(self, repository):
         self.repository = repository
 
-    def export_to_excel(self, filepath: str) -> None:
-        """导出数据到Excel文件"""
-        # 获取所有标签数据
-        tags = self.repository.find_all()
-        
-        # 转换为DataFrame格式
-        data = []
-        for tag in tags:
-            data.append({
-                'group_name': tag.group_name,
-                'tag_name': tag.tag_name,
-                'sql_content': tag.sql_fragment,
-                'description': tag.description or '',
-                'tag_type': tag.tag_type
-            })
-        
-        df = pd.DataFrame(data)
-        # 保存到Excel，并设置列的顺序
-        df = df[['group_name', 'tag_name', 'sql_content', 'description', 'tag_type']]
-        df.columns = ['组名', '标签名', 'SQL内容', '描述', '标签类型']
-        df.to_excel(filepath, index=False, sheet_name='SQL标签')
-
-    def import_from_excel(self, filepath: str, conflict_strategy: str = 'skip') -> Tuple[int, List[str]]:
+    def export_to_excel(self, filepath: str,
+                        progress: Optional[Callable[[int, int], None]] = None) -> None:
+        """导出数据到Excel文件
+
+        使用 openpyxl 的只写模式逐行写入，内存占用与标签数量无关。
+        progress(已完成, 总数) 用于报告进度。
+        """
+        from openpyxl import Workbook
+
+        total = self.repository.count_tags()
+        if total >= EXCEL_MAX_ROWS:
+            raise ValueError(f"标签数量({total})超过Excel单表行数上限，请导出为CSV或JSON Lines文件")
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('SQL标签')
+        sheet.append(list(IMPORT_COLUMNS))
+        for record in self._export_records(total, progress):
+            sheet.append(record)
+        workbook.save(filepath)
+
+    def export_to_csv(self, filepath: str,
+                      progress: Optional[Callable[[int, int], None]] = None) -> None:
+        """导出数据到CSV文件，列与Excel导出相同，可直接用 import_from_csv 导入"""
+        total = self.repository.count_tags()
+        with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(IMPORT_COLUMNS))
+            writer.writerows(self._export_records(total, progress))
+
+    def export_to_jsonl(self, filepath: str,
+                        progress: Optional[Callable[[int, int], None]] = None) -> None:
+        """导出数据到JSON Lines文件，每行一个标签，键为内部字段名"""
+        total = self.repository.count_tags()
+        fields = list(IMPORT_COLUMNS.values())
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for record in self._export_records(total, progress):
+                f.write(json.dumps(dict(zip(fields, record)), ensure_ascii=False))
+                f.write('\n')
+
+    def _export_records(self, total: int,
+                        progress: Optional[Callable[[int, int], None]]) -> Iterator[tuple]:
+        """按导出列顺序逐条产出标签数据"""
+        done = 0
+        for tag in self.repository.iter_all():
+            yield (tag.group_name, tag.tag_name, tag.sql_fragment,
+                   tag.description or '', tag.tag_type)
+            done += 1
+            if progress and done % EXPORT_PROGRESS_STEP == 0:
+                progress(done, total)
+        if progress:
+            progress(done, total)
+
+    def import_from_excel(self, filepath: str, conflict_strategy: str = 'skip',
+                          progress: Optional[Callable[[int, int], None]] = None,
+                          on_errors: Optional[Callable[[List[str]], None]] = None
+                          ) -> Tuple[int, List[str]]:
         """
         从Excel导入数据
         conflict_strategy: 'skip' - 跳过已存在的标签
                          'replace' - 替换已存在的标签
                          'rename' - 重命名新标签
+        progress(已处理行数, 0) 每批调用一次，总行数未知时为0；
+        progress 抛出的异常会中止导入并回滚。
+        on_errors(本批新增的错误消息) 每批调用一次。
         返回: (导入成功数量, 错误消息列表)
         """
+        return self._import_table(filepath, conflict_strategy, 'Excel', progress, on_errors)
+
+    def import_from_csv(self, filepath: str, conflict_strategy: str = 'skip',
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        on_errors: Optional[Callable[[List[str]], None]] = None
+                        ) -> Tuple[int, List[str]]:
+        """
+        从CSV/TSV文件导入数据（.tsv 按制表符分隔），不依赖pandas
+        conflict_strategy、progress、on_errors: 同import_from_excel
+        """
+        return self._import_table(filepath, conflict_strategy, 'CSV', progress, on_errors)
+
+    def _import_table(self, filepath: str, conflict_strategy: str, file_kind: str,
+                      progress: Optional[Callable[[int, int], None]] = None,
+                      on_errors: Optional[Callable[[List[str]], None]] = None
+                      ) -> Tuple[int, List[str]]:
+        """逐行读取表格文件并分批导入"""
         try:
-            # print(f"\n=== 开始导入Excel文件：{filepath} ===")
-            # print(f"冲突处理策略：{conflict_strategy}")
-            
-            df = pd.read_excel(filepath)
-            # 检查中文列名
-            if '组名' in df.columns and '标签名' in df.columns and 'SQL内容' in df.columns:
-                # 将中文列名转换为英文
-                df = df.rename(columns={
-                    '组名': 'group_name',
-                    '标签名': 'tag_name',
-                    'SQL内容': 'sql_content',
-                    '描述': 'description',
-                    '标签类型': 'tag_type'
-                })
-            
-            required_columns = {'group_name', 'tag_name', 'sql_content'}
-            if not all(col in df.columns for col in required_columns):
-                return 0, ['Excel文件格式不正确，必须包含：组名、标签名和SQL内容列']
+            columns, table_rows = open_table(filepath)
+            try:
+                columns = {IMPORT_COLUMNS.get(col, col) for col in columns}
 
-            success_count = 0
-            errors = []
-            
-            for _, row in df.iterrows():
-                try:
-                    group_name = str(row['group_name']).strip()
-                    tag_name = str(row['tag_name']).strip()
-                    sql_content = str(row['sql_content']).strip()
-                    description = str(row.get('description', '')).strip()
-                    tag_type = str(row.get('tag_type', 'table')).strip()  # 默认为table类型
-
-                    # print(f"\n处理标签：{group_name}-{tag_name}")
-
-                    # 检查必填字段
-                    if not all([group_name, tag_name, sql_content]):
-                        error_msg = f'标签 [{group_name}-{tag_name}] 包含空值，已跳过'
-                        # print(f"错误：{error_msg}")
-                        errors.append(error_msg)
-                        continue
-
-                    # 查找或创建组
-                    group_id = None
-                    with sqlite3.connect(self.repository.db_path) as conn:
-                        cursor = conn.execute(
-                            'SELECT id FROM tag_groups WHERE group_name = ?',
-                            (group_name,)
-                        )
-                        result = cursor.fetchone()
-                        if result:
-                            group_id = result[0]
-                            # print(f"找到现有组：{group_name} (ID={group_id})")
-                        else:
-                            # 创建新组（作为根组）
-                            cursor = conn.execute(
-                                '''INSERT INTO tag_groups 
-                                   (group_name, group_type, create_time, update_time)
-                                   VALUES (?, 'root', datetime('now'), datetime('now'))''',
-                                (group_name,)
-                            )
-                            group_id = cursor.lastrowid
-                            conn.commit()
-                            # print(f"创建新组：{group_name} (ID={group_id})")
-
-                    if not group_id:
-                        error_msg = f'创建组 [{group_name}] 失败'
-                        # print(f"错误：{error_msg}")
-                        errors.append(error_msg)
-                        continue
-
-                    # 检查是否存在
-                    existing_tag = self.repository.find_tag_by_names(group_name, tag_name)
-                    
-                    if existing_tag:
-                        # print(f"标签已存在：{group_name}-{tag_name}")
-                        if conflict_strategy == 'skip':
-                            error_msg = f'标签 [{group_name}-{tag_name}] 已存在，已跳过'
-                            # print(error_msg)
-                            errors.append(error_msg)
-                            continue
-                        elif conflict_strategy == 'rename':
-                            i = 1
-                            new_tag_name = f"{tag_name}_{i}"
-                            while self.repository.find_tag_by_names(group_name, new_tag_name):
-                                i += 1
-                                new_tag_name = f"{tag_name}_{i}"
-                            tag_name = new_tag_name
-                            # print(f"重命名为：{tag_name}")
-
-                    try:
-                        if existing_tag and conflict_strategy == 'replace':
-                            # print(f"更新现有标签：{group_name}-{tag_name}")
-                            # 更新现有标签
-                            existing_tag.sql_fragment = sql_content
-                            existing_tag.description = description
-                            existing_tag.tag_type = tag_type
-                            self.repository.update_tag(existing_tag)
-                        else:
-                            # print(f"创建新标签：{group_name}-{tag_name}")
-                            # 创建新标签
-                            self.repository.save(
-                                tag_name=tag_name,
-                                sql_fragment=sql_content,
-                                description=description,
-                                group_id=group_id,
-                                tag_type=tag_type
-                            )
-                        
-                        success_count += 1
-                        # print(f"处理成功！")
-                    
-                    except Exception as e:
-                        error_msg = f'保存标签 [{group_name}-{tag_name}] 时出错: {str(e)}'
-                        # print(f"错误：{error_msg}")
-                        errors.append(error_msg)
-                
-                except Exception as e:
-                    error_msg = f'处理标签 [{group_name}-{tag_name}] 时出错: {str(e)}'
-                    # print(f"错误：{error_msg}")
-                    errors.append(error_msg)
-
-            # print(f"\n=== 导入完成 ===")
-            # print(f"成功导入：{success_count} 个标签")
-            # print(f"错误数量：{len(errors)}")
-            return success_count, errors
+                required_columns = {'group_name', 'tag_name', 'sql_content'}
+                if not required_columns <= columns:
+                    return 0, [f'{file_kind}文件格式不正确，必须包含：组名、标签名和SQL内容列']
+
+                # 将中文列名转换为英文
+                rows = ({IMPORT_COLUMNS.get(k, k): v for k, v in row.items()} for row in table_rows)
+                return self._import_rows(rows, conflict_strategy,
+                                         progress=progress, on_errors=on_errors)
+            finally:
+                table_rows.close()
 
         except Exception as e:
-            error_msg = f'导入Excel文件时出错: {str(e)}'
-            # print(f"错误：{error_msg}")
+            error_msg = f'导入{file_kind}文件时出错: {str(e)}'
             return 0, [error_msg]
 
-    def export_to_sqlite(self, filepath: str) -> None:
-        """导出数据到SQLite数据库"""
+    def _import_rows(self, rows: Iterable[Dict], conflict_strategy: str,
+                     batch_size: int = IMPORT_BATCH_SIZE,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     on_errors: Optional[Callable[[List[str]], None]] = None
+                     ) -> Tuple[int, List[str]]:
+        """批量导入表格行
+
+        在内存中完成组解析、冲突判断和重命名，每 batch_size 行批量写入一次，
+        整个导入在同一个事务中完成。每行是包含 group_name、tag_name、
+        sql_content 以及可选的 description、tag_type 的字典。
+        每写入一批调用一次 progress(已处理行数, 0) 和 on_errors(本批新增的错误)。
+        """
+        success_count = 0
+        errors = []
+        processed = 0
+        now = datetime.now()
+
+        with self.repository.transaction():
+            # 已存在的 (组名, 标签名) -> 标签ID，本次新增的标签以 None 占位
+            existing = self.repository.find_tag_ids_by_names()
+            names_by_group: Dict[str, set] = {}
+            for group_name, tag_name in existing:
+                names_by_group.setdefault(group_name, set()).add(tag_name)
+
+            group_ids: Dict[str, int] = {}
+            checked: Dict[Tuple[int, str], Optional[str]] = {}  # 标签类型校验结果
+
+            for batch in iter_batches(rows, batch_size):
+                reported = len(errors)
+                success_count += self._import_batch(
+                    batch, conflict_strategy, existing, names_by_group,
+                    group_ids, checked, errors, now
+                )
+                processed += len(batch)
+                if on_errors and len(errors) > reported:
+                    on_errors(errors[reported:])
+                if progress:
+                    progress(processed, 0)
+
+        return success_count, errors
+
+    def _import_batch(self, batch: List[Dict], conflict_strategy: str,
+                      existing: Dict[Tuple[str, str], Optional[int]],
+                      names_by_group: Dict[str, set], group_ids: Dict[str, int],
+                      checked: Dict[Tuple[int, str], Optional[str]],
+                      errors: List[str], now: datetime) -> int:
+        """处理一批行并写入数据库，返回成功数量"""
+        success_count = 0
+        inserts: List[SqlTag] = []
+        pending: Dict[Tuple[str, str], int] = {}  # 本批新增标签在 inserts 中的下标
+        updates = []  # (组名, 标签名, 新标签内容)
+
+        for row in batch:
+            group_name = str(row['group_name']).strip()
+            tag_name = str(row['tag_name']).strip()
+            sql_content = str(row['sql_content']).strip()
+            description = str(row.get('description', '')).strip()
+            tag_type = str(row.get('tag_type') or 'table').strip()  # 默认为table类型
+
+            # 检查必填字段
+            if not all([group_name, tag_name, sql_content]):
+                errors.append(f'标签 [{group_name}-{tag_name}] 包含空值，已跳过')
+                continue
+
+            # 查找或创建组（作为根组）
+            group_id = group_ids.get(group_name)
+            if group_id is None:
+                group = self.repository.find_group_by_name(group_name)
+                if not group:
+                    result = self.repository.save_groups_many([TagGroup(
+                        group_name=group_name,
+                        group_type='root',
+                        create_time=now,
+                        update_time=now
+                    )])[0]
+                    group = result.item if result.status != 'failed' else None
+                if not group:
+                    errors.append(f'创建组 [{group_name}] 失败')
+                    continue
+                group_id = group_ids[group_name] = group.id
+
+            names = names_by_group.setdefault(group_name, set())
+            tag = SqlTag(
+                tag_name=tag_name,
+                sql_fragment=sql_content,
+                description=description,
+                group_id=group_id,
+                tag_type=tag_type
+            )
+
+            if tag_name in names:
+                if conflict_strategy == 'skip':
+                    errors.append(f'标签 [{group_name}-{tag_name}] 已存在，已跳过')
+                    continue
+                elif conflict_strategy == 'replace':
+                    updates.append((group_name, tag_name, tag))
+                    success_count += 1
+                    continue
+                elif conflict_strategy == 'rename':
+                    i = 1
+                    new_tag_name = f"{tag_name}_{i}"
+                    while new_tag_name in names:
+                        i += 1
+                        new_tag_name = f"{tag_name}_{i}"
+                    tag.tag_name = tag_name = new_tag_name
+
+            # 新标签：按组和类型校验（结果缓存），失败的行不占用标签名
+            key = (group_id, tag_type)
+            if key not in checked:
+                try:
+                    self.repository.validate_tag_type(tag_type, group_id)
+                    checked[key] = None
+                except ValueError as e:
+                    checked[key] = str(e)
+            if checked[key]:
+                errors.append(f'保存标签 [{group_name}-{tag_name}] 时出错: {checked[key]}')
+                continue
+
+            names.add(tag_name)
+            pending[(group_name, tag_name)] = len(inserts)
+            inserts.append(tag)
+            success_count += 1
+
+        # 批量写入新标签，再按顺序应用替换
+        results = self.repository.save_many(inserts, on_conflict='replace')
+        for key, index in pending.items():
+            existing[key] = results[index].item.id
+        for group_name, tag_name, tag in updates:
+            tag.id = existing[(group_name, tag_name)]
+            self.repository.update_tag(tag)
+
+        return success_count
+
+    def export_to_sqlite(self, filepath: str,
+                         progress: Optional[Callable[[int, int], None]] = None) -> None:
+        """导出数据到SQLite数据库
+
+        直接备份整个数据库文件，导出的库包含相同的表结构、索引和版本号。
+        progress(已完成, 总数) 用于报告进度。
+        """
         # 如果文件已存在，先删除它
         if os.path.exists(filepath):
             os.remove(filepath)
-            
-        conn = sqlite3.connect(filepath)
-        cursor = conn.cursor()
-        
-        # 创建表结构
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tag_groups (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                group_name TEXT NOT NULL,
-                group_type TEXT NOT NULL DEFAULT 'root',
-                description TEXT,
-                parent_group_id INTEGER,
-                create_time TIMESTAMP,
-                update_time TIMESTAMP,
-                FOREIGN KEY (parent_group_id) REFERENCES tag_groups(id),
-                UNIQUE(group_name, parent_group_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sql_tags (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tag_name TEXT NOT NULL,
-                sql_fragment TEXT NOT NULL,
-                description TEXT,
-                group_id INTEGER NOT NULL,
-                tag_type TEXT NOT NULL,
-                create_time TIMESTAMP,
-                update_time TIMESTAMP,
-                FOREIGN KEY (group_id) REFERENCES tag_groups(id),
-                UNIQUE(tag_name, group_id)
-            )
-        ''')
-        
-        # 获取所有标签组并导出
-        groups = self.repository.find_all_groups()
-        for group in groups:
-            cursor.execute('''
-                INSERT INTO tag_groups 
-                (id, group_name, group_type, description, parent_group_id, create_time, update_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (group.id, group.group_name, group.group_type, group.description, 
-                 group.parent_group_id, group.create_time, group.update_time))
-        
-        # 获取所有标签并导出
-        tags = self.repository.find_all_tags()
-        for tag in tags:
-            cursor.execute('''
-                INSERT INTO sql_tags 
-                (id, tag_name, sql_fragment, description, group_id, tag_type, create_time, update_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (tag.id, tag.tag_name, tag.sql_fragment, tag.description, 
-                 tag.group_id, tag.tag_type, tag.create_time, tag.update_time))
-        
-        conn.commit()
-        conn.close()
-
-    def import_from_sqlite(self, filepath: str, conflict_strategy: str = 'skip') -> Tuple[int, List[str]]:
+
+        self.repository.backup_to(filepath, progress)
+
+    def import_from_sqlite(self, filepath: str, conflict_strategy: str = 'skip',
+                           progress: Optional[Callable[[int, int], None]] = None
+                           ) -> Tuple[int, List[str]]:
         """
         从SQLite数据库导入数据
         conflict_strategy: 同import_from_excel
+        合并由集合式SQL在一个事务中完成，中途没有进度；progress(0, 0) 只在合并前调用一次，
+        它抛出的异常可以在写入前中止导入。
         """
         try:
             conn = sqlite3.connect(filepath)
@@ -245,92 +298,22 @@ class DataTransferService:
                 WHERE type='table' AND name IN ('sql_tags', 'tag_groups')
             """)
             tables = cursor.fetchall()
+            conn.close()
             if len(tables) < 2:
                 return 0, ['数据库中缺少必要的表：sql_tags 或 tag_groups']
 
-            # 先导入标签组
-            cursor.execute('SELECT * FROM tag_groups')
-            source_groups = cursor.fetchall()
-            
-            # 获取现有的组
-            existing_groups = {group.group_name: group for group in self.repository.find_all_groups()}
-            
-            # 导入新的组（不覆盖已存在的）
-            group_id_mapping = {}  # 用于存储源数据库ID到目标数据库ID的映射
-            for group in source_groups:
-                src_id, group_name, group_type, description, parent_id, create_time, update_time = group
-                
-                if group_name not in existing_groups:
-                    # 如果组不存在，则创建新组
-                    with sqlite3.connect(self.repository.db_path) as conn:
-                        cursor2 = conn.execute('''
-                            INSERT INTO tag_groups 
-                            (group_name, group_type, description, parent_group_id, create_time, update_time)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        ''', (group_name, group_type, description, parent_id, create_time, update_time))
-                        group_id_mapping[src_id] = cursor2.lastrowid
-                else:
-                    # 如果组已存在，记录ID映射
-                    group_id_mapping[src_id] = existing_groups[group_name].id
-
-            # 获取所有标签
-            cursor.execute('''
-                SELECT t.id, t.tag_name, t.sql_fragment, t.description, 
-                       t.group_id, t.tag_type, t.create_time, t.update_time,
-                       g.group_name
-                FROM sql_tags t
-                JOIN tag_groups g ON t.group_id = g.id
-            ''')
-            
-            success_count = 0
+            if progress:
+                progress(0, 0)
+            # 挂载源库后用集合式SQL完成组映射和标签合并
+            success_count, results = self.repository.merge_database(filepath, conflict_strategy)
+
             errors = []
-            
-            for row in cursor.fetchall():
-                try:
-                    src_id, tag_name, sql_fragment, description, src_group_id, tag_type, create_time, update_time, group_name = row
-                    
-                    # 使用映射后的group_id
-                    mapped_group_id = group_id_mapping.get(src_group_id)
-                    if not mapped_group_id:
-                        errors.append(f'标签 [{group_name}-{tag_name}] 的组ID映射失败，已跳过')
-                        continue
-
-                    # 检查是否存在
-                    existing_tag = self.repository.find_tag_by_names(group_name, tag_name)
-                    
-                    if existing_tag:
-                        if conflict_strategy == 'skip':
-                            errors.append(f'标签 [{group_name}-{tag_name}] 已存在，已跳过')
-                            continue
-                        elif conflict_strategy == 'rename':
-                            i = 1
-                            new_tag_name = f"{tag_name}_{i}"
-                            while self.repository.find_tag_by_names(group_name, new_tag_name):
-                                i += 1
-                                new_tag_name = f"{tag_name}_{i}"
-                            tag_name = new_tag_name
-
-                    # 创建或更新标签
-                    if existing_tag and conflict_strategy == 'replace':
-                        existing_tag.sql_fragment = sql_fragment
-                        existing_tag.description = description
-                        existing_tag.tag_type = tag_type
-                        self.repository.update_tag(existing_tag)
-                    else:
-                        self.repository.save(
-                            tag_name=tag_name,
-                            sql_fragment=sql_fragment,
-                            description=description,
-                            group_id=mapped_group_id,
-                            tag_type=tag_type
-                        )
-                    
-                    success_count += 1
-                    
-                except Exception as e:
-                    errors.append(f'处理标签 [{group_name}-{tag_name}] 时出错: {str(e)}')
-            
-            conn.close()
+            for result in results:
+                tag = result.item
+                if result.status == 'skipped':
+                    errors.append(f'标签 [{tag.group_name}-{tag.tag_name}] 已存在，已跳过')
+                else:
+                    errors.append(f'处理标签 [{tag.group_name}-{tag.tag_name}] 时出错: {result.error}')
             return success_count, errors
             
         except Exception as e:
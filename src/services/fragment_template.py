@@ -0,0 +1,79 @@
+"""SQL片段模板
+
+片段使用 str.format 的占位符语法。compile_fragment 只解析一次，
+把片段拆成交替出现的字面量和占位符，渲染时直接拼接，
+结果与 fragment.format(**params) 完全一致。
+"""
+import re
+from string import Formatter
+from typing import Any, List, Mapping, Tuple
+
+# 只有名字、没有属性/下标访问、转换和格式说明的占位符可以直接取值拼接
+_SIMPLE_FIELD = re.compile(r'[^\W\d]\w*\Z')
+_FIELD_ROOT = re.compile(r'[^.\[]*')
+
+
+class FragmentTemplate:
+    """编译后的片段模板
+
+    literals 比 fields 多一项：渲染结果为
+    literals[0] + fields[0] + literals[1] + ... + literals[-1]。
+    fields 中简单占位符保存参数名，复杂占位符保存只含该占位符的格式串。
+    """
+    __slots__ = ('source', 'literals', 'fields', 'simple', 'params', 'positional')
+
+    def __init__(self, source: str, literals: List[str], fields: List[str],
+                 simple: List[bool], params: Tuple[str, ...], positional: bool):
+        self.source = source
+        self.literals = literals
+        self.fields = fields
+        self.simple = simple
+        self.params = params          # 需要的参数名，按首次出现的顺序
+        self.positional = positional    # 含位置占位符，只能交给 str.format
+
+    def render(self, params: Mapping[str, Any]) -> str:
+        if self.positional:
+            # 位置占位符在只有关键字参数时必然出错，交给 str.format 抛出同样的异常
+            return self.source.format(**params)
+        literals = self.literals
+        parts = [literals[0]]
+        for i, field in enumerate(self.fields):
+            if self.simple[i]:
+                parts.append(format(params[field]))
+            else:
+                parts.append(field.format_map(params))
+            parts.append(literals[i + 1])
+        return ''.join(parts)
+
+
+def compile_fragment(source: str) -> FragmentTemplate:
+    """解析片段，格式错误时抛出与 str.format 相同的 ValueError"""
+    literals, fields, simple = [''], [], []
+    params: List[str] = []
+    positional = False
+    for literal, field_name, format_spec, conversion in Formatter().parse(source):
+        literals[-1] += literal
+        if field_name is None:
+            continue
+        # 格式说明里也可以嵌套占位符，如 {value:{width}}
+        names = [field_name] + [name for _, name, _, _ in Formatter().parse(format_spec or '')
+                                if name is not None]
+        for name in names:
+            root = _FIELD_ROOT.match(name).group()
+            if not root or root.isdigit():
+                positional = True
+            elif root not in params:
+                params.append(root)
+        if _SIMPLE_FIELD.match(field_name) and not format_spec and not conversion:
+            fields.append(field_name)
+            simple.append(True)
+        else:
+            field = '{' + field_name
+            if conversion:
+                field += '!' + conversion
+            if format_spec:
+                field += ':' + format_spec
+            fields.append(field + '}')
+            simple.append(False)
+        literals.append('')
+    return FragmentTemplate(source, literals, fields, simple, tuple(params), positional)
@@ -0,0 +1,281 @@
+"""SQL语句的不可变表示
+
+SqlBuilder 先把参数转换成这里的节点，再由 render() 统一渲染成SQL文本。
+节点都是 NamedTuple：不可修改，可以直接比较；不含不可哈希的值时也可以作为字典键，
+用 _replace() 得到只改动一部分的新语句。
+
+值只出现在 Value 和 Template 节点里，渲染时交给 bind(name, value) 回调，
+由回调决定内联为字面量还是输出绑定参数占位符。
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from .fragment_template import compile_fragment
+
+Bind = Callable[[str, Any], str]
+
+
+# ---- 表达式 ----
+
+class Column(NamedTuple):
+    """列引用"""
+    name: str
+
+
+class Raw(NamedTuple):
+    """原样输出的SQL文本，如条件标签的片段或 AND/OR 连接词"""
+    sql: str
+
+
+class Value(NamedTuple):
+    """值；name 用于 named 风格的参数名"""
+    name: str
+    value: Any
+
+
+class Template(NamedTuple):
+    """含占位符的SQL文本，占位符语法同片段模板，values 为 (参数名, 值) 元组"""
+    source: str
+    values: Tuple[Tuple[str, Any], ...]
+
+
+class Aggregate(NamedTuple):
+    """聚合函数；func 为 COUNT(DISTINCT) 时输出 COUNT(DISTINCT 列)"""
+    func: str
+    column: str
+
+
+class OrderItem(NamedTuple):
+    column: str
+    direction: str = 'ASC'
+
+
+class Join(NamedTuple):
+    table: str
+    on: Union[Raw, Template]
+    kind: str = 'INNER'
+
+
+class Assignment(NamedTuple):
+    column: str
+    value: Value
+
+
+class ColumnDef(NamedTuple):
+    name: str
+    type: str
+    primary_key: bool = False
+    not_null: bool = False
+
+
+Expression = Union[Column, Raw, Value, Template, Aggregate]
+
+
+# ---- 语句 ----
+
+class Select(NamedTuple):
+    table: str
+    columns: Optional[Tuple[Expression, ...]] = None   # None 表示 *
+    where: Tuple[Expression, ...] = ()
+    group_by: Tuple[Column, ...] = ()
+    order_by: Tuple[OrderItem, ...] = ()
+    joins: Tuple[Join, ...] = ()
+
+
+class Insert(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+    rows: Tuple[Tuple[Value, ...], ...]
+
+
+class Update(NamedTuple):
+    table: str
+    assignments: Tuple[Assignment, ...]
+    where: Tuple[Expression, ...] = ()
+
+
+class Delete(NamedTuple):
+    table: str
+    where: Tuple[Expression, ...] = ()
+
+
+class Create(NamedTuple):
+    table: str
+    columns: Tuple[ColumnDef, ...]
+
+
+Statement = Union[Select, Insert, Update, Delete, Create]
+
+
+# ---- 渲染 ----
+
+# 条件文本 -> 编译后的模板；条件在预览刷新时会被反复构建
+template_for = lru_cache(maxsize=1024)(compile_fragment)
+
+
+class _BindingMap:
+    """供片段模板渲染使用：每取一次值就绑定一次，占位符顺序与文本中出现的顺序一致"""
+    __slots__ = ('_values', '_bind')
+
+    def __init__(self, values: Dict[str, Any], bind: Bind):
+        self._values = values
+        self._bind = bind
+
+    def __getitem__(self, name: str) -> str:
+        return self._bind(name, self._values[name])
+
+
+def render(node: Any, bind: Bind) -> str:
+    """把语句或表达式节点渲染为SQL文本"""
+    return _RENDERERS[type(node)](node, bind)
+
+
+def render_where(where: Tuple[Expression, ...], bind: Bind) -> str:
+    return "  " + " ".join([str(condition.sql) if type(condition) is Raw
+                            else render_expression(condition, bind) for condition in where])
+
+
+def render_expression(node: Expression, bind: Bind) -> str:
+    """同 render()，列引用和原样文本是最常见的节点，不经过分派表"""
+    node_type = type(node)
+    if node_type is Column:
+        return str(node.name)
+    if node_type is Raw:
+        return str(node.sql)
+    return _RENDERERS[node_type](node, bind)
+
+
+def _render_column(node: Column, bind: Bind) -> str:
+    return str(node.name)
+
+
+def _render_raw(node: Raw, bind: Bind) -> str:
+    return str(node.sql)
+
+
+def _render_value(node: Value, bind: Bind) -> str:
+    return bind(node.name, node.value)
+
+
+def _render_template(node: Template, bind: Bind) -> str:
+    return template_for(node.source).render(_BindingMap(dict(node.values), bind))
+
+
+def _render_aggregate(node: Aggregate, bind: Bind) -> str:
+    if node.func == 'COUNT(DISTINCT)':
+        return f'COUNT(DISTINCT {node.column})'
+    return f'{node.func}({node.column})'
+
+
+# SELECT 语句按子句渲染，增量预览只重新渲染变化的子句
+SELECT_CLAUSES = ('columns', 'table', 'joins', 'where', 'group_by', 'order_by')
+
+
+def render_select_clause(node: Select, clause: str, bind: Bind) -> str:
+    """渲染 SELECT 的一个子句，子句为空时返回空字符串"""
+    return _SELECT_CLAUSE_RENDERERS[clause](node, bind)
+
+
+def join_select_clauses(clauses) -> str:
+    """把按 SELECT_CLAUSES 顺序渲染好的子句拼成完整语句"""
+    return "\n".join(["SELECT"] + [clause for clause in clauses if clause])
+
+
+def _render_select_columns(node: Select, bind: Bind) -> str:
+    if node.columns is None:
+        return "  *"
+    return "  " + ",\n  ".join([str(column.name) if type(column) is Column
+                                 else render_expression(column, bind)
+                                 for column in node.columns])
+
+
+def _render_select_table(node: Select, bind: Bind) -> str:
+    return f"FROM {node.table}"
+
+
+def _render_select_joins(node: Select, bind: Bind) -> str:
+    return "\n".join([f"{join.kind} JOIN {join.table} ON {render_expression(join.on, bind)}"
+                      for join in node.joins])
+
+
+def _render_select_where(node: Select, bind: Bind) -> str:
+    if not node.where:
+        return ""
+    return "WHERE\n" + render_where(node.where, bind)
+
+
+def _render_select_group_by(node: Select, bind: Bind) -> str:
+    if not node.group_by:
+        return ""
+    return "GROUP BY\n  " + ", ".join([render_expression(column, bind) for column in node.group_by])
+
+
+def _render_select_order_by(node: Select, bind: Bind) -> str:
+    if not node.order_by:
+        return ""
+    return "ORDER BY\n  " + ", ".join([f"{item.column} {item.direction}" for item in node.order_by])
+
+
+_SELECT_CLAUSE_RENDERERS: Dict[str, Callable[[Select, Bind], str]] = {
+    'columns': _render_select_columns,
+    'table': _render_select_table,
+    'joins': _render_select_joins,
+    'where': _render_select_where,
+    'group_by': _render_select_group_by,
+    'order_by': _render_select_order_by,
+}
+
+
+def _render_select(node: Select, bind: Bind) -> str:
+    return join_select_clauses([renderer(node, bind)
+                                for renderer in _SELECT_CLAUSE_RENDERERS.values()])
+
+
+def _render_insert(node: Insert, bind: Bind) -> str:
+    rows = ",\n       ".join(
+        '(' + ', '.join(bind(value.name, value.value) for value in row) + ')' for row in node.rows)
+    return f"INSERT INTO {node.table}\n({', '.join(node.columns)})\nVALUES {rows}"
+
+
+def _render_update(node: Update, bind: Bind) -> str:
+    updates = [f"{item.column} = {bind(item.value.name, item.value.value)}"
+               for item in node.assignments]
+    lines = [f"UPDATE {node.table}", "SET", "  " + ",\n  ".join(updates)]
+    if node.where:
+        lines.append("WHERE")
+        lines.append(render_where(node.where, bind))
+    return "\n".join(lines)
+
+
+def _render_delete(node: Delete, bind: Bind) -> str:
+    lines = [f"DELETE FROM {node.table}"]
+    if node.where:
+        lines.append("WHERE")
+        lines.append(render_where(node.where, bind))
+    return "\n".join(lines)
+
+
+def _render_create(node: Create, bind: Bind) -> str:
+    field_defs = []
+    for column in node.columns:
+        field_def = [f"  {column.name} {column.type}"]
+        if column.primary_key:
+            field_def.append("PRIMARY KEY")
+        if column.not_null:
+            field_def.append("NOT NULL")
+        field_defs.append(" ".join(field_def))
+    return '\n'.join([f"CREATE TABLE {node.table} (", ',\n'.join(field_defs), ")"])
+
+
+_RENDERERS: Dict[type, Callable[[Any, Bind], str]] = {
+    Column: _render_column,
+    Raw: _render_raw,
+    Value: _render_value,
+    Template: _render_template,
+    Aggregate: _render_aggregate,
+    Select: _render_select,
+    Insert: _render_insert,
+    Update: _render_update,
+    Delete: _render_delete,
+    Create: _render_create,
+}
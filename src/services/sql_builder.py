@@ -1,24 +1,165 @@
-from typing import Dict, Any, Optional, List, Union
+from functools import lru_cache
+from typing import Dict, Any, Iterable, Iterator, Optional, List, Sequence, Tuple, Union
+from ..models.sql_tag import SqlTag
 from ..repositories.sql_tag_repository import SqlTagRepository
+from .fragment_template import FragmentTemplate, compile_fragment
+from .sql_ast import (Aggregate, Assignment, Column, ColumnDef, Create, Delete, Insert, OrderItem,
+                      Raw, Select, Statement, Template, Update, Value, render, template_for)
+from .statement_cache import DEFAULT_MAXSIZE, StatementCache
+
+# build(paramstyle=...) 支持的占位符风格，与 DB-API 2.0 的 paramstyle 同名
+PARAMSTYLES = ('qmark', 'named', 'format', 'numeric')
+
+Params = Union[List[Any], Dict[str, Any]]
+
+# 批量INSERT的默认上限：每条语句的行数，以及绑定参数个数（SQLite 旧版本的 SQLITE_MAX_VARIABLE_NUMBER）
+INSERT_BATCH_MAX_ROWS = 1000
+INSERT_BATCH_MAX_PARAMS = 999
+
+
+class _ParamBinder:
+    """收集绑定参数并生成占位符
+
+    paramstyle 为 None 时不收集参数，直接把值内联为 SQL 字面量。
+    """
+    __slots__ = ('paramstyle', 'params', '_format_value')
+
+    def __init__(self, paramstyle: Optional[str], format_value):
+        if paramstyle is not None and paramstyle not in PARAMSTYLES:
+            raise ValueError(f"Unsupported paramstyle: {paramstyle}")
+        self.paramstyle = paramstyle
+        self.params: Params = {} if paramstyle == 'named' else []
+        self._format_value = format_value
+
+    def bind(self, name: str, value: Any) -> str:
+        style = self.paramstyle
+        if style is None:
+            return self._format_value(value)
+        if style == 'named':
+            key = self._named_key(name, value)
+            self.params[key] = value
+            return f':{key}'
+        self.params.append(value)
+        if style == 'qmark':
+            return '?'
+        if style == 'format':
+            return '%s'
+        return f':{len(self.params)}'
+
+    def _named_key(self, name: str, value: Any) -> str:
+        # 名字取自字段名，不能作为标识符时退回 p1、p2...
+        base = name if name.isidentifier() else f'p{len(self.params) + 1}'
+        key, n = base, 1
+        while key in self.params and self.params[key] != value:
+            n += 1
+            key = f'{base}_{n}'
+        return key
+
+    def result(self, sql: str) -> Union[str, Tuple[str, Params]]:
+        if self.paramstyle is None:
+            return sql
+        return sql, self.params
+
+
+# 条件文本 -> Raw 节点；同一批条件在预览刷新时会被反复转换
+_raw_node = lru_cache(maxsize=1024)(Raw)
+
+# 构建语句骨架时代替值的占位标记
+_SLOT = '\x00'
+
+
+class _SlotBinder:
+    """构建语句骨架用：每个值位置输出一个占位标记，并记下绑定时用的参数名"""
+    __slots__ = ('names', 'params')
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.params: Params = []
+
+    def bind(self, name: str, value: Any) -> str:
+        self.names.append(name)
+        return _SLOT
+
+    def skeleton(self, sql: str) -> Optional['_StatementSkeleton']:
+        literals = sql.split(_SLOT)
+        if len(literals) != len(self.names) + 1:
+            # SQL文本本身含有占位标记，无法拆分
+            return None
+        return _StatementSkeleton(tuple(literals), tuple(self.names))
+
+
+class _StatementSkeleton:
+    """预渲染的语句：字面量与值位置交替，渲染时按顺序把值交给绑定器"""
+    __slots__ = ('literals', 'names')
+
+    def __init__(self, literals: Tuple[str, ...], names: Tuple[str, ...]):
+        self.literals = literals
+        self.names = names
+
+    def render(self, binder: _ParamBinder, values: List[Any]) -> str:
+        literals = self.literals
+        parts = [literals[0]]
+        for i, name in enumerate(self.names):
+            parts.append(binder.bind(name, values[i]))
+            parts.append(literals[i + 1])
+        return ''.join(parts)
+
+
+def _chain_first(first: Any, rest: Iterator[Any]) -> Iterator[Any]:
+    yield first
+    yield from rest
+
+
+def _truncate_params(params: Params, length: int) -> None:
+    """把已收集的参数恢复到只有前 length 个"""
+    if isinstance(params, dict):
+        for key in list(params)[length:]:
+            del params[key]
+    else:
+        del params[length:]
+
 
 class SqlBuilder:
-    def __init__(self, repository: SqlTagRepository):
+    def __init__(self, repository: SqlTagRepository, statement_cache_size: int = DEFAULT_MAXSIZE):
         self.repository = repository
         self.sql_parts = []
+        # (标签ID, 更新时间) -> 编译后的片段模板，标签被修改后自然失效
+        self._templates: Dict[Tuple[Any, Any], FragmentTemplate] = {}
+        # 语句结构 -> 预渲染骨架，只有值变化时不必重新拼接整条语句
+        self._statements = StatementCache(statement_cache_size)
+
+    def statement_cache_stats(self) -> Dict[str, Any]:
+        """返回语句骨架缓存的命中统计"""
+        return self._statements.stats()
 
     def add_fragment(self, tag_name: str, params: Optional[Dict[str, Any]] = None) -> 'SqlBuilder':
-        tag = self.repository.find_by_tag_name(tag_name)
-        if not tag:
-            raise ValueError(f"Tag {tag_name} not found")
-        
+        tag = self._find_tag(tag_name)
+
         if params:
-            sql_fragment = tag.sql_fragment.format(**params)
+            sql_fragment = self._template(tag).render(params)
         else:
             sql_fragment = tag.sql_fragment
             
         self.sql_parts.append(sql_fragment)
         return self
 
+    def fragment_params(self, tag_name: str) -> Tuple[str, ...]:
+        """返回标签片段需要的参数名，按首次出现的顺序"""
+        return self._template(self._find_tag(tag_name)).params
+
+    def _find_tag(self, tag_name: str) -> SqlTag:
+        tag = self.repository.find_by_tag_name(tag_name)
+        if not tag:
+            raise ValueError(f"Tag {tag_name} not found")
+        return tag
+
+    def _template(self, tag: SqlTag) -> FragmentTemplate:
+        key = (tag.id, tag.update_time)
+        template = self._templates.get(key)
+        if template is None or template.source != tag.sql_fragment:
+            template = self._templates[key] = compile_fragment(tag.sql_fragment)
+        return template
+
     def where(self) -> 'SqlBuilder':
         self.sql_parts.append("WHERE")
         return self
@@ -34,7 +175,8 @@ class SqlBuilder:
     def build(self, sql_type: str, table: str, fields: Union[List[str], Dict[str, Any], None] = None,
              conditions: Optional[List[str]] = None, order_by: Optional[List[str]] = None,
              group_by: Optional[List[str]] = None, values: Optional[List[Any]] = None,
-             field_types: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+             field_types: Optional[Dict[str, Dict[str, Any]]] = None,
+             paramstyle: Optional[str] = None) -> Union[str, Tuple[str, Params]]:
         """构建SQL语句
         Args:
             sql_type: SQL语句类型 (SELECT/INSERT/UPDATE/DELETE/CREATE)
@@ -45,38 +187,127 @@ class SqlBuilder:
             group_by: GROUP BY子句
             values: INSERT语句的值列表
             field_types: 字段类型定义字典，用于CREATE TABLE
+            paramstyle: 绑定参数风格 (qmark/named/format/numeric)，为 None 时值内联在SQL中。
+                条件可以写成 {'params': 'age > {age}', 'values': {'age': 18}}，
+                其中的占位符同样按该风格绑定
         Returns:
-            str: 生成的SQL语句
+            str: 生成的SQL语句；指定 paramstyle 时返回 (sql, params)，
+                named 风格的 params 为字典，其余为列表
         """
+        binder = _ParamBinder(paramstyle, self._format_value)
         if not table:
             raise ValueError("Table name is required")
 
         # 获取表对应的标签组
-        group = None
-        groups = self.repository.find_all_groups()
-        for g in groups:
-            if g.group_name == table:
-                group = g
-                break
+        group = self.repository.find_group_by_name(table)
 
         # 如果不是"表名"标签组，直接返回选中标签的SQL片段
         if group and group.group_type != 'table':
-            return self._build_tag_group_sql(group, fields)
-
-        # 对于"表名"标签组，使用标准SQL构建逻辑
-        sql_builders = {
-            "CREATE": self._build_create,
-            "SELECT": self._build_select,
-            "INSERT": self._build_insert,
-            "UPDATE": self._build_update,
-            "DELETE": self._build_delete
-        }
-
-        builder = sql_builders.get(sql_type.upper())
-        if not builder:
+            return binder.result(self._build_tag_group_sql(group, fields))
+
+        # 对于"表名"标签组，先转换为语句树再渲染
+        sql_type = sql_type.upper()
+        if sql_type not in self._STATEMENT_BUILDERS:
+            raise ValueError(f"Unsupported SQL type: {sql_type}")
+
+        shape = self._statement_shape(sql_type, table, fields, conditions,
+                                      order_by, group_by, values)
+        if shape is None:
+            statement = self.statement(sql_type, table, fields, conditions, order_by, group_by,
+                                       values, field_types)
+            return binder.result(render(statement, binder.bind))
+
+        key, slot_values = shape
+        skeleton = self._statements.get(key)
+        if skeleton is None:
+            statement = self.statement(sql_type, table, fields, conditions, order_by, group_by,
+                                       values, field_types)
+            slot_binder = _SlotBinder()
+            skeleton = slot_binder.skeleton(render(statement, slot_binder.bind))
+            if skeleton is None or len(skeleton.names) != len(slot_values):
+                return binder.result(render(statement, binder.bind))
+            self._statements.put(key, skeleton)
+        return binder.result(skeleton.render(binder, slot_values))
+
+    _STATEMENT_BUILDERS = {
+        "CREATE": '_create_statement',
+        "SELECT": '_select_statement',
+        "INSERT": '_insert_statement',
+        "UPDATE": '_update_statement',
+        "DELETE": '_delete_statement',
+    }
+
+    def statement(self, sql_type: str, table: str,
+                  fields: Union[List[str], Dict[str, Any], None] = None,
+                  conditions: Optional[List[Union[str, Dict]]] = None,
+                  order_by: Optional[List[tuple]] = None,
+                  group_by: Optional[Dict] = None,
+                  values: Optional[List[Any]] = None,
+                  field_types: Optional[Dict[str, Dict[str, Any]]] = None) -> Statement:
+        """把 build() 的参数转换为语句树（见 sql_ast），不查询标签组"""
+        if not table:
+            raise ValueError("Table name is required")
+        method = self._STATEMENT_BUILDERS.get(sql_type.upper())
+        if not method:
             raise ValueError(f"Unsupported SQL type: {sql_type}")
+        return getattr(self, method)(table, fields, conditions, order_by, group_by,
+                                     values, field_types)
 
-        return builder(table, fields, conditions, order_by, group_by, values, field_types)
+    def _statement_shape(self, sql_type: str, table: str, fields: Any, conditions: Any,
+                         order_by: Any, group_by: Any, values: Any
+                         ) -> Optional[Tuple[tuple, List[Any]]]:
+        """返回 (结构键, 按绑定顺序排列的值)，无法缓存时返回 None
+
+        键只包含决定语句文本的部分：类型、表名、字段、条件文本、排序和分组；
+        值按渲染语句树时调用 bind 的顺序取出。CREATE 很少重复构建，不缓存。
+        """
+        if sql_type == 'CREATE':
+            return None
+        slot_values: List[Any] = []
+        if isinstance(fields, dict):
+            field_key = ('dict',) + tuple(fields)
+            if sql_type in ('INSERT', 'UPDATE'):
+                slot_values.extend(fields.values())
+        elif fields is None:
+            field_key = None
+        else:
+            field_key = tuple(fields)
+            if sql_type == 'INSERT' and values:
+                field_key += (len(values),)
+                slot_values.extend(values)
+
+        condition_key = []
+        if conditions and sql_type in ('SELECT', 'UPDATE', 'DELETE'):
+            for condition in conditions:
+                if not isinstance(condition, dict):
+                    condition_key.append(str(condition))
+                    continue
+                text = str(condition['params'])
+                condition_values = condition.get('values')
+                if condition_values is None:
+                    condition_key.append(text)
+                    continue
+                template = template_for(text)
+                if template.positional or not all(template.simple):
+                    return None
+                condition_key.append((text,))
+                slot_values.extend(condition_values[name] for name in template.fields)
+
+        if order_by:
+            order_key = tuple(tuple(item) for item in order_by)
+        else:
+            order_key = None
+        if isinstance(group_by, dict):
+            group_key = (tuple(group_by.get('group_fields') or ()),
+                         tuple((group_by.get('aggregate_fields') or {}).items()))
+        else:
+            group_key = group_by
+        key = (sql_type, table, field_key, tuple(condition_key), order_key, group_key)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key, slot_values
 
     def _build_tag_group_sql(self, group: Any, fields: List[str]) -> str:
         """构建标签组SQL"""
@@ -91,164 +322,191 @@ class SqlBuilder:
 
         return '\n'.join(sql_fragments)
 
-    def _build_create(self, table: str, fields: Any = None, conditions: Any = None,
-                     order_by: Any = None, group_by: Any = None, values: Any = None,
-                     field_types: Dict[str, Dict[str, Any]] = None) -> str:
+    @staticmethod
+    def _condition_node(condition: Union[str, Dict]):
+        """条件转为语句树节点；带 values 的条件其中的占位符按片段模板绑定"""
+        if not isinstance(condition, dict):
+            return _raw_node(str(condition))
+        values = condition.get('values')
+        if values is None:
+            return _raw_node(str(condition['params']))
+        return Template(str(condition['params']), tuple(values.items()))
+
+    def _where(self, conditions: Optional[List[Union[str, Dict]]]) -> tuple:
+        return tuple([self._condition_node(condition) for condition in conditions or ()])
+
+    def _create_statement(self, table: str, fields: Any = None, conditions: Any = None,
+                          order_by: Any = None, group_by: Any = None, values: Any = None,
+                          field_types: Dict[str, Dict[str, Any]] = None) -> Create:
         """构建CREATE TABLE语句"""
         if not field_types:
             raise ValueError("Field types are required for CREATE TABLE")
 
-        sql = [f"CREATE TABLE {table} ("]
-        field_defs = []
-        for field, type_info in field_types.items():
-            field_def = [f"  {field} {type_info['type']}"]
-            if type_info.get('primary_key'):
-                field_def.append("PRIMARY KEY")
-            if type_info.get('not_null'):
-                field_def.append("NOT NULL")
-            field_defs.append(" ".join(field_def))
-
-        sql.append(',\n'.join(field_defs))
-        sql.append(")")
-        return '\n'.join(sql)
-
-    def _build_select(self, table: str, fields: List[str],
-                     conditions: Optional[List[Union[str, Dict]]] = None,
-                     order_by: Optional[List[tuple]] = None,
-                     group_by: Optional[Dict] = None,
-                     values: Any = None,
-                     field_types: Any = None) -> str:
+        return Create(table, tuple(
+            ColumnDef(field, type_info['type'], bool(type_info.get('primary_key')),
+                      bool(type_info.get('not_null')))
+            for field, type_info in field_types.items()))
+
+    def _select_statement(self, table: str, fields: List[str],
+                          conditions: Optional[List[Union[str, Dict]]] = None,
+                          order_by: Optional[List[tuple]] = None,
+                          group_by: Optional[Dict] = None,
+                          values: Any = None,
+                          field_types: Any = None) -> Select:
         """构建SELECT语句"""
-        sql_parts = ["SELECT"]
-        
+        selected = fields or ()
+
         # 添加字段
         if not fields:
-            sql_parts.append("  *")
+            columns = None
+        elif group_by and 'aggregate_fields' in group_by and group_by['aggregate_fields']:
+            # 只添加被选中的分组字段
+            columns = [Column(field) for field in group_by.get('group_fields', [])
+                       if field in selected]
+            # 添加聚合字段
+            for field, func in group_by['aggregate_fields'].items():
+                if field == '*' and func == 'COUNT':
+                    columns.append(Aggregate(func, field))
+                elif func == 'COUNT(DISTINCT)':
+                    columns.append(Aggregate(func, field))
+                elif field in selected:  # 只添加被选中的聚合字段
+                    columns.append(Aggregate(func, field))
+            columns = tuple(columns)
         else:
-            # 检查是否有聚合函数
-            if group_by and 'aggregate_fields' in group_by and group_by['aggregate_fields']:
-                field_parts = []
-                # 添加分组字段
-                for field in group_by.get('group_fields', []):
-                    if field in fields:  # 只添加被选中的分组字段
-                        field_parts.append(str(field))
-                # 添加聚合字段
-                for field, func in group_by['aggregate_fields'].items():
-                    if field == '*' and func == 'COUNT':
-                        field_parts.append('COUNT(*)')
-                    elif func == 'COUNT(DISTINCT)':
-                        field_parts.append(f'COUNT(DISTINCT {field})')
-                    else:
-                        if field in fields:  # 只添加被选中的聚合字段
-                            field_parts.append(f'{func}({field})')
-                sql_parts.append("  " + ",\n  ".join(field_parts))
-            else:
-                # 使用选中的字段
-                sql_parts.append("  " + ",\n  ".join(str(f) for f in fields))
-        
-        sql_parts.append(f"FROM {table}")
-        
-        # 添加WHERE子句
-        if conditions:
-            sql_parts.append("WHERE")
-            condition_parts = []
-            for condition in conditions:
-                if isinstance(condition, dict):
-                    condition_parts.append(str(condition['params']))
-                else:
-                    condition_parts.append(str(condition))
-            sql_parts.append("  " + " ".join(condition_parts))
-        
-        # 添加GROUP BY子句
+            columns = tuple([Column(field) for field in fields])
+
+        # 只使用被选中的分组字段和排序字段
+        group_columns = ()
         if group_by and 'group_fields' in group_by and group_by['group_fields']:
-            group_fields = [f for f in group_by['group_fields'] if f in fields]  # 只使用被选中的分组字段
-            if group_fields:  # 只有当有被选中的分组字段时才添加GROUP BY子句
-                sql_parts.append("GROUP BY")
-                sql_parts.append("  " + ", ".join(str(g) for g in group_fields))
-        
-        # 添加ORDER BY子句
+            group_columns = tuple([Column(f) for f in group_by['group_fields'] if f in selected])
+        order_items = ()
         if order_by:
-            order_parts = []
-            for field, direction in order_by:
-                if field in fields:  # 只添加被选中字段的排序
-                    order_parts.append(f"{field} {direction}")
-            if order_parts:  # 只有当有排序字段时才添加ORDER BY子句
-                sql_parts.append("ORDER BY")
-                sql_parts.append("  " + ", ".join(order_parts))
-        
-        return "\n".join(sql_parts)
-
-    def _build_insert(self, table: str, fields: Union[Dict[str, Any], List[str]], 
-                     conditions: Any = None, order_by: Any = None, group_by: Any = None,
-                     values: Optional[List[Any]] = None, field_types: Any = None) -> str:
-        """构建INSERT语句"""
-        sql_parts = [f"INSERT INTO {table}"]
+            order_items = tuple([OrderItem(field, direction) for field, direction in order_by
+                                 if field in selected])
 
+        return Select(table, columns, self._where(conditions), group_columns, order_items)
+
+    def _insert_statement(self, table: str, fields: Union[Dict[str, Any], List[str]],
+                          conditions: Any = None, order_by: Any = None, group_by: Any = None,
+                          values: Optional[List[Any]] = None, field_types: Any = None) -> Insert:
+        """构建INSERT语句"""
         if isinstance(fields, dict):
-            field_names = list(fields.keys())
-            field_values = self._format_values(fields.values())
-            sql_parts.append(f"({', '.join(field_names)})")
-            sql_parts.append(f"VALUES ({', '.join(field_values)})")
-        elif isinstance(fields, list) and values:
-            field_values = self._format_values(values)
-            sql_parts.append(f"({', '.join(fields)})")
-            sql_parts.append(f"VALUES ({', '.join(field_values)})")
-        else:
+            return Insert(table, tuple(fields),
+                          (tuple(Value(str(f), v) for f, v in fields.items()),))
+        if isinstance(fields, list) and values:
+            row = [Value(str(f), v) for f, v in zip(fields, values)]
+            # 值比字段多时保持原来的行为，多出的值照样输出
+            row += [Value(f'p{i}', v) for i, v in enumerate(values[len(fields):], len(fields) + 1)]
+            return Insert(table, tuple(fields), (tuple(row),))
+        raise ValueError("Invalid fields format for INSERT")
+
+    def build_insert_batches(self, table: str, rows: Iterable[Union[Dict[str, Any], Sequence[Any]]],
+                             fields: Optional[List[str]] = None,
+                             max_rows: int = INSERT_BATCH_MAX_ROWS,
+                             max_bytes: Optional[int] = None,
+                             max_params: Optional[int] = INSERT_BATCH_MAX_PARAMS,
+                             paramstyle: Optional[str] = None
+                             ) -> Iterator[Union[str, Tuple[str, Params]]]:
+        """按批生成多行INSERT语句
+
+        Args:
+            table: 表名
+            rows: 行的迭代器，每行是字典或与 fields 顺序一致的元组；字典缺少的字段写 NULL
+            fields: 字段列表，为空时取第一行字典的键
+            max_rows: 每条语句最多的行数
+            max_bytes: 每条语句SQL文本的最大字节数(UTF-8)，单行超出时该行单独成一条语句
+            max_params: 每条语句最多的绑定参数个数，只在指定 paramstyle 时生效
+            paramstyle: 同 build()，为 None 时值内联在SQL中
+        Yields:
+            每批一条语句；指定 paramstyle 时为 (sql, params)
+        """
+        if not table:
+            raise ValueError("Table name is required")
+        if max_rows < 1:
+            raise ValueError("max_rows must be at least 1")
+
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
+        if fields is None:
+            if not isinstance(first, dict):
+                raise ValueError("Fields are required when rows are not dictionaries")
+            fields = list(first.keys())
+        if not fields:
             raise ValueError("Invalid fields format for INSERT")
 
-        return "\n".join(sql_parts)
+        if paramstyle is not None and max_params:
+            if max_params < len(fields):
+                raise ValueError("max_params is smaller than the number of fields")
+            max_rows = min(max_rows, max_params // len(fields))
+
+        header = f"INSERT INTO {table}\n({', '.join(fields)})\nVALUES "
+        separator = ",\n       "
+        header_bytes = len(header.encode('utf-8'))
+        separator_bytes = len(separator.encode('utf-8'))
+
+        binder = _ParamBinder(paramstyle, self._format_value)
+        chunk: List[str] = []
+        chunk_bytes = header_bytes
+        for row in _chain_first(first, rows):
+            values = self._row_values(row, fields)
+            mark = len(binder.params)
+            row_sql = self._bind_row(binder, fields, values, len(chunk) + 1)
+            row_bytes = len(row_sql.encode('utf-8')) + (separator_bytes if chunk else 0)
+            if chunk and max_bytes is not None and chunk_bytes + row_bytes > max_bytes:
+                # 撤销这一行的参数，先输出已有的行，再把这一行放进新的批次
+                _truncate_params(binder.params, mark)
+                yield binder.result(header + separator.join(chunk))
+                binder = _ParamBinder(paramstyle, self._format_value)
+                row_sql = self._bind_row(binder, fields, values, 1)
+                chunk, chunk_bytes = [], header_bytes
+                row_bytes = len(row_sql.encode('utf-8'))
+            chunk.append(row_sql)
+            chunk_bytes += row_bytes
+            if len(chunk) >= max_rows:
+                yield binder.result(header + separator.join(chunk))
+                binder = _ParamBinder(paramstyle, self._format_value)
+                chunk, chunk_bytes = [], header_bytes
+        if chunk:
+            yield binder.result(header + separator.join(chunk))
+
+    @staticmethod
+    def _row_values(row: Union[Dict[str, Any], Sequence[Any]], fields: List[str]) -> Sequence[Any]:
+        if isinstance(row, dict):
+            return [row.get(field) for field in fields]
+        if len(row) != len(fields):
+            raise ValueError(f"Row has {len(row)} values but {len(fields)} fields were given")
+        return row
+
+    @staticmethod
+    def _bind_row(binder: _ParamBinder, fields: List[str], values: Sequence[Any], index: int) -> str:
+        # named 风格下用 字段名_行号 作参数名，同一批内不会重名
+        return '(' + ', '.join(binder.bind(f'{field}_{index}', value)
+                               for field, value in zip(fields, values)) + ')'
 
-    def _build_update(self, table: str, fields: Dict[str, Any],
-                     conditions: Optional[List[Union[str, Dict]]] = None,
-                     order_by: Any = None,
-                     group_by: Any = None,
-                     values: Any = None,
-                     field_types: Any = None) -> str:
+    def _update_statement(self, table: str, fields: Dict[str, Any],
+                          conditions: Optional[List[Union[str, Dict]]] = None,
+                          order_by: Any = None,
+                          group_by: Any = None,
+                          values: Any = None,
+                          field_types: Any = None) -> Update:
         """构建UPDATE语句"""
         if not isinstance(fields, dict):
             raise ValueError("Fields must be a dictionary for UPDATE")
 
-        sql_parts = [f"UPDATE {table}"]
-        
-        # 构建SET子句
-        updates = [f"{field} = {self._format_value(value)}" 
-                  for field, value in fields.items()]
-        sql_parts.append("SET")
-        sql_parts.append("  " + ",\n  ".join(updates))
-
-        # 添加WHERE子句
-        if conditions:
-            sql_parts.append("WHERE")
-            condition_parts = []
-            for condition in conditions:
-                if isinstance(condition, dict):
-                    condition_parts.append(str(condition['params']))
-                else:
-                    condition_parts.append(str(condition))
-            sql_parts.append("  " + " ".join(condition_parts))
-
-        return "\n".join(sql_parts)
-
-    def _build_delete(self, table: str, fields: Any = None,
-                     conditions: Optional[List[Union[str, Dict]]] = None,
-                     order_by: Any = None,
-                     group_by: Any = None,
-                     values: Any = None,
-                     field_types: Any = None) -> str:
-        """构建DELETE语句"""
-        sql_parts = [f"DELETE FROM {table}"]
+        assignments = tuple([Assignment(field, Value(str(field), value))
+                             for field, value in fields.items()])
+        return Update(table, assignments, self._where(conditions))
 
-        if conditions:
-            sql_parts.append("WHERE")
-            condition_parts = []
-            for condition in conditions:
-                if isinstance(condition, dict):
-                    condition_parts.append(str(condition['params']))
-                else:
-                    condition_parts.append(str(condition))
-            sql_parts.append("  " + " ".join(condition_parts))
-
-        return "\n".join(sql_parts)
+    def _delete_statement(self, table: str, fields: Any = None,
+                          conditions: Optional[List[Union[str, Dict]]] = None,
+                          order_by: Any = None,
+                          group_by: Any = None,
+                          values: Any = None,
+                          field_types: Any = None) -> Delete:
+        """构建DELETE语句"""
+        return Delete(table, self._where(conditions))
 
     def _format_values(self, values: Any) -> List[str]:
         """格式化值列表"""
@@ -0,0 +1,43 @@
+"""增量渲染的SQL预览
+
+预览在每次勾选字段、修改条件时都会刷新。SELECT 语句按子句缓存渲染结果，
+新语句树与上一次比较后只重新渲染变化的子句；其他语句类型直接交给 SqlBuilder.build。
+"""
+from typing import Any, Dict, Optional
+
+from .sql_ast import SELECT_CLAUSES, Select, join_select_clauses, render_select_clause
+from .sql_builder import SqlBuilder
+
+
+class SqlPreview:
+    def __init__(self, builder: SqlBuilder):
+        self.builder = builder
+        self._statement: Optional[Select] = None
+        self._clauses: Dict[str, str] = {}
+        self.rendered_clauses = 0   # 累计重新渲染的子句数，用于观察增量效果
+
+    def reset(self):
+        """丢弃缓存的子句，下次全部重新渲染"""
+        self._statement = None
+        self._clauses = {}
+
+    def render(self, sql_type: str, table: str, **kwargs: Any) -> str:
+        """参数同 SqlBuilder.build，返回内联值的SQL文本"""
+        group = self.builder.repository.find_group_by_name(table) if table else None
+        if sql_type.upper() != 'SELECT' or (group and group.group_type != 'table'):
+            self.reset()
+            return self.builder.build(sql_type, table, **kwargs)
+
+        statement = self.builder.statement('SELECT', table, **kwargs)
+        previous = self._statement
+        clauses = self._clauses
+        for clause in SELECT_CLAUSES:
+            part = getattr(statement, clause)
+            if previous is None or getattr(previous, clause) != part:
+                clauses[clause] = render_select_clause(statement, clause, self._bind)
+                self.rendered_clauses += 1
+        self._statement = statement
+        return join_select_clauses([clauses[clause] for clause in SELECT_CLAUSES])
+
+    def _bind(self, name: str, value: Any) -> str:
+        return self.builder._format_value(value)
@@ -0,0 +1,123 @@
+"""按行流式读取表格文件
+
+.xlsx 使用 openpyxl 只读模式逐行迭代，.csv/.tsv 使用标准库 csv 模块，
+都不会把整张表一次性读入内存。只有旧的 .xls 格式仍需借助 pandas。
+空单元格统一读成空字符串，全空的行会被跳过。
+"""
+import csv
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+Row = Dict[str, Any]
+
+
+class TableRows:
+    """按行产出字典的迭代器，close() 关闭底层文件
+
+    生成器还没开始迭代时调用它的 close() 不会执行其中的 finally，
+    所以另外保存关闭底层文件的函数，调用方可以在读完之前随时关闭。
+    """
+
+    def __init__(self, rows: Iterator[Row], close: Optional[Callable[[], None]] = None):
+        self._rows = rows
+        self._close = close
+
+    def __iter__(self) -> 'TableRows':
+        return self
+
+    def __next__(self) -> Row:
+        return next(self._rows)
+
+    def close(self):
+        close, self._close = self._close, None
+        if close is not None:
+            close()
+
+CSV_EXTENSIONS = ('.csv', '.tsv', '.txt')
+
+
+def open_table(filepath: str, encoding: str = 'utf-8-sig') -> Tuple[List[str], TableRows]:
+    """打开表格文件，返回 (列名列表, 按行产出字典的迭代器)
+
+    列名取自第一行。迭代器耗尽时会关闭底层文件；没有读完的，
+    调用方应在 finally 中调用 rows.close()。
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext in CSV_EXTENSIONS:
+        return _open_csv(filepath, '\t' if ext == '.tsv' else ',', encoding)
+    if ext == '.xls':
+        return _open_xls(filepath)
+    return _open_xlsx(filepath)
+
+
+def iter_batches(rows: Iterator[Row], batch_size: int) -> Iterator[List[Row]]:
+    """把行迭代器切分为固定大小的批次"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _header(values) -> List[str]:
+    return ['' if v is None else str(v).strip() for v in values]
+
+
+def _is_blank(values) -> bool:
+    return all(v is None or v == '' for v in values)
+
+
+def _open_xlsx(filepath: str) -> Tuple[List[str], TableRows]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        workbook.close()
+        return [], TableRows(iter(()))
+    columns = _header(header)
+
+    def generate():
+        try:
+            for values in rows:
+                if _is_blank(values):
+                    continue
+                yield dict(zip(columns, ('' if v is None else v for v in values)))
+        finally:
+            workbook.close()
+
+    return columns, TableRows(generate(), workbook.close)
+
+
+def _open_csv(filepath: str, delimiter: str, encoding: str) -> Tuple[List[str], TableRows]:
+    f = open(filepath, newline='', encoding=encoding)
+    reader = csv.reader(f, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        f.close()
+        return [], TableRows(iter(()))
+    columns = _header(header)
+
+    def generate():
+        try:
+            for values in reader:
+                if _is_blank(values):
+                    continue
+                yield dict(zip(columns, values))
+        finally:
+            f.close()
+
+    return columns, TableRows(generate(), f.close)
+
+
+def _open_xls(filepath: str) -> Tuple[List[str], TableRows]:
+    # openpyxl 不支持旧版 .xls，只能整表读入
+    import pandas as pd
+
+    df = pd.read_excel(filepath).fillna('')
+    columns = _header(df.columns)
+    return columns, TableRows(dict(zip(columns, values)) for values in df.itertuples(index=False))
@@ -0,0 +1,215 @@
+"""后台任务执行器
+
+导入导出、保存等耗时操作放到线程池中执行，Tk 界面线程不被阻塞。
+工作线程不能直接操作 Tk 控件：任务的进度、阶段性结果和最终结果都放进队列，
+由界面线程用 after() 定时取出，再调用对应的回调。
+"""
+import queue
+import threading
+import traceback
+from typing import Any, Callable, List, Optional
+
+# 界面线程检查结果队列的间隔（毫秒）
+POLL_INTERVAL_MS = 50
+
+# 线程池默认的工作线程数
+DEFAULT_MAX_WORKERS = 2
+
+
+class TaskCancelled(BaseException):
+    """任务被取消时在工作线程中抛出，任务应在此时放弃并回滚未完成的修改
+
+    与 asyncio.CancelledError 一样继承 BaseException，
+    不会被任务内部处理普通错误的 except Exception 吞掉。
+    """
+
+
+class TaskContext:
+    """传给任务函数的上下文，在工作线程中使用"""
+
+    def __init__(self, handle: 'TaskHandle', events: 'queue.Queue'):
+        self._handle = handle
+        self._events = events
+
+    @property
+    def cancelled(self) -> bool:
+        return self._handle._cancel.is_set()
+
+    def check_cancelled(self):
+        """已请求取消时抛出 TaskCancelled"""
+        if self._handle._cancel.is_set():
+            raise TaskCancelled()
+
+    def progress(self, done: int, total: int):
+        """报告进度，total 为 0 表示总数未知；顺带检查是否已取消"""
+        self.check_cancelled()
+        self._events.put((self._handle, 'progress', (done, total)))
+
+    def partial(self, items: List[Any]):
+        """报告阶段性结果，如已产生的错误消息"""
+        if items:
+            self._events.put((self._handle, 'partial', list(items)))
+
+
+class TaskHandle:
+    """提交任务后返回的句柄，在界面线程中使用"""
+
+    def __init__(self, on_progress: Optional[Callable[[int, int], None]],
+                 on_partial: Optional[Callable[[List[Any]], None]],
+                 on_done: Optional[Callable[[Any], None]],
+                 on_error: Optional[Callable[[BaseException], None]],
+                 on_cancelled: Optional[Callable[[], None]]):
+        self.on_progress = on_progress
+        self.on_partial = on_partial
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self._cancel = threading.Event()
+        self.finished = False
+
+    def cancel(self):
+        """请求取消；任务在下一次报告进度或检查取消时停止"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+
+class TaskExecutor:
+    """线程池加 after() 轮询的结果队列
+
+    submit() 的回调都在界面线程中调用。传入 lock 的任务在持有该锁时执行，
+    同一个 SQLite 文件的写任务共用仓储的 write_lock，一次只有一个写事务。
+    release 在每个任务结束后于工作线程中调用，用于释放该线程打开的资源，
+    如仓储的 release_thread_connection；否则线程池关闭后这些连接一直不会关闭。
+    """
+
+    def __init__(self, widget, max_workers: int = DEFAULT_MAX_WORKERS,
+                 poll_interval: int = POLL_INTERVAL_MS,
+                 release: Optional[Callable[[], None]] = None):
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self.release = release
+        self._pool = None  # 第一次提交任务时创建，不拖慢界面启动
+        self._events: 'queue.Queue' = queue.Queue()
+        self._active: List[TaskHandle] = []
+        self._after_id = None
+
+    def submit(self, job: Callable[[TaskContext], Any],
+               on_progress: Optional[Callable[[int, int], None]] = None,
+               on_partial: Optional[Callable[[List[Any]], None]] = None,
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               on_cancelled: Optional[Callable[[], None]] = None,
+               lock: Optional[threading.Lock] = None) -> TaskHandle:
+        """在工作线程中执行 job(context)，返回值交给 on_done"""
+        handle = TaskHandle(on_progress, on_partial, on_done, on_error, on_cancelled)
+        context = TaskContext(handle, self._events)
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='sql-builder-task')
+        self._active.append(handle)
+        self._pool.submit(self._run, job, handle, context, lock)
+        self._schedule()
+        return handle
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._active)
+
+    def cancel_all(self):
+        for handle in self._active:
+            handle.cancel()
+
+    def shutdown(self):
+        """取消所有任务并停止轮询，不等待工作线程结束"""
+        self.cancel_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    # ---- 工作线程 ----
+
+    def _run(self, job, handle: TaskHandle, context: TaskContext, lock):
+        try:
+            event = self._execute(job, handle, context, lock)
+        finally:
+            if self.release is not None:
+                try:
+                    self.release()
+                except Exception:
+                    traceback.print_exc()
+        self._events.put(event)
+
+    def _execute(self, job, handle: TaskHandle, context: TaskContext, lock):
+        """执行任务，返回要放进结果队列的事件"""
+        try:
+            if lock is None:
+                result = job(context)
+            else:
+                # 排队等锁期间也响应取消
+                while not lock.acquire(timeout=0.1):
+                    context.check_cancelled()
+                try:
+                    context.check_cancelled()
+                    result = job(context)
+                finally:
+                    lock.release()
+        except TaskCancelled:
+            return handle, 'cancelled', None
+        except BaseException as e:
+            return handle, 'error', e
+        return handle, 'done', result
+
+    # ---- 界面线程 ----
+
+    def _schedule(self):
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._after_id = None
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+
+        # 同一任务的连续进度只需要显示最后一次
+        last_progress = {}
+        for position, (handle, kind, _) in enumerate(events):
+            if kind == 'progress':
+                last_progress[id(handle)] = position
+
+        for position, (handle, kind, payload) in enumerate(events):
+            try:
+                if kind == 'progress':
+                    if last_progress[id(handle)] == position and handle.on_progress:
+                        handle.on_progress(*payload)
+                elif kind == 'partial':
+                    if handle.on_partial:
+                        handle.on_partial(payload)
+                else:
+                    handle.finished = True
+                    self._active.remove(handle)
+                    if kind == 'done' and handle.on_done:
+                        handle.on_done(payload)
+                    elif kind == 'error' and handle.on_error:
+                        handle.on_error(payload)
+                    elif kind == 'cancelled' and handle.on_cancelled:
+                        handle.on_cancelled()
+            except Exception:
+                # 一个回调出错不能影响其他任务的结果
+                traceback.print_exc()
+
+        if self._active:
+            self._schedule()
@@ -0,0 +1,119 @@
+"""启动耗时分析
+
+用 --profile-startup 启动时记录各模块的导入耗时和各初始化阶段的耗时，
+窗口第一次空闲（已经显示出来）时打印汇总。未启用时 phase() 只是一个空的上下文。
+"""
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# 汇总中列出的最慢模块数量
+TOP_MODULES = 15
+
+
+class _TimedLoader:
+    """包装模块加载器，记录 exec_module 的自身耗时（不含其中嵌套导入的模块）"""
+
+    def __init__(self, loader, profiler: 'StartupProfiler'):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        profiler = self._profiler
+        profiler._import_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = profiler._import_stack.pop()
+            if profiler._import_stack:
+                profiler._import_stack[-1] += elapsed
+            profiler.imports[module.__name__] = elapsed - nested
+
+
+class _TimedFinder:
+    """放在 sys.meta_path 最前面，给找到的模块套上计时加载器"""
+
+    def __init__(self, profiler: 'StartupProfiler'):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self._profiler)
+                return spec
+        return None
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.phases: List[Tuple[str, float]] = []
+        self.imports: Dict[str, float] = {}   # 模块名 -> 自身导入耗时
+        self._import_stack: List[float] = []
+        self._finder = None
+        self._start = 0.0
+
+    def enable(self):
+        """开始记录，之后导入的模块都会计时"""
+        self.enabled = True
+        self._start = time.perf_counter()
+        self._finder = _TimedFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    @contextmanager
+    def phase(self, name: str):
+        """记录一个初始化阶段的耗时"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self):
+        """停止导入计时并打印汇总"""
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self._start
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+        print("==== 启动耗时 ====")
+        print(f"到窗口首次空闲共 {total * 1000:.1f} ms")
+        print("-- 初始化阶段 --")
+        for name, elapsed in self.phases:
+            print(f"{elapsed * 1000:9.1f} ms  {name}")
+
+        # 按顶层包汇总，本项目的模块按 src.xxx 汇总
+        by_package: Dict[str, float] = {}
+        for module, elapsed in self.imports.items():
+            parts = module.split('.')
+            package = '.'.join(parts[:2]) if parts[0] == 'src' else parts[0]
+            by_package[package] = by_package.get(package, 0.0) + elapsed
+        print(f"-- 导入耗时（按包汇总，共 {len(self.imports)} 个模块，"
+              f"{sum(self.imports.values()) * 1000:.1f} ms）--")
+        for package, elapsed in sorted(by_package.items(), key=lambda item: -item[1]):
+            print(f"{elapsed * 1000:9.1f} ms  {package}")
+        print(f"-- 最慢的 {TOP_MODULES} 个模块 --")
+        slowest = sorted(self.imports.items(), key=lambda item: -item[1])[:TOP_MODULES]
+        for module, elapsed in slowest:
+            print(f"{elapsed * 1000:9.1f} ms  {module}")
+
+
+# 进程内共用的实例，由 main() 按命令行参数启用
+profiler = StartupProfiler()
@@ -0,0 +1,157 @@
+"""批量导入与原先逐行导入的结果一致
+
+_reference_import 按原来的逐行流程导入：每行查找或创建组，逐个查询同名标签，
+改名时逐个尝试后缀。两种方式在相同的初始数据上导入同一份文件，
+成功数、错误消息（含顺序）以及导入后的组表和标签表都应完全相同。
+"""
+import csv
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from src.repositories.sql_tag_repository import SqlTagRepository
+from src.services.data_transfer_service import DataTransferService
+
+HEADERS = ['组名', '标签名', 'SQL内容', '描述', '标签类型']
+FIELDS = ['group_name', 'tag_name', 'sql_content', 'description', 'tag_type']
+
+
+def _reference_import(repository, rows, conflict_strategy):
+    """原来的逐行导入流程"""
+    success_count = 0
+    errors = []
+    for row in rows:
+        group_name = str(row['group_name']).strip()
+        tag_name = str(row['tag_name']).strip()
+        sql_content = str(row['sql_content']).strip()
+        description = str(row.get('description', '')).strip()
+        tag_type = str(row.get('tag_type', 'table')).strip()
+
+        if not all([group_name, tag_name, sql_content]):
+            errors.append(f'标签 [{group_name}-{tag_name}] 包含空值，已跳过')
+            continue
+
+        group = repository.find_group_by_name(group_name)
+        if group:
+            group_id = group.id
+        else:
+            with repository.transaction() as conn:
+                group_id = conn.execute(
+                    '''INSERT INTO tag_groups (group_name, group_type, create_time, update_time)
+                       VALUES (?, 'root', datetime('now'), datetime('now'))''',
+                    (group_name,)).lastrowid
+            repository.invalidate_cache()
+
+        existing_tag = repository.find_tag_by_names(group_name, tag_name)
+        if existing_tag:
+            if conflict_strategy == 'skip':
+                errors.append(f'标签 [{group_name}-{tag_name}] 已存在，已跳过')
+                continue
+            elif conflict_strategy == 'rename':
+                i = 1
+                new_tag_name = f"{tag_name}_{i}"
+                while repository.find_tag_by_names(group_name, new_tag_name):
+                    i += 1
+                    new_tag_name = f"{tag_name}_{i}"
+                tag_name = new_tag_name
+
+        try:
+            if existing_tag and conflict_strategy == 'replace':
+                existing_tag.sql_fragment = sql_content
+                existing_tag.description = description
+                existing_tag.tag_type = tag_type
+                repository.update_tag(existing_tag)
+            else:
+                repository.save(tag_name=tag_name, sql_fragment=sql_content,
+                                description=description, group_id=group_id,
+                                tag_type=tag_type)
+            success_count += 1
+        except Exception as e:
+            errors.append(f'保存标签 [{group_name}-{tag_name}] 时出错: {str(e)}')
+    return success_count, errors
+
+
+def _make_rows(count):
+    """混合已有组、新组、空值、文件内重名和不合法类型的行"""
+    rng = random.Random(5)
+    rows = []
+    for _ in range(count):
+        rows.append({
+            'group_name': rng.choice(['表名', '条件', 'newA', 'newB', 'existing', '']),
+            'tag_name': f"t{rng.randint(0, count // 3)}",
+            'sql_content': rng.choice(['x = 1', '', 'select 1']),
+            'description': rng.choice(['', 'd']),
+            'tag_type': rng.choice(['table', 'field', 'condition']),
+        })
+    return rows
+
+
+def _seed(repository, count):
+    root = repository.find_group_by_name('表名').id
+    group_id = repository.create_group('existing', 'table', root)
+    repository.create_group('sub', 'field', group_id)
+    for i in range(0, count // 3, 7):
+        repository.save(f"t{i}", 'old', 'o', group_id, 'table')
+
+
+def _dump(repository):
+    conn = repository._get_connection()
+    tags = sorted(conn.execute('''
+        SELECT g.group_name, g.group_type, g.parent_group_id,
+               t.tag_name, t.sql_fragment, t.description, t.tag_type
+        FROM sql_tags t JOIN tag_groups g ON g.id = t.group_id
+    ''').fetchall())
+    groups = sorted(conn.execute(
+        'SELECT id, group_name, group_type, parent_group_id FROM tag_groups').fetchall())
+    return tags, groups
+
+
+class ImportRegressionTest(unittest.TestCase):
+    ROWS = 600
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rows = _make_rows(self.ROWS)
+        self.csv_path = os.path.join(self.directory, 'tags.csv')
+        with open(self.csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS)
+            for row in self.rows:
+                writer.writerow([row[field] for field in FIELDS])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _open(self, name):
+        repository = SqlTagRepository(os.path.join(self.directory, name))
+        self.addCleanup(repository.close)
+        _seed(repository, self.ROWS)
+        return repository
+
+    def _check(self, strategy):
+        expected_repo = self._open(f'expected_{strategy}.db')
+        expected = _reference_import(expected_repo, self.rows, strategy)
+
+        actual_repo = self._open(f'actual_{strategy}.db')
+        actual = DataTransferService(actual_repo).import_from_csv(self.csv_path, strategy)
+
+        self.assertEqual(actual[0], expected[0])
+        self.assertEqual(actual[1], expected[1])
+        self.assertEqual(_dump(actual_repo), _dump(expected_repo))
+        # 确认数据覆盖了冲突和错误的情况
+        self.assertTrue(expected[0] and expected[1])
+
+    def test_skip(self):
+        self._check('skip')
+
+    def test_replace(self):
+        self._check('replace')
+
+    def test_rename(self):
+        self._check('rename')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""条件对话框加载组和标签时执行的SQL语句数，不随组的数量增加"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from src.gui.dialogs.condition_dialog import ConditionDialog, _ConditionSearchIndex
+from src.repositories.sql_tag_repository import SqlTagRepository
+
+
+class _FakeTree:
+    """只记录插入的节点，代替需要显示器的 ttk.Treeview"""
+
+    def __init__(self):
+        self.items = []
+
+    def insert(self, parent, index, text='', values=(), open=False):
+        self.items.append((parent, text, tuple(values)))
+        return f'I{len(self.items)}'
+
+
+class ConditionTagsStatementCountTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.repository = SqlTagRepository(os.path.join(self.directory, 'tags.db'))
+
+    def tearDown(self):
+        self.repository.close()
+        shutil.rmtree(self.directory)
+
+    def _add_groups(self, prefix, count, tags_per_group):
+        conn = self.repository._get_connection()
+        root = self.repository.find_group_by_name('条件')
+        now = datetime.now()
+        for i in range(count):
+            cursor = conn.execute(
+                '''INSERT INTO tag_groups (group_name, group_type, parent_group_id,
+                                           create_time, update_time)
+                   VALUES (?, 'condition', ?, ?, ?)''', (f'{prefix}{i}', root.id, now, now))
+            conn.executemany(
+                '''INSERT INTO sql_tags (tag_name, sql_fragment, group_id, tag_type,
+                                         create_time, update_time)
+                   VALUES (?, ?, ?, 'condition', ?, ?)''',
+                [(f'{prefix}{i}_t{j}', f'c{j} = 1', cursor.lastrowid, now, now)
+                 for j in range(tags_per_group)])
+        conn.commit()
+        self.repository.invalidate_cache()
+
+    def _load_dialog_tree(self):
+        """用 ConditionDialog 的加载方法填充假的树形控件，返回 (执行的语句, 树)"""
+        dialog = SimpleNamespace(repository=self.repository, condition_tree=_FakeTree(),
+                                 _search_index=_ConditionSearchIndex())
+        dialog._insert_condition_nodes = (
+            lambda *args: ConditionDialog._insert_condition_nodes(dialog, *args))
+
+        statements = []
+        conn = self.repository._get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            ConditionDialog._load_condition_tags(dialog)
+        finally:
+            conn.set_trace_callback(None)
+        return statements, dialog.condition_tree
+
+    def test_statement_count_does_not_grow_with_groups(self):
+        self._add_groups('a', 5, 3)
+        small_statements, _ = self._load_dialog_tree()
+
+        self._add_groups('b', 200, 3)
+        statements, tree = self._load_dialog_tree()
+
+        # 组树一次查询，全部组及其标签一次联表查询
+        self.assertEqual(len(statements), 2, statements)
+        self.assertEqual(len(small_statements), len(statements))
+        tag_rows = [item for item in tree.items if item[2][1]]
+        self.assertEqual(len(tag_rows), 205 * 3)
+
+    def test_find_groups_with_tags_is_one_statement(self):
+        self._add_groups('g', 50, 2)
+        self._add_groups('empty', 1, 0)
+        statements = []
+        conn = self.repository._get_connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            groups = self.repository.find_groups_with_tags('condition')
+        finally:
+            conn.set_trace_callback(None)
+
+        self.assertEqual(len(statements), 1, statements)
+        self.assertTrue(all(group.group_type == 'condition' for group, _ in groups))
+        by_name = {group.group_name: tags for group, tags in groups}
+        self.assertEqual([tag.tag_name for tag in by_name['g7']], ['g7_t0', 'g7_t1'])
+        self.assertEqual(by_name['empty0'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()